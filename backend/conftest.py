@@ -0,0 +1,19 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from managers import data_manager
+from managers.world_store import WorldStore
+
+DATABASE = Path(__file__).resolve().parent / "database"
+
+
+@pytest.fixture
+def isolated_store(tmp_path, monkeypatch):
+    """A world store over a throwaway copy of the database."""
+    shutil.copytree(DATABASE, tmp_path / "database")
+    store = WorldStore(tmp_path / "database", stat_interval=0, flush_interval=0)
+    monkeypatch.setattr(data_manager, "world_store", store)
+    yield store
+    store.close()
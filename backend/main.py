@@ -1,4 +1,6 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from managers.country_manager import *
@@ -8,10 +10,29 @@ from managers.factors_manager import *
 from managers.geopolitics_manager import *
 from managers.alliance_manager import *
 from managers.treaty_manager import *
-from simulation.scenario_engine import simulate_scenario
+from simulation.scenario_engine import (
+    MAX_ROUTE_ALTERNATIVES,
+    find_reachable,
+    simulate_many,
+    simulate_route_alternatives,
+    simulate_scenario_options,
+)
 from simulation.game_theory_engine import compute_factor_impacts
+from simulation.distance_oracle import distance_matrix
+from simulation.hybrid_routing_engine import factor_state
+from simulation.result_cache import request_key, simulation_cache
+from simulation.world_snapshot import take_snapshot
+from managers.world_store import world_store
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Make sure write-behind saves reach disk before the worker exits.
+    world_store.close()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 def _extract_countries(payload: dict):
     a = payload.get("a")
     b = payload.get("b")
@@ -123,9 +144,8 @@ def api_delete_factor(name: str):
 
 @app.get("/factors/metrics")
 def api_factor_metrics():
-    factors = get_factors()
-    impacts = compute_factor_impacts(factors)
-    return {"factors": factors, "impacts": impacts}
+    state = factor_state()
+    return {"factors": state.factors, "impacts": state.impacts}
 
 
 @app.post("/factors/reset")
@@ -364,8 +384,13 @@ def api_delete_treaty(name: str):
 
 # ---------------------- Simulation ----------------------
 
+def _cache_opt_out(cache_control: str | None) -> bool:
+    directives = {part.strip().lower() for part in (cache_control or "").split(",")}
+    return bool(directives & {"no-cache", "no-store"})
+
+
 @app.post("/simulate")
-def api_simulate(payload: dict):
+def api_simulate(payload: dict, response: Response, cache_control: str | None = Header(None)):
     try:
         src = payload.get("src")
         dst = payload.get("dst")
@@ -374,31 +399,81 @@ def api_simulate(payload: dict):
             raise HTTPException(status_code=400, detail="Missing required field: 'src' (source country)")
         if not dst:
             raise HTTPException(status_code=400, detail="Missing required field: 'dst' (destination country)")
+        try:
+            k = int(payload.get("k", 1))
+            diversity = float(payload.get("diversity", 0.0))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="'k' must be an integer and 'diversity' a number")
+        if not 1 <= k <= MAX_ROUTE_ALTERNATIVES:
+            raise HTTPException(status_code=400, detail=f"'k' must be between 1 and {MAX_ROUTE_ALTERNATIVES}")
+        if not 0.0 <= diversity <= 1.0:
+            raise HTTPException(status_code=400, detail="'diversity' must be between 0 and 1")
         
+        # One consistent view of the world for every part of the response
+        snapshot = take_snapshot()
+
+        # Identical requests on an unchanged world are answered from memory,
+        # unless the client sends Cache-Control: no-cache (or no-store).
+        use_cache = simulation_cache.enabled and not _cache_opt_out(cache_control)
+        key = request_key({
+            "src": src,
+            "dst": dst,
+            "parameters": payload.get("parameters", {}),
+            "mode": payload.get("mode"),
+            "cargo_manifest": payload.get("cargo_manifest"),
+            "include_frontier": bool(payload.get("include_frontier")),
+            "k": k,
+            "diversity": diversity,
+        })
+        if use_cache:
+            cached = simulation_cache.get(key, snapshot.versions)
+            if cached is not None:
+                response.headers["X-Cache"] = "HIT"
+                return cached
+
         # Get three route options: cheapest, fastest, most secure
-        options = {}
-        
-        for opt_type in ["cost", "time", "risk"]:
-            result = simulate_scenario(
-                src,
-                dst,
-                payload.get("parameters", {}),
-                payload.get("mode"),
-                payload.get("cargo_manifest"),
-                optimization=opt_type,
-            )
-            if result:
-                options[opt_type] = result
+        results, frontier = simulate_scenario_options(
+            src,
+            dst,
+            payload.get("parameters", {}),
+            payload.get("mode"),
+            payload.get("cargo_manifest"),
+            snapshot=snapshot,
+            include_frontier=bool(payload.get("include_frontier")),
+        )
+        options = {opt_type: result for opt_type, result in results.items() if result}
         
         if not options:
             raise HTTPException(status_code=404, detail="No viable route found")
         
         # Return all three options with labels
-        return {
+        body = {
             "cheapest": options.get("cost"),
             "fastest": options.get("time"),
             "most_secure": options.get("risk"),
         }
+        if payload.get("include_frontier"):
+            body["frontier"] = frontier
+        if k > 1:
+            alternatives = simulate_route_alternatives(
+                src,
+                dst,
+                k,
+                payload.get("parameters", {}),
+                payload.get("mode"),
+                payload.get("cargo_manifest"),
+                diversity=diversity,
+                snapshot=snapshot,
+            )
+            body["alternatives"] = {
+                "cheapest": alternatives["cost"],
+                "fastest": alternatives["time"],
+                "most_secure": alternatives["risk"],
+            }
+        if use_cache:
+            simulation_cache.put(key, snapshot.versions, body)
+        response.headers["X-Cache"] = "MISS" if use_cache else "BYPASS"
+        return body
     except HTTPException:
         raise
     except Exception as e:
@@ -407,29 +482,93 @@ def api_simulate(payload: dict):
         print(error_detail)  # Log to console for debugging
         raise HTTPException(status_code=500, detail=error_detail)
 
-import shutil
-from pathlib import Path
+@app.get("/simulate/cache")
+def api_simulate_cache_stats():
+    return simulation_cache.stats()
+
+@app.post("/simulate/batch")
+def api_simulate_batch(payload: dict):
+    lanes = payload.get("lanes")
+    if not isinstance(lanes, list) or not lanes:
+        raise HTTPException(status_code=400, detail="Missing required field: 'lanes' (list of {src, dst})")
+    optimization = payload.get("optimization", "cost")
+    if optimization not in ("cost", "time", "risk"):
+        raise HTTPException(status_code=400, detail="optimization must be one of ['cost', 'risk', 'time']")
+
+    # A lane that fails gets the error /simulate would have returned for it;
+    # the other lanes are still answered.
+    results = [None] * len(lanes)
+    requests, positions = [], []
+    for idx, lane in enumerate(lanes):
+        if not isinstance(lane, dict) or not lane.get("src") or not lane.get("dst"):
+            results[idx] = _batch_error(400, f"Lane {idx} needs 'src' and 'dst'")
+            continue
+        requests.append((lane["src"], lane["dst"], lane.get("cargo_manifest"), lane.get("parameters", {})))
+        positions.append(idx)
+
+    simulated = simulate_many(requests, payload.get("mode"), optimization, return_exceptions=True)
+    for idx, result in zip(positions, simulated):
+        if isinstance(result, Exception):
+            results[idx] = _batch_error(500, f"{type(result).__name__}: {result}")
+        elif result is None:
+            results[idx] = _batch_error(404, "No viable route found")
+        else:
+            results[idx] = result
+    return {"results": results}
+
+
+def _batch_error(status_code: int, detail: str) -> dict:
+    return {"error": {"status_code": status_code, "detail": detail}}
+
+@app.post("/reachability")
+def api_reachability(payload: dict):
+    src = payload.get("src")
+    if not src:
+        raise HTTPException(status_code=400, detail="Missing required field: 'src' (source country)")
+    budgets = {}
+    for key in ("max_cost", "max_time", "max_risk"):
+        if payload.get(key) is not None:
+            try:
+                budgets[key] = float(payload[key])
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail=f"{key} must be a number")
+    optimization = payload.get("optimization", "cost")
+    if optimization not in ("cost", "time", "risk"):
+        raise HTTPException(status_code=400, detail="optimization must be one of ['cost', 'risk', 'time']")
+
+    result = find_reachable(src, optimization=optimization, cargo_manifest=payload.get("cargo_manifest"), **budgets)
+    if not result["reachable"]:
+        raise HTTPException(status_code=404, detail=f"Unknown country '{src}'")
+    return {"source": src, **budgets, **result}
+
+@app.post("/distances")
+def api_distances(payload: dict | None = None):
+    payload = payload or {}
+    objective = payload.get("objective", "cost")
+    if objective not in ("cost", "time", "risk"):
+        raise HTTPException(status_code=400, detail="objective must be one of ['cost', 'risk', 'time']")
+    sources = payload.get("sources")
+    destinations = payload.get("destinations")
+    for field, value in (("sources", sources), ("destinations", destinations)):
+        if value is not None and not isinstance(value, list):
+            raise HTTPException(status_code=400, detail=f"{field} must be a list of countries")
+
+    return {"objective": objective, "distances": distance_matrix(sources, destinations, objective)}
+
+from managers.data_manager import reset_to_defaults
 
 @app.post("/reset")
 def reset_database():
-    base = Path(__file__).resolve().parent / "database"
-    defaults = base / "defaults"
-
     # overwrite live JSON files with defaults
-    shutil.copy(defaults / "countries.json", base / "countries.json")
-    shutil.copy(defaults / "commodities.json", base / "commodities.json")
-    shutil.copy(defaults / "routes.json", base / "routes.json")
-    shutil.copy(defaults / "factors.json", base / "factors.json")
-    shutil.copy(defaults / "alliances.json", base / "alliances.json")
-    shutil.copy(defaults / "treaties.json", base / "treaties.json")
+    reset_to_defaults()
 
     return {"status": "reset_complete"}
 
-from managers.network_manager import build_network
+from managers.network_manager import get_network
 
 @app.get("/graph")
 def get_graph():
-    G = build_network()
+    G = get_network()
     
     edges = []
     for u, v, d in G.edges(data=True):
@@ -1,10 +1,10 @@
-from managers.data_manager import load_json, save_json
+from managers.data_manager import load_json, read_json, save_json
 
 FILE = "alliances.json"
 
 
 def get_alliances():
-    return load_json(FILE)
+    return read_json(FILE)
 
 
 def add_alliance(payload):
@@ -1,10 +1,10 @@
-from managers.data_manager import load_json, save_json
+from managers.data_manager import load_json, read_json, save_json
 
 FILE = "commodities.json"
 
 
 def get_commodities():
-    return load_json(FILE)
+    return read_json(FILE)
 
 
 def _parse_payload(payload: dict):
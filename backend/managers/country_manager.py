@@ -1,17 +1,12 @@
-from managers.data_manager import load_json, save_json
+from managers.data_manager import read_json, save_countries
 
 FILE = "countries.json"
 
 def get_countries():
-    return load_json(FILE)
+    return read_json(FILE)
 
 def add_country(country):
-    data = load_json(FILE)
-    data[country["name"]] = country
-    save_json(FILE, data)
+    save_countries(FILE, {country["name"]: country})
 
 def delete_country(name):
-    data = load_json(FILE)
-    if name in data:
-        del data[name]
-    save_json(FILE, data)
+    save_countries(FILE, {name: None})
@@ -1,10 +1,64 @@
-import json
-from pathlib import Path
+import copy
+
+from managers.world_store import BASE, world_store
+
+DATABASE_FILES = (
+    "countries.json",
+    "commodities.json",
+    "routes.json",
+    "factors.json",
+    "alliances.json",
+    "treaties.json",
+)
+
+
+def read_json(file):
+    """Shared, cached view of a database file. Callers must not mutate it."""
+    return world_store.read(file)
+
+
+def read_many(files):
+    """Shared views of several database files taken at one instant, as
+    {file: (document, version)}. Callers must not mutate them."""
+    return world_store.read_many(files)
 
-BASE = Path(__file__).resolve().parent.parent / "database"
 
 def load_json(file):
-    return json.load(open(BASE / file, "r"))
+    """Private copy of a database file that the caller may mutate and save."""
+    return copy.deepcopy(world_store.read(file))
+
 
 def save_json(file, data):
-    json.dump(data, open(BASE / file, "w"), indent=4)
\ No newline at end of file
+    world_store.write(file, data)
+
+
+def save_routes(file, changes):
+    """Upsert or delete (``None``) individual routes keyed by (origin, destination).
+
+    Returns the (previous, updated) routes documents.
+    """
+    return world_store.write_routes(file, changes)
+
+
+def save_countries(file, changes):
+    """Upsert or delete (``None``) individual countries keyed by name.
+
+    Returns the (previous, updated) countries documents.
+    """
+    return world_store.write_countries(file, changes)
+
+
+def production_index(file="countries.json"):
+    """Shared ``ProductionIndex`` of a countries file. Callers must not mutate it."""
+    return world_store.production_index(file)
+
+
+def copy_route(routes, origin, destination):
+    """Private copy of one route from a shared routes document, or None."""
+    route = routes.get(origin, {}).get(destination)
+    return copy.deepcopy(route) if route is not None else None
+
+
+def reset_to_defaults():
+    for file in DATABASE_FILES:
+        save_json(file, load_json(f"defaults/{file}"))
@@ -1,11 +1,37 @@
-from managers.data_manager import load_json, save_json
+import threading
+
+from managers.data_manager import load_json, read_json, save_json
 
 FILE = "factors.json"
 DEFAULT_FILE = "defaults/factors.json"
 
+_lock = threading.Lock()
+_factors_doc = None
+_version = 0
+
 
 def get_factors():
-    return load_json(FILE)
+    return read_json(FILE)
+
+
+def get_factors_versioned():
+    """The shared factors document and its version.
+
+    The version increases whenever the cached document is replaced: saves from
+    this module or the geopolitics mutators, a reset, or an external edit of
+    factors.json. Derived state can use it as its cache key.
+    """
+    global _factors_doc, _version
+    factors = read_json(FILE)
+    with _lock:
+        if factors is not _factors_doc:
+            _factors_doc = factors
+            _version += 1
+        return factors, _version
+
+
+def factors_version():
+    return get_factors_versioned()[1]
 
 
 def add_factor(factor):
@@ -54,5 +80,4 @@ def set_all_factors(effect: float, strength: float):
 
 def save_factors(factors):
     save_json(FILE, factors)
-    save_json(FILE, data)
-    return data
+    return factors
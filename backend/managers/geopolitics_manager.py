@@ -1,4 +1,6 @@
-from managers.data_manager import load_json, save_json
+from managers import factors_manager
+from managers.data_manager import copy_route, load_json, read_json, save_routes
+from managers.network_manager import get_network, on_routes_changed
 from utils.mode_profiles import VALID_ROUTE_MODES, MODE_PROFILES
 
 FILE = "routes.json"
@@ -7,13 +9,19 @@ FACTORS_FILE = "factors.json"
 
 
 def load_factors():
-    """Load global factors from factors.json"""
+    """Load a mutable copy of the global factors from factors.json"""
     return load_json(FACTORS_FILE)
 
 
 def save_factors(factors):
-    """Save global factors to factors.json"""
-    save_json(FACTORS_FILE, factors)
+    """Save global factors to factors.json, bumping the factor version"""
+    factors_manager.save_factors(factors)
+
+
+def _save_routes(changes):
+    """Persist route changes and patch the cached network graph."""
+    previous, updated = save_routes(FILE, changes)
+    on_routes_changed(previous, updated, changes)
 
 
 def _clamp(value: float, min_value: float, max_value: float) -> float:
@@ -21,49 +29,76 @@ def _clamp(value: float, min_value: float, max_value: float) -> float:
 
 
 def _mutate_route(a: str, b: str, mutator):
-    data = load_json(FILE)
+    data = read_json(FILE)
     
     # Check if direct route exists
-    if a in data and b in data[a]:
-        mutator(data[a][b])
-        save_json(FILE, data)
+    route = copy_route(data, a, b)
+    if route is not None:
+        mutator(route)
+        _save_routes({(a, b): route})
         return True
     
     # No direct route - find indirect path and apply to all segments
     import networkx as nx
-    G = nx.DiGraph()
-    for src in data:
-        for dst in data[src]:
-            G.add_edge(src, dst)
+    from simulation.csr_graph import csr_for
+    from utils.settings import ROUTING_BACKEND
+    G = get_network()
     
     try:
         # Find shortest path
-        path = nx.shortest_path(G, a, b)
+        if ROUTING_BACKEND == "csr":
+            path = csr_for(G).bfs_path(a, b)
+            if path is None:
+                raise nx.NetworkXNoPath(f"No path between {a} and {b}.")
+        else:
+            path = nx.shortest_path(G, a, b)
         # Apply mutation to each segment in the path
+        changes = {}
         for i in range(len(path) - 1):
             src, dst = path[i], path[i + 1]
-            if src in data and dst in data[src]:
-                mutator(data[src][dst])
-        save_json(FILE, data)
+            route = copy_route(data, src, dst)
+            if route is not None:
+                mutator(route)
+                changes[(src, dst)] = route
+        _save_routes(changes)
         return True
     except (nx.NetworkXNoPath, nx.NodeNotFound):
         return False
 
 
 def _mutate_route_guarded(a: str, b: str, predicate, mutator):
-    data = load_json(FILE)
-    if a not in data or b not in data[a]:
+    route = copy_route(read_json(FILE), a, b)
+    if route is None:
         return False
 
-    route = data[a][b]
     if predicate and not predicate(route):
         return False
 
     mutator(route)
-    save_json(FILE, data)
+    _save_routes({(a, b): route})
     return True
 
 
+def _mutate_country_routes(country: str, mutator) -> int:
+    """Apply ``mutator`` to every route from or to ``country``; returns the count."""
+    data = read_json(FILE)
+    changes = {}
+
+    for origin in data:
+        if country in data[origin]:
+            changes[(origin, country)] = copy_route(data, origin, country)
+
+    if country in data:
+        for dest in data[country]:
+            changes[(country, dest)] = copy_route(data, country, dest)
+
+    for route in changes.values():
+        mutator(route)
+    if changes:
+        _save_routes(changes)
+    return len(changes)
+
+
 def _ensure_base(route: dict):
     if "base" not in route or not isinstance(route["base"], dict):
         route["base"] = {
@@ -74,38 +109,31 @@ def _ensure_base(route: dict):
 
 
 def _restore_route_from_defaults(a: str, b: str) -> bool:
-    defaults = load_json(DEFAULT_FILE)
-    if a not in defaults or b not in defaults[a]:
+    route = copy_route(read_json(DEFAULT_FILE), a, b)
+    if route is None:
         return False
 
-    data = load_json(FILE)
-    if a not in data:
-        data[a] = {}
-    data[a][b] = defaults[a][b]
-    save_json(FILE, data)
+    _save_routes({(a, b): route})
     return True
 
 
 def declare_war(a, b):
-    from managers.factors_manager import get_factors, save_factors
-    
     # Delete routes between warring nations
-    data = load_json(FILE)
-    modified = False
+    data = read_json(FILE)
+    severed = {}
 
     if a in data and b in data[a]:
-        del data[a][b]
-        modified = True
+        severed[(a, b)] = None
 
     if b in data and a in data[b]:
-        del data[b][a]
-        modified = True
+        severed[(b, a)] = None
 
+    modified = bool(severed)
     if modified:
-        save_json(FILE, data)
+        _save_routes(severed)
     
     # Set extreme negative factors to reflect war conditions
-    factors = get_factors()
+    factors = load_factors()
     factors["Border Tension Pressure"] = {"effect": -1.0, "strength": 1.0}
     factors["Diplomatic Alignment"] = {"effect": -1.0, "strength": 1.0}
     factors["Cyber Threat Level"] = {"effect": -0.9, "strength": 1.0}
@@ -287,7 +315,7 @@ def set_trade_route_mode(a, b, mode):
         return False
 
     profile = MODE_PROFILES[mode]
-    data = load_json(FILE)
+    data = read_json(FILE)
     
     # If route doesn't exist, create it with default values based on mode
     if a not in data or b not in data[a]:
@@ -299,14 +327,10 @@ def set_trade_route_mode(a, b, mode):
         else:  # land
             base_cost, base_time, base_risk = 8.0, 10.0, 0.12
         
-        if a not in data:
-            data[a] = {}
-        if b not in data:
-            data[b] = {}
-        
         # Create bidirectional route
+        created = {}
         for origin, dest in [(a, b), (b, a)]:
-            data[origin][dest] = {
+            created[(origin, dest)] = {
                 "cost": base_cost * profile["cost_scale"],
                 "time": base_time * profile["time_scale"],
                 "risk": _clamp(base_risk + profile["risk_delta"], 0, 1),
@@ -318,7 +342,7 @@ def set_trade_route_mode(a, b, mode):
                 }
             }
         
-        save_json(FILE, data)
+        _save_routes(created)
         return True
     
     # Route exists, update it
@@ -373,29 +397,12 @@ def trigger_famine(country: str, severity: float) -> bool:
         save_factors("factors.json", factors)
     
     # Impact all routes from/to this country
-    data = load_json(FILE)
-    impact_count = 0
-    
-    for origin in data:
-        if country in data[origin]:
-            route = data[origin][country]
-            route["cost"] *= (1 + severity / 100)
-            route["time"] *= (1 + severity / 150)
-            route["risk"] = _clamp(route["risk"] + severity / 200, 0, 1)
-            impact_count += 1
-    
-    if country in data:
-        for dest in data[country]:
-            route = data[country][dest]
-            route["cost"] *= (1 + severity / 100)
-            route["time"] *= (1 + severity / 150)
-            route["risk"] = _clamp(route["risk"] + severity / 200, 0, 1)
-            impact_count += 1
-    
-    if impact_count > 0:
-        save_json(FILE, data)
-        return True
-    return False
+    def mutate(route):
+        route["cost"] *= (1 + severity / 100)
+        route["time"] *= (1 + severity / 150)
+        route["risk"] = _clamp(route["risk"] + severity / 200, 0, 1)
+
+    return _mutate_country_routes(country, mutate) > 0
 
 
 def trigger_civil_war(country: str, intensity: float) -> bool:
@@ -418,29 +425,12 @@ def trigger_civil_war(country: str, intensity: float) -> bool:
     save_factors("factors.json", factors)
     
     # Severe impact on all routes from/to this country
-    data = load_json(FILE)
-    impact_count = 0
-    
-    for origin in data:
-        if country in data[origin]:
-            route = data[origin][country]
-            route["cost"] *= (1 + intensity / 40)  # 2.5x at max intensity
-            route["time"] *= (1 + intensity / 60)  # 1.67x at max intensity
-            route["risk"] = _clamp(route["risk"] + intensity / 100 + 0.2, 0, 1)  # +20% base risk
-            impact_count += 1
-    
-    if country in data:
-        for dest in data[country]:
-            route = data[country][dest]
-            route["cost"] *= (1 + intensity / 40)
-            route["time"] *= (1 + intensity / 60)
-            route["risk"] = _clamp(route["risk"] + intensity / 100 + 0.2, 0, 1)
-            impact_count += 1
-    
-    if impact_count > 0:
-        save_json(FILE, data)
-        return True
-    return False
+    def mutate(route):
+        route["cost"] *= (1 + intensity / 40)  # 2.5x at max intensity
+        route["time"] *= (1 + intensity / 60)  # 1.67x at max intensity
+        route["risk"] = _clamp(route["risk"] + intensity / 100 + 0.2, 0, 1)  # +20% base risk
+
+    return _mutate_country_routes(country, mutate) > 0
 
 
 def trigger_natural_disaster(country: str, disaster_type: str, magnitude: float) -> bool:
@@ -459,10 +449,6 @@ def trigger_natural_disaster(country: str, disaster_type: str, magnitude: float)
         factors["Climate Shock Exposure"]["strength"] = min(1.0, magnitude / 55.0)
         save_factors("factors.json", factors)
     
-    # Impact all routes from/to this country
-    data = load_json(FILE)
-    impact_count = 0
-    
     # Different disaster types have different impact profiles
     cost_mult = 1.0
     time_mult = 1.0
@@ -485,24 +471,10 @@ def trigger_natural_disaster(country: str, disaster_type: str, magnitude: float)
         time_mult = 1 + magnitude / 60
         risk_add = magnitude / 150
     
-    for origin in data:
-        if country in data[origin]:
-            route = data[origin][country]
-            route["cost"] *= cost_mult
-            route["time"] *= time_mult
-            route["risk"] = _clamp(route["risk"] + risk_add, 0, 1)
-            impact_count += 1
-    
-    if country in data:
-        for dest in data[country]:
-            route = data[country][dest]
-            route["cost"] *= cost_mult
-            route["time"] *= time_mult
-            route["risk"] = _clamp(route["risk"] + risk_add, 0, 1)
-            impact_count += 1
-    
-    if impact_count > 0:
-        save_json(FILE, data)
-        return True
-    return False
+    # Impact all routes from/to this country
+    def mutate(route):
+        route["cost"] *= cost_mult
+        route["time"] *= time_mult
+        route["risk"] = _clamp(route["risk"] + risk_add, 0, 1)
 
+    return _mutate_country_routes(country, mutate) > 0
@@ -1,20 +1,198 @@
+"""
+Route network graph, cached and patched edge by edge.
+
+``get_network()`` returns one shared ``nx.DiGraph`` built from routes.json.
+Route mutations report the edges they touched through ``on_routes_changed``,
+which patches those edges instead of rebuilding the graph. Patches are
+applied to a copy-on-write graph that is then swapped in: it shares every
+adjacency row with the previous graph except the rows of the countries the
+patch touches (``copy_on_write`` / ``own_rows``). A graph handed out is
+never modified, so a request holding one (see
+``simulation.world_snapshot``) sees one routes state throughout. Any routes
+change the hooks did not see (reset, external edit) triggers a full rebuild
+on the next read. Every country in a built graph has a ``country_ids`` id.
+
+``graph_version()`` increases every time the graph changes and can be used
+as a cache key by anything derived from the graph. The shared graph also
+carries its version in ``G.graph["version"]``, and ``edge_changes_since``
+tells derived caches which edges to patch to catch up;
+``add_routes_listener`` lets them do so as soon as a patch lands.
+"""
+
+import threading
+from collections import deque
+
 import networkx as nx
-from managers.data_manager import load_json
+from managers.data_manager import read_json
+from managers.world_store import country_ids
+
+FILE = "routes.json"
+
+EDGE_LOG_SIZE = 1024
+
+_lock = threading.RLock()
+_graph = None
+_routes_doc = None
+_version = 0
+# (version, edges) for every patch since the last rebuild; complete from _log_floor on.
+_edge_log = deque()
+_log_floor = 0
+# Called with no arguments after every patch on_routes_changed applies.
+_listeners = []
+
+
+def _edge_attrs(vals):
+    # Use current (possibly modified) values, not base values
+    # This ensures geopolitical actions (tariffs, sanctions, etc.) are reflected
+    return {
+        "cost": vals["cost"],
+        "time": vals["time"],
+        "risk": vals["risk"],
+        "mode": vals.get("mode", "land"),
+    }
 
-def build_network():
-    routes = load_json("routes.json")
+
+def copy_on_write(G):
+    """Graph sharing ``G``'s node attributes, adjacency rows and edge data.
+
+    Only the outer node dicts are copied, so this is O(V) pointer copies
+    instead of the O(V + E) of ``G.copy()``. Before changing it, call
+    ``own_rows`` for the nodes involved: edges may only be changed between
+    owned nodes, and a node only removed once its neighbours are owned.
+    """
+    H = G.__class__()
+    H.graph.update(G.graph)
+    H._node = dict(G._node)
+    H._adj = dict(G._adj)
+    H._pred = dict(G._pred)
+    return H
+
+
+def own_rows(H, G, nodes):
+    """Give the copy-on-write graph ``H`` of ``G`` private successor and
+    predecessor rows for ``nodes``, and private data for the edges between
+    owned nodes."""
+    def owned(node):
+        return H._adj[node] is not G._adj.get(node)
+
+    fresh = [node for node in nodes if node in H._adj and not owned(node)]
+    for node in fresh:
+        H._adj[node] = dict(H._adj[node])
+        H._pred[node] = dict(H._pred[node])
+    for node in fresh:
+        edges = [(node, v) for v in H._adj[node]] + [(u, node) for u in H._pred[node]]
+        for u, v in edges:
+            data = H._adj[u][v]
+            if owned(u) and owned(v) and data is G._adj.get(u, {}).get(v):
+                data = dict(data)
+                H._adj[u][v] = data
+                H._pred[v][u] = data
+
+
+def build_network(routes=None):
+    """Build a fresh graph from a routes document (routes.json by default)."""
+    if routes is None:
+        routes = read_json(FILE)
     G = nx.DiGraph()
 
     for src in routes:
         for dst, vals in routes[src].items():
-            # Use current (possibly modified) values, not base values
-            # This ensures geopolitical actions (tariffs, sanctions, etc.) are reflected
-            G.add_edge(
-                src,
-                dst,
-                cost=vals["cost"],
-                time=vals["time"],
-                risk=vals["risk"],
-                mode=vals.get("mode", "land")
-            )
+            G.add_edge(src, dst, **_edge_attrs(vals))
+    # Routes loaded from disk were never written through the store.
+    for country in G:
+        country_ids.intern(country)
     return G
+
+
+def get_network():
+    """Shared route graph reflecting the current routes.json. Do not mutate it."""
+    global _graph, _routes_doc, _version, _log_floor
+    routes = read_json(FILE)
+    if _graph is not None and routes is _routes_doc:
+        return _graph
+
+    with _lock:
+        routes = read_json(FILE)
+        if _graph is None or routes is not _routes_doc:
+            _version += 1
+            G = build_network(routes)
+            G.graph["version"] = _version
+            _graph = G
+            _routes_doc = routes
+            _edge_log.clear()
+            _log_floor = _version
+        return _graph
+
+
+def network_for(routes):
+    """Route graph for the routes document ``routes``: the shared graph while
+    it reflects that document, otherwise a private, unversioned build."""
+    get_network()
+    with _lock:
+        if routes is _routes_doc:
+            return _graph
+    return build_network(routes)
+
+
+def graph_version():
+    """Monotonic version of the shared graph; bumps on every patch or rebuild."""
+    get_network()
+    return _version
+
+
+def edge_changes_since(version):
+    """Edges changed after ``version``, or None if the graph was rebuilt since."""
+    with _lock:
+        if version < _log_floor:
+            return None
+        changed = set()
+        for logged_version, edges in _edge_log:
+            if logged_version > version:
+                changed.update(edges)
+        return changed
+
+
+def on_routes_changed(previous, updated, changes):
+    """Patch the cached graph after ``save_routes`` replaced ``previous`` with ``updated``.
+
+    ``changes`` maps (origin, destination) to the new route dict, or None for
+    a removed route. If the graph does not reflect ``previous`` it is left
+    to be rebuilt on the next read.
+    """
+    global _graph, _routes_doc, _version, _log_floor
+    with _lock:
+        if _graph is None or _routes_doc is not previous:
+            return
+
+        G = copy_on_write(_graph)
+        own_rows(G, _graph, {node for edge in changes for node in edge})
+
+        for (origin, destination), route in changes.items():
+            if route is None:
+                if G.has_edge(origin, destination):
+                    G.remove_edge(origin, destination)
+                    # A fresh build only contains nodes that have routes.
+                    for node in (origin, destination):
+                        if G.degree(node) == 0:
+                            G.remove_node(node)
+            elif G.has_edge(origin, destination):
+                G[origin][destination].update(_edge_attrs(route))
+            else:
+                G.add_edge(origin, destination, **_edge_attrs(route))
+
+        _version += 1
+        G.graph["version"] = _version
+        _graph = G
+        _routes_doc = updated
+        _edge_log.append((_version, tuple(changes)))
+        if len(_edge_log) > EDGE_LOG_SIZE:
+            _log_floor = _edge_log.popleft()[0]
+    for callback in _listeners:
+        callback()
+
+
+def add_routes_listener(callback):
+    """Call ``callback()`` after each patch ``on_routes_changed`` applies,
+    outside the graph lock, so state derived from the graph can catch up
+    with the changed edges (``edge_changes_since``) right away."""
+    _listeners.append(callback)
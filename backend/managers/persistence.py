@@ -0,0 +1,138 @@
+"""
+Write-behind persistence for the JSON database.
+
+Saves are queued per collection and flushed by a background thread. Repeated
+saves of the same collection inside one flush window are coalesced into a
+single write of the latest document. Every flush goes to a temp file in the
+same directory, is fsynced, and then renamed over the target, so a crash can
+never leave a torn file behind.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write_json(target: Path, data: Any) -> None:
+    """Write ``data`` to ``target`` via temp file + fsync + rename."""
+    target = Path(target)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=target.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, indent=4)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_name, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # Persist the rename itself. Directories cannot be opened on Windows.
+    try:
+        dir_fd = os.open(target.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class JsonWriter:
+    """Coalescing background writer. ``flush_interval <= 0`` writes synchronously."""
+
+    def __init__(
+        self,
+        base: Path,
+        flush_interval: float,
+        on_flushed: Optional[Callable[[str, Any], None]] = None,
+    ):
+        self.base = Path(base)
+        self.flush_interval = flush_interval
+        self.on_flushed = on_flushed
+        self._cond = threading.Condition()
+        self._dirty: Dict[str, Any] = {}
+        self._in_flight: Set[str] = set()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, name: str, data: Any) -> None:
+        if self.flush_interval <= 0 or self._closed:
+            with self._cond:
+                self._dirty[name] = data
+            self.flush()
+            return
+
+        with self._cond:
+            self._dirty[name] = data
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="json-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def is_pending(self, name: str) -> bool:
+        """True while ``name`` has a save that has not reached disk yet."""
+        with self._cond:
+            return name in self._dirty or name in self._in_flight
+
+    def flush(self) -> None:
+        """Write every dirty collection now, on the calling thread."""
+        with self._write_lock:
+            with self._cond:
+                batch = self._dirty
+                self._dirty = {}
+                self._in_flight.update(batch)
+            written = []
+            try:
+                for name, data in batch.items():
+                    atomic_write_json(self.base / name, data)
+                    written.append(name)
+                    if self.on_flushed:
+                        self.on_flushed(name, data)
+            finally:
+                with self._cond:
+                    # Requeue anything that failed unless a newer save superseded it.
+                    for name, data in batch.items():
+                        if name not in written:
+                            self._dirty.setdefault(name, data)
+                    self._in_flight.difference_update(batch)
+
+    def close(self) -> None:
+        """Stop the background thread after a final flush."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._dirty and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Let a burst of saves settle before touching the disk.
+                deadline = time.monotonic() + self.flush_interval
+                remaining = self.flush_interval
+                while remaining > 0 and not self._closed:
+                    self._cond.wait(remaining)
+                    remaining = deadline - time.monotonic()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("json-writer: flush failed")
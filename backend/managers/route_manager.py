@@ -1,37 +1,36 @@
-from managers.data_manager import load_json, save_json
+from managers.data_manager import read_json, save_routes
+from managers.network_manager import on_routes_changed
 
 FILE = "routes.json"
 
 
 def get_routes():
-    return load_json(FILE)
+    return read_json(FILE)
 
 
 def add_route(route):
-    data = load_json(FILE)
     src = route["origin"]
     dst = route["destination"]
 
-    if src not in data:
-        data[src] = {}
-
     cost = route["cost"]
     time = route["time"]
     risk = route["risk"]
     mode = route.get("mode", "land")
     base = route.get("base") or {"cost": cost, "time": time, "risk": risk}
 
-    data[src][dst] = {
-        "cost": cost,
-        "time": time,
-        "risk": risk,
-        "mode": mode,
-        "base": base,
+    changes = {
+        (src, dst): {
+            "cost": cost,
+            "time": time,
+            "risk": risk,
+            "mode": mode,
+            "base": base,
+        }
     }
-    save_json(FILE, data)
+    on_routes_changed(*save_routes(FILE, changes), changes)
 
 def delete_route(origin, destination):
-    data = load_json(FILE)
+    data = read_json(FILE)
     if origin in data and destination in data[origin]:
-        del data[origin][destination]
-    save_json(FILE, data)
+        changes = {(origin, destination): None}
+        on_routes_changed(*save_routes(FILE, changes), changes)
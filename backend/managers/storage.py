@@ -0,0 +1,382 @@
+"""
+Pluggable storage backends behind the world store.
+
+``JsonBackend`` keeps one pretty-printed JSON file per collection and persists
+through the write-behind ``JsonWriter``. ``SqliteBackend`` keeps the live
+collections in indexed SQLite tables so single-route mutations become
+single-row writes. Seed data under ``defaults/`` is always read from JSON.
+
+Both backends expose the same small surface used by ``WorldStore``:
+``load``, ``stamp``, ``save``, ``save_routes``, ``is_pending``, ``flush`` and
+``close``. ``stamp`` is an opaque value that changes whenever the stored
+collection changes, which is how external edits are detected.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from managers.persistence import JsonWriter
+
+RouteKey = Tuple[str, str]
+FlushCallback = Callable[[str, Any], None]
+
+
+class JsonBackend:
+    name = "json"
+
+    def __init__(self, base: Path, flush_interval: float, on_flushed: Optional[FlushCallback] = None):
+        self.base = Path(base)
+        self.writer = JsonWriter(self.base, flush_interval, on_flushed=on_flushed)
+
+    def handles(self, name: str) -> bool:
+        return True
+
+    def load(self, name: str) -> Any:
+        with open(self.base / name, "r", encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def stamp(self, name: str) -> Optional[Hashable]:
+        try:
+            stat = os.stat(self.base / name)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def save(self, name: str, data: Any) -> None:
+        self.writer.submit(name, data)
+
+    def save_routes(self, name: str, data: Dict, changes: Dict[RouteKey, Optional[Dict]]) -> None:
+        # A JSON file can only be rewritten whole; the writer coalesces bursts.
+        self.writer.submit(name, data)
+
+    def is_pending(self, name: str) -> bool:
+        return self.writer.is_pending(name)
+
+    def flush(self) -> None:
+        self.writer.flush()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS revisions (
+    collection TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS routes (
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    cost REAL NOT NULL,
+    time REAL NOT NULL,
+    risk REAL NOT NULL,
+    base_cost REAL,
+    base_time REAL,
+    base_risk REAL,
+    extra TEXT,
+    PRIMARY KEY (origin, destination)
+);
+CREATE INDEX IF NOT EXISTS idx_routes_destination ON routes (destination);
+CREATE INDEX IF NOT EXISTS idx_routes_mode ON routes (mode);
+CREATE TABLE IF NOT EXISTS factors (
+    name TEXT PRIMARY KEY,
+    effect REAL NOT NULL,
+    strength REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS countries (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS production (
+    country TEXT NOT NULL,
+    commodity TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    PRIMARY KEY (country, commodity)
+);
+CREATE INDEX IF NOT EXISTS idx_production_commodity ON production (commodity, quantity);
+CREATE TABLE IF NOT EXISTS commodities (
+    name TEXT PRIMARY KEY,
+    unit_cost REAL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alliances (
+    name TEXT PRIMARY KEY,
+    cohesion REAL,
+    support_multiplier REAL,
+    deterrence REAL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS alliance_members (
+    alliance TEXT NOT NULL,
+    country TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alliance_members_country ON alliance_members (country);
+CREATE TABLE IF NOT EXISTS treaties (
+    name TEXT PRIMARY KEY,
+    stability REAL,
+    enforcement REAL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS treaty_parties (
+    treaty TEXT NOT NULL,
+    country TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_treaty_parties_country ON treaty_parties (country);
+"""
+
+_ROUTE_COLUMNS = {"cost", "time", "risk", "mode", "base"}
+
+
+def _route_row(origin: str, destination: str, route: Dict) -> Tuple:
+    base = route.get("base") if isinstance(route.get("base"), dict) else None
+    extra = {key: value for key, value in route.items() if key not in _ROUTE_COLUMNS}
+    return (
+        origin,
+        destination,
+        route.get("mode", "land"),
+        route["cost"],
+        route["time"],
+        route["risk"],
+        base.get("cost") if base else None,
+        base.get("time") if base else None,
+        base.get("risk") if base else None,
+        json.dumps(extra) if extra else None,
+    )
+
+
+def _route_from_row(row: Tuple) -> Dict:
+    _, _, mode, cost, time, risk, base_cost, base_time, base_risk, extra = row
+    route = {"cost": cost, "time": time, "risk": risk, "mode": mode}
+    if base_cost is not None:
+        route["base"] = {"cost": base_cost, "time": base_time, "risk": base_risk}
+    if extra:
+        route.update(json.loads(extra))
+    return route
+
+
+class SqliteBackend:
+    """Live collections in SQLite. Writes are transactional and synchronous."""
+
+    name = "sqlite"
+    COLLECTIONS = (
+        "routes.json",
+        "factors.json",
+        "countries.json",
+        "commodities.json",
+        "alliances.json",
+        "treaties.json",
+    )
+
+    def __init__(self, path: Path, on_flushed: Optional[FlushCallback] = None):
+        self.path = Path(path)
+        self.on_flushed = on_flushed
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def handles(self, name: str) -> bool:
+        return name in self.COLLECTIONS
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM revisions").fetchone()[0] == 0
+
+    # ------------------------------------------------------------------ reads
+
+    def load(self, name: str) -> Any:
+        with self._lock:
+            loader = getattr(self, f"_load_{name[:-len('.json')]}")
+            return loader(self._conn)
+
+    def stamp(self, name: str) -> Optional[Hashable]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT revision FROM revisions WHERE collection = ?", (name,)
+            ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _load_routes(conn) -> Dict:
+        routes: Dict[str, Dict] = {}
+        for row in conn.execute("SELECT * FROM routes ORDER BY rowid"):
+            routes.setdefault(row[0], {})[row[1]] = _route_from_row(row)
+        return routes
+
+    @staticmethod
+    def _load_factors(conn) -> Dict:
+        return {
+            name: {"effect": effect, "strength": strength}
+            for name, effect, strength in conn.execute(
+                "SELECT name, effect, strength FROM factors ORDER BY rowid"
+            )
+        }
+
+    @staticmethod
+    def _load_documents(conn, table: str) -> Dict:
+        return {
+            name: json.loads(data)
+            for name, data in conn.execute(f"SELECT name, data FROM {table} ORDER BY rowid")
+        }
+
+    def _load_countries(self, conn) -> Dict:
+        return self._load_documents(conn, "countries")
+
+    def _load_commodities(self, conn) -> Dict:
+        return self._load_documents(conn, "commodities")
+
+    def _load_alliances(self, conn) -> Dict:
+        return self._load_documents(conn, "alliances")
+
+    def _load_treaties(self, conn) -> Dict:
+        return self._load_documents(conn, "treaties")
+
+    # ----------------------------------------------------------------- writes
+
+    def _bump(self, conn, name: str) -> None:
+        conn.execute(
+            "INSERT INTO revisions (collection, revision) VALUES (?, 1) "
+            "ON CONFLICT(collection) DO UPDATE SET revision = revision + 1",
+            (name,),
+        )
+
+    def _transaction(self, name: str, data: Any, writer: Callable) -> None:
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                writer(conn)
+                self._bump(conn, name)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if self.on_flushed:
+            self.on_flushed(name, data)
+
+    def save(self, name: str, data: Any) -> None:
+        table = name[:-len(".json")]
+        self._transaction(name, data, lambda conn: getattr(self, f"_replace_{table}")(conn, data))
+
+    def save_routes(self, name: str, data: Dict, changes: Dict[RouteKey, Optional[Dict]]) -> None:
+        def write(conn):
+            for (origin, destination), route in changes.items():
+                if route is None:
+                    conn.execute(
+                        "DELETE FROM routes WHERE origin = ? AND destination = ?",
+                        (origin, destination),
+                    )
+                    continue
+                row = _route_row(origin, destination, route)
+                updated = conn.execute(
+                    "UPDATE routes SET mode = ?, cost = ?, time = ?, risk = ?, base_cost = ?, "
+                    "base_time = ?, base_risk = ?, extra = ? WHERE origin = ? AND destination = ?",
+                    row[2:] + row[:2],
+                ).rowcount
+                if not updated:
+                    conn.execute("INSERT INTO routes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+        self._transaction(name, data, write)
+
+    @staticmethod
+    def _replace_routes(conn, data: Dict) -> None:
+        conn.execute("DELETE FROM routes")
+        conn.executemany(
+            "INSERT INTO routes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                _route_row(origin, destination, route)
+                for origin, targets in data.items()
+                for destination, route in targets.items()
+            ),
+        )
+
+    @staticmethod
+    def _replace_factors(conn, data: Dict) -> None:
+        conn.execute("DELETE FROM factors")
+        conn.executemany(
+            "INSERT INTO factors (name, effect, strength) VALUES (?, ?, ?)",
+            ((name, float(vals["effect"]), float(vals["strength"])) for name, vals in data.items()),
+        )
+
+    @staticmethod
+    def _replace_countries(conn, data: Dict) -> None:
+        conn.execute("DELETE FROM countries")
+        conn.execute("DELETE FROM production")
+        conn.executemany(
+            "INSERT INTO countries (name, data) VALUES (?, ?)",
+            ((name, json.dumps(country)) for name, country in data.items()),
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO production (country, commodity, quantity) VALUES (?, ?, ?)",
+            (
+                (name, commodity, quantity)
+                for name, country in data.items()
+                for commodity, quantity in (country.get("production") or {}).items()
+            ),
+        )
+
+    @staticmethod
+    def _replace_commodities(conn, data: Dict) -> None:
+        conn.execute("DELETE FROM commodities")
+        conn.executemany(
+            "INSERT INTO commodities (name, unit_cost, data) VALUES (?, ?, ?)",
+            ((name, vals.get("unit_cost"), json.dumps(vals)) for name, vals in data.items()),
+        )
+
+    @staticmethod
+    def _replace_alliances(conn, data: Dict) -> None:
+        conn.execute("DELETE FROM alliances")
+        conn.execute("DELETE FROM alliance_members")
+        for name, vals in data.items():
+            conn.execute(
+                "INSERT INTO alliances (name, cohesion, support_multiplier, deterrence, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    name,
+                    vals.get("cohesion"),
+                    vals.get("support_multiplier"),
+                    vals.get("deterrence"),
+                    json.dumps(vals),
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO alliance_members (alliance, country) VALUES (?, ?)",
+                ((name, member) for member in vals.get("members", [])),
+            )
+
+    @staticmethod
+    def _replace_treaties(conn, data: Dict) -> None:
+        conn.execute("DELETE FROM treaties")
+        conn.execute("DELETE FROM treaty_parties")
+        for name, vals in data.items():
+            conn.execute(
+                "INSERT INTO treaties (name, stability, enforcement, data) VALUES (?, ?, ?, ?)",
+                (name, vals.get("stability"), vals.get("enforcement"), json.dumps(vals)),
+            )
+            conn.executemany(
+                "INSERT INTO treaty_parties (treaty, country) VALUES (?, ?)",
+                ((name, party) for party in vals.get("parties", [])),
+            )
+
+    def is_pending(self, name: str) -> bool:
+        return False
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def copy_collections(source, target, names=SqliteBackend.COLLECTIONS) -> None:
+    """Copy whole collections from one backend to another (migration/export)."""
+    for name in names:
+        target.save(name, source.load(name))
+    target.flush()
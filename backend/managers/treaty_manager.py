@@ -1,10 +1,10 @@
-from managers.data_manager import load_json, save_json
+from managers.data_manager import load_json, read_json, save_json
 
 FILE = "treaties.json"
 
 
 def get_treaties():
-    return load_json(FILE)
+    return read_json(FILE)
 
 
 def add_treaty(payload):
@@ -0,0 +1,346 @@
+"""
+Process-wide in-memory store for the JSON database.
+
+Every collection (routes.json, factors.json, ...) is parsed once and kept in
+memory. Writes replace the cached document immediately and are persisted by
+the configured storage backend (see ``managers.storage``). Reads only check
+the backend's change stamp every ``STORE_STAT_INTERVAL`` seconds, so an
+external edit is still picked up without the hot path doing any I/O.
+
+Cached documents are shared between callers and must be treated as read-only.
+Writers build a new document (see ``data_manager.load_json``) and hand it to
+``write``, which swaps it in atomically under the store lock.
+
+Country names are interned to small integer ids in ``country_ids`` so the
+routing engines can key their hot-path structures on ints; names are only
+looked up again when a result is returned. Names are interned by the writes
+that introduce them and when the route network is built from the stored
+routes, so a read with an unknown name never grows the table.
+``production_index`` keeps who produces which commodity for sourcing,
+patched on ``write_countries``.
+"""
+
+import atexit
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from managers.storage import JsonBackend, SqliteBackend, copy_collections
+from utils.settings import (
+    SQLITE_PATH,
+    STORAGE_BACKEND,
+    STORE_FLUSH_INTERVAL,
+    STORE_STAT_INTERVAL,
+)
+
+BASE = Path(__file__).resolve().parent.parent / "database"
+
+
+class _Entry:
+    __slots__ = ("data", "version", "stamp", "checked_at")
+
+    def __init__(self, data: Any, version: int, stamp: Optional[Hashable], checked_at: float):
+        self.data = data
+        self.version = version
+        self.stamp = stamp
+        self.checked_at = checked_at
+
+
+class NameTable:
+    """Append-only name <-> integer id table.
+
+    Ids are handed out in first-seen order and never reused, so an id stays
+    valid for the life of the process even after its country is deleted.
+    Only ``intern`` hands out ids; it is called by the write paths and by
+    graph construction, never with names taken from a request. Lookups take
+    no lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+
+    def id_of(self, name: str) -> Optional[int]:
+        """Id of ``name``, or None for a name that was never interned."""
+        return self._ids.get(name)
+
+    def intern(self, name: str) -> int:
+        """Id of ``name``, assigning the next free id on first sight."""
+        try:
+            return self._ids[name]
+        except KeyError:
+            with self._lock:
+                if name not in self._ids:
+                    self._names.append(name)
+                    self._ids[name] = len(self._names) - 1
+                return self._ids[name]
+
+    def name_of(self, id_: int) -> str:
+        return self._names[id_]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+def normalize_commodity(name: str) -> str:
+    """Commodity key as production and commodity documents spell it."""
+    return name.lower().replace(" ", "_")
+
+
+def _quantities(country: Dict) -> Dict[str, Any]:
+    quantities = {}
+    for name, quantity in (country.get("production") or {}).items():
+        key = normalize_commodity(name)
+        # An exactly spelled key wins over one that only normalizes to it.
+        if key == name or key not in quantities:
+            quantities[key] = quantity
+    return quantities
+
+
+class ProductionIndex:
+    """Who produces what, derived from one countries document.
+
+    ``producers[commodity]`` lists (country, quantity), largest quantity
+    first and ties in document order; ``production[country]`` is the set of
+    commodities a country produces. Commodity names are normalized. An index
+    is never modified once built; ``updated`` returns a patched copy.
+    """
+
+    __slots__ = ("countries", "producers", "production", "_order", "_next")
+
+    def __init__(self, countries: Dict[str, Dict]):
+        self.countries = countries
+        self.producers: Dict[str, Tuple[Tuple[str, Any], ...]] = {}
+        self.production: Dict[str, frozenset] = {}
+        self._order: Dict[str, int] = {}
+        self._next = 0
+        self._apply({name: countries[name] for name in countries})
+
+    def updated(self, countries: Dict[str, Dict], changes: Dict[str, Optional[Dict]]) -> "ProductionIndex":
+        """Index of ``countries``, which is this index's document with
+        ``changes`` (country -> document, or None for a removed country)
+        applied. Only the commodities those countries produce are re-sorted."""
+        index = object.__new__(ProductionIndex)
+        index.countries = countries
+        index.producers = dict(self.producers)
+        index.production = dict(self.production)
+        index._order = dict(self._order)
+        index._next = self._next
+        index._apply(changes)
+        return index
+
+    def _apply(self, changes: Dict[str, Optional[Dict]]) -> None:
+        for name, country in changes.items():
+            touched = set(self.production.pop(name, ()))
+            if country is None:
+                self._order.pop(name, None)
+                quantities = {}
+            else:
+                if name not in self._order:
+                    self._order[name] = self._next
+                    self._next += 1
+                quantities = _quantities(country)
+                self.production[name] = frozenset(quantities)
+            for commodity in touched | set(quantities):
+                entries = [entry for entry in self.producers.get(commodity, ()) if entry[0] != name]
+                if commodity in quantities:
+                    entries.append((name, quantities[commodity]))
+                    entries.sort(key=lambda entry: (-entry[1], self._order[entry[0]]))
+                if entries:
+                    self.producers[commodity] = tuple(entries)
+                else:
+                    self.producers.pop(commodity, None)
+
+
+class WorldStore:
+    def __init__(
+        self,
+        base: Path = BASE,
+        stat_interval: float = STORE_STAT_INTERVAL,
+        flush_interval: float = STORE_FLUSH_INTERVAL,
+        backend: Optional[Any] = None,
+    ):
+        self.base = Path(base)
+        self.stat_interval = stat_interval
+        self._lock = threading.RLock()
+        self._entries: Dict[str, _Entry] = {}
+        self._version = 0
+        self._production: Optional[ProductionIndex] = None
+        # Seed data and anything the backend doesn't own always lives in JSON.
+        self.files = JsonBackend(self.base, flush_interval, on_flushed=self._on_flushed)
+        self.backend = self.files
+        if backend is not None:
+            self.use_backend(backend)
+
+    def use_backend(self, backend) -> None:
+        """Serve the collections ``backend`` handles from it from now on."""
+        with self._lock:
+            backend.on_flushed = self._on_flushed
+            self.backend = backend
+            self._entries.clear()
+            self._version += 1
+
+    def _backend_for(self, name: str):
+        return self.backend if self.backend.handles(name) else self.files
+
+    def _load(self, name: str, now: float) -> _Entry:
+        backend = self._backend_for(name)
+        stamp = backend.stamp(name)
+        data = backend.load(name)
+        self._version += 1
+        entry = _Entry(data, self._version, stamp, now)
+        self._entries[name] = entry
+        return entry
+
+    def _entry(self, name: str) -> _Entry:
+        now = time.monotonic()
+        entry = self._entries.get(name)
+        if entry is not None and now - entry.checked_at < self.stat_interval:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return self._load(name, now)
+            if now - entry.checked_at >= self.stat_interval:
+                # Memory is ahead of disk while a save is queued; don't reload.
+                backend = self._backend_for(name)
+                if not backend.is_pending(name) and backend.stamp(name) != entry.stamp:
+                    return self._load(name, now)
+                entry.checked_at = now
+            return entry
+
+    def read(self, name: str) -> Any:
+        """Return the cached document for ``name``. Do not mutate the result."""
+        return self._entry(name).data
+
+    def read_many(self, names: List[str]) -> Dict[str, Tuple[Any, int]]:
+        """(document, version) of each of ``names``, read together under the
+        store lock so no write lands between them. Do not mutate the results."""
+        with self._lock:
+            entries = {name: self._entry(name) for name in names}
+        return {name: (entry.data, entry.version) for name, entry in entries.items()}
+
+    def write(self, name: str, data: Any) -> None:
+        """Replace the document for ``name`` and queue it for persistence."""
+        with self._lock:
+            self._swap(name, data)
+            self._backend_for(name).save(name, data)
+
+    def write_routes(self, name: str, changes: Dict[Tuple[str, str], Optional[Dict]]) -> Tuple[Dict, Dict]:
+        """Upsert (or delete, for ``None``) individual routes of a routes document.
+
+        Only the touched origin maps are copied, and backends that support it
+        persist just the changed rows. Returns the (previous, updated)
+        documents so callers can patch state derived from the previous one.
+        """
+        with self._lock:
+            previous = self._entry(name).data
+            updated = dict(previous)
+            copied = set()
+            for (origin, destination), route in changes.items():
+                country_ids.intern(origin)
+                country_ids.intern(destination)
+                if origin not in copied:
+                    updated[origin] = dict(updated.get(origin, {}))
+                    copied.add(origin)
+                if route is None:
+                    updated[origin].pop(destination, None)
+                else:
+                    updated[origin][destination] = route
+            self._swap(name, updated)
+            self._backend_for(name).save_routes(name, updated, changes)
+            return previous, updated
+
+    def write_countries(self, name: str, changes: Dict[str, Optional[Dict]]) -> Tuple[Dict, Dict]:
+        """Upsert (or delete, for ``None``) individual countries of a
+        countries document and patch its production index to match.
+        Returns the (previous, updated) documents."""
+        with self._lock:
+            previous = self._entry(name).data
+            updated = dict(previous)
+            for country, data in changes.items():
+                if data is None:
+                    updated.pop(country, None)
+                else:
+                    country_ids.intern(country)
+                    updated[country] = data
+            self._swap(name, updated)
+            index = self._production
+            if index is not None and index.countries is previous:
+                self._production = index.updated(updated, changes)
+            self._backend_for(name).save(name, updated)
+            return previous, updated
+
+    def production_index(self, name: str = "countries.json") -> ProductionIndex:
+        """``ProductionIndex`` of the current countries document, built on
+        first use and again only when the document is replaced wholesale."""
+        data = self.read(name)
+        index = self._production
+        if index is None or index.countries is not data:
+            with self._lock:
+                data = self.read(name)
+                index = self._production
+                if index is None or index.countries is not data:
+                    index = self._production = ProductionIndex(data)
+        return index
+
+    def _swap(self, name: str, data: Any) -> None:
+        previous = self._entries.get(name)
+        self._version += 1
+        self._entries[name] = _Entry(
+            data, self._version, previous.stamp if previous else None, time.monotonic()
+        )
+
+    def _on_flushed(self, name: str, data: Any) -> None:
+        # Runs on the writer thread; taking self._lock here could deadlock
+        # against a synchronous submit from ``write``.
+        entry = self._entries.get(name)
+        if entry is not None and entry.data is data:
+            entry.stamp = self._backend_for(name).stamp(name)
+
+    def flush(self) -> None:
+        """Block until every queued save has reached storage."""
+        self.files.flush()
+        self.backend.flush()
+
+    def close(self) -> None:
+        self.files.close()
+        if self.backend is not self.files:
+            self.backend.close()
+
+    def version(self, name: Optional[str] = None) -> int:
+        """Monotonic version of one collection, or of the whole store."""
+        if name is None:
+            return self._version
+        return self._entry(name).version
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drop cached documents so the next read goes back to disk."""
+        with self._lock:
+            self.flush()
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+            self._version += 1
+
+
+def _create_world_store() -> WorldStore:
+    if STORAGE_BACKEND != "sqlite":
+        return WorldStore()
+
+    store = WorldStore()
+    backend = SqliteBackend(SQLITE_PATH)
+    if backend.is_empty():
+        # First start on SQLite: seed it from the JSON database.
+        copy_collections(store.files, backend)
+    store.use_backend(backend)
+    return store
+
+
+country_ids = NameTable()
+world_store = _create_world_store()
+atexit.register(world_store.close)
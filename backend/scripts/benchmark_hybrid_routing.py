@@ -0,0 +1,192 @@
+"""Benchmark the multimodal route searches against the previous nine-search strategy,
+and the per-objective /simulate searches against one Pareto search.
+
+    python scripts/benchmark_hybrid_routing.py [--countries 400] [--pairs 200]
+
+Runs on the live route network and on a seeded synthetic network, and reports
+timings plus how often both strategies agree on the objective value.
+"""
+import argparse
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+
+import networkx as nx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from managers.factors_manager import get_factors  # noqa: E402
+from managers.network_manager import get_network  # noqa: E402
+from simulation import goal_directed  # noqa: E402
+from simulation import hybrid_routing_engine as hybrid  # noqa: E402
+from simulation.contraction_hierarchy import ContractionHierarchy  # noqa: E402
+from utils.mode_profiles import VALID_ROUTE_MODES  # noqa: E402
+
+
+def synthetic_network(countries: int, degree: int, seed: int) -> nx.DiGraph:
+    rng = random.Random(seed)
+    names = [f"C{i:05d}" for i in range(countries)]
+    G = nx.DiGraph()
+    for i, origin in enumerate(names):
+        # A ring keeps the graph connected; the rest are random chords.
+        targets = {names[(i + 1) % countries]}
+        targets.update(rng.sample(names, degree))
+        targets.discard(origin)
+        for destination in sorted(targets):
+            mode = rng.choice(VALID_ROUTE_MODES)
+            cost, time_, risk = rng.uniform(2, 17), rng.uniform(3, 22), rng.uniform(0.05, 0.25)
+            for u, v in ((origin, destination), (destination, origin)):
+                G.add_edge(u, v, cost=cost, time=time_, risk=risk, mode=mode)
+    return G
+
+
+def run(label, G, pairs, factors, max_switches):
+    expanded = hybrid.build_expanded_graph(G, factors)
+    expanded.graph["version"] = 1  # lets the CSR form be cached across queries
+    print(f"\n{label}: {G.number_of_nodes()} countries, {G.number_of_edges()} routes, "
+          f"{expanded.number_of_edges()} expanded edges, {len(pairs)} pairs")
+    for optimization, weight_key in hybrid.OBJECTIVE_WEIGHTS.items():
+        started = time.perf_counter()
+        legacy = [
+            hybrid._pairwise_mode_search(expanded, a, b, weight_key, max_switches) for a, b in pairs
+        ]
+        legacy_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        single = [hybrid._best_multimodal_path(expanded, a, b, weight_key) for a, b in pairs]
+        single_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        constrained = [
+            hybrid._constrained_multimodal_path(expanded, a, b, weight_key, max_switches)
+            for a, b in pairs
+        ]
+        constrained_s = time.perf_counter() - started
+
+        hybrid._csr_multimodal_path(expanded, *pairs[0], weight_key, max_switches, None, None)
+        started = time.perf_counter()
+        csr_paths = [
+            hybrid._csr_multimodal_path(expanded, a, b, weight_key, max_switches, None, None)
+            for a, b in pairs
+        ]
+        csr_s = time.perf_counter() - started
+        within_limit = sum(
+            path is not None and hybrid._count_switches(expanded, path) <= max_switches
+            for path in single
+        )
+
+        same_path = same_value = better = 0
+        for old, new in zip(legacy, single):
+            if old is None or new is None:
+                same_path += old == new
+                same_value += old == new
+                continue
+            old_value = hybrid._path_total(expanded, old, weight_key)
+            new_value = hybrid._path_total(expanded, new, weight_key)
+            same_path += old == new
+            same_value += abs(old_value - new_value) <= 1e-9 * max(1.0, old_value)
+            better += new_value < old_value - 1e-9 * max(1.0, old_value)
+        print(
+            f"  {optimization:<4}  nine searches {legacy_s * 1000:8.1f} ms   "
+            f"single search {single_s * 1000:8.1f} ms   speedup {legacy_s / max(single_s, 1e-9):5.1f}x   "
+            f"same path {same_path}/{len(pairs)}   same {optimization} {same_value}/{len(pairs)}   "
+            f"lower {optimization} {better}"
+        )
+        print(
+            f"        constrained search ({max_switches} switches) {constrained_s * 1000:8.1f} ms   "
+            f"unconstrained optimum within limit {within_limit}/{len(pairs)}   "
+            f"found {sum(path is not None for path in constrained)}/{len(pairs)}"
+        )
+        print(
+            f"        CSR constrained search {csr_s * 1000:8.1f} ms   "
+            f"same path {sum(a == b for a, b in zip(csr_paths, constrained))}/{len(pairs)}"
+        )
+
+        started = time.perf_counter()
+        hierarchy = ContractionHierarchy.from_expanded(expanded, weight_key)
+        build_s = time.perf_counter() - started
+        started = time.perf_counter()
+        found = [hierarchy.shortest_path(hybrid._mode_nodes(a), hybrid._mode_nodes(b)) for a, b in pairs]
+        ch_s = time.perf_counter() - started
+        same_value = sum(
+            (path is None) == (hit is None)
+            and (path is None or abs(hit[0] - hybrid._path_total(expanded, path, weight_key))
+                 <= 1e-9 * max(1.0, hit[0]))
+            for path, hit in zip(single, found)
+        )
+        print(
+            f"        contraction hierarchy build {build_s * 1000:8.1f} ms   "
+            f"queries {ch_s * 1000:8.1f} ms   speedup over single search {single_s / max(ch_s, 1e-9):5.1f}x   "
+            f"same {optimization} {same_value}/{len(pairs)}"
+        )
+
+        goal_directed.landmarks_for(expanded, weight_key)
+        goal_directed.wait_for_rebuilds()
+        started = time.perf_counter()
+        found = [
+            goal_directed.astar_path(expanded, hybrid._mode_nodes(a), hybrid._mode_nodes(b), weight_key)
+            for a, b in pairs
+        ]
+        alt_s = time.perf_counter() - started
+        same_value = sum(
+            (path is None) == (hit is None)
+            and (path is None or abs(hit[0] - hybrid._path_total(expanded, path, weight_key))
+                 <= 1e-9 * max(1.0, hit[0]))
+            for path, hit in zip(single, found)
+        )
+        print(
+            f"        ALT A* queries {alt_s * 1000:8.1f} ms   "
+            f"speedup over single search {single_s / max(alt_s, 1e-9):5.1f}x   "
+            f"same {optimization} {same_value}/{len(pairs)}"
+        )
+
+
+def run_options(label, G, pairs, factors, max_switches):
+    """The three per-objective searches /simulate runs by default against one
+    Pareto search per pair (SCS_PARETO_OPTIONS)."""
+    expanded = hybrid.build_expanded_graph(G, factors)
+    started = time.perf_counter()
+    for a, b in pairs:
+        for weight_key in hybrid.OBJECTIVE_WEIGHTS.values():
+            hybrid._constrained_multimodal_path(expanded, a, b, weight_key, max_switches)
+    three_s = time.perf_counter() - started
+    print(f"\n{label}: /simulate options for {len(pairs)} pairs")
+    print(f"  three searches {three_s * 1000:8.1f} ms")
+    for limit in (None, hybrid.PARETO_LABEL_LIMIT, 8):
+        started = time.perf_counter()
+        fronts = [hybrid._pareto_multimodal_paths(expanded, a, b, max_switches, limit) for a, b in pairs]
+        pareto_s = time.perf_counter() - started
+        print(
+            f"  Pareto search, label limit {str(limit):>4} {pareto_s * 1000:8.1f} ms   "
+            f"speedup {three_s / max(pareto_s, 1e-9):5.2f}x   "
+            f"mean frontier size {sum(map(len, fronts)) / max(1, len(fronts)):5.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--countries", type=int, default=400)
+    parser.add_argument("--degree", type=int, default=4)
+    parser.add_argument("--pairs", type=int, default=200)
+    parser.add_argument("--max-switches", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    factors = get_factors()
+    rng = random.Random(args.seed)
+
+    G = get_network()
+    run("Live network", G, list(itertools.permutations(G.nodes(), 2)), factors, args.max_switches)
+    run_options("Live network", G, list(itertools.permutations(G.nodes(), 2)), factors, args.max_switches)
+
+    G = synthetic_network(args.countries, args.degree, args.seed)
+    nodes = list(G.nodes())
+    pairs = [tuple(rng.sample(nodes, 2)) for _ in range(args.pairs)]
+    run("Synthetic network", G, pairs, factors, args.max_switches)
+    run_options("Synthetic network", G, pairs, factors, args.max_switches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Copy the live database between the JSON files and the SQLite backend.
+
+    python scripts/migrate_storage.py --to sqlite   # database/*.json -> SQLite
+    python scripts/migrate_storage.py --to json     # SQLite -> database/*.json
+"""
+import argparse
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_DIR))
+
+from managers.storage import JsonBackend, SqliteBackend, copy_collections  # noqa: E402
+from utils.settings import SQLITE_PATH  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--to", choices=("sqlite", "json"), required=True)
+    parser.add_argument("--sqlite", type=Path, default=SQLITE_PATH, help="SQLite database path")
+    parser.add_argument(
+        "--json-dir", type=Path, default=BACKEND_DIR / "database", help="JSON database directory"
+    )
+    args = parser.parse_args()
+
+    files = JsonBackend(args.json_dir, flush_interval=0)
+    sqlite = SqliteBackend(args.sqlite)
+    try:
+        if args.to == "sqlite":
+            copy_collections(files, sqlite)
+        else:
+            copy_collections(sqlite, files)
+    finally:
+        sqlite.close()
+        files.close()
+
+    source, target = (args.json_dir, args.sqlite) if args.to == "sqlite" else (args.sqlite, args.json_dir)
+    print(f"Copied {len(SqliteBackend.COLLECTIONS)} collections from {source} to {target}")
+
+
+if __name__ == "__main__":
+    main()
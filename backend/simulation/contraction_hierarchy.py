@@ -0,0 +1,266 @@
+"""
+Contraction hierarchies over the mode-expanded route graph.
+
+A hierarchy contracts the nodes of an expanded graph one at a time, in
+order of importance, adding a shortcut edge wherever removing a node would
+lengthen a shortest path between its neighbours. A query then only climbs:
+a forward Dijkstra from the source modes over edges to higher-ranked nodes
+meets a backward one from the destination modes, and both settle a few
+hundred nodes on networks where a plain Dijkstra settles tens of
+thousands. Shortcuts remember the node they skip, so paths unpack to the
+original expanded edges and results match a Dijkstra on the same graph.
+
+Preprocessing is slow and tied to one set of edge weights, so
+``hierarchy_for`` never builds on the caller's thread: it returns the
+hierarchy for the exact weights version or None, and in the second case
+queues a rebuild. One background worker builds the queued hierarchies in
+turn, so concurrent requests never run more than one build at a time.
+Callers fall back to Dijkstra until it is ready. A factor change (new
+factor fingerprint, so new slot) or a route change (new version) both
+trigger a rebuild. Enabled with ``SCS_CONTRACTION_HIERARCHIES``.
+"""
+
+import threading
+from collections import OrderedDict
+from heapq import heapify, heappop, heappush
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import networkx as nx
+
+from utils.settings import EXPANDED_GRAPH_CACHE_SIZE
+
+_INF = float("inf")
+
+# Nodes a witness search may settle before giving up and keeping the shortcut.
+WITNESS_SETTLE_LIMIT = 60
+
+
+class ContractionHierarchy:
+    """Hierarchy over weighted edges ``(u, v, weight)`` between hashable nodes."""
+
+    def __init__(self, nodes: Iterable, edges: Iterable[Tuple]):
+        out: Dict = {node: {} for node in nodes}
+        inc: Dict = {node: {} for node in out}
+        for u, v, weight in edges:
+            if u != v and weight < out[u].get(v, _INF):
+                out[u][v] = weight
+                inc[v][u] = weight
+
+        # up[n]: edges n -> higher-ranked v; down[n]: edges higher-ranked u -> n.
+        self.up: Dict = {}
+        self.down: Dict = {}
+        # Shortcut (u, v) -> the contracted node it skips.
+        self.middle: Dict[Tuple, object] = {}
+        self.rank: Dict = {}
+        contracted_neighbors = dict.fromkeys(out, 0)
+
+        def shortcuts(node):
+            needed = []
+            for u, to_node in inc[node].items():
+                through = {v: to_node + w for v, w in out[node].items() if v != u}
+                if not through:
+                    continue
+                witness = _witness_search(out, u, node, max(through.values()))
+                needed.extend((u, v, w) for v, w in through.items() if witness.get(v, _INF) > w)
+            return needed
+
+        def priority(node, needed):
+            # Edge difference, plus contracted neighbours to spread contraction evenly.
+            return len(needed) - len(inc[node]) - len(out[node]) + contracted_neighbors[node]
+
+        heap = [(priority(node, shortcuts(node)), i, node) for i, node in enumerate(out)]
+        heapify(heap)
+        while heap:
+            _, i, node = heappop(heap)
+            # Lazy updates: contract only if still no worse than the next candidate.
+            needed = shortcuts(node)
+            current = priority(node, needed)
+            if heap and current > heap[0][0]:
+                heappush(heap, (current, i, node))
+                continue
+
+            for u, v, weight in needed:
+                if weight < out[u].get(v, _INF):
+                    out[u][v] = weight
+                    inc[v][u] = weight
+                    self.middle[(u, v)] = node
+            self.up[node] = out.pop(node)
+            self.down[node] = inc.pop(node)
+            for v in self.up[node]:
+                del inc[v][node]
+                contracted_neighbors[v] += 1
+            for u in self.down[node]:
+                del out[u][node]
+                contracted_neighbors[u] += 1
+            self.rank[node] = len(self.rank)
+
+    @classmethod
+    def from_expanded(cls, expanded: nx.DiGraph, attr: str) -> "ContractionHierarchy":
+        return cls(expanded.nodes(), [(u, v, data[attr]) for u, v, data in expanded.edges(data=True)])
+
+    def shortest_path(self, sources: Iterable, targets: Iterable) -> Optional[Tuple[float, List]]:
+        """(distance, path) of the shortest path from any of ``sources`` to any
+        of ``targets``, or None when there is none."""
+        forward = {node: 0.0 for node in sources if node in self.up}
+        backward = {node: 0.0 for node in targets if node in self.down}
+        forward_pred = dict.fromkeys(forward)
+        backward_pred = dict.fromkeys(backward)
+        best, meet = _INF, None
+        for node in forward:
+            if node in backward:
+                best, meet = 0.0, node
+        searches = [
+            ([(0.0, node) for node in forward], forward, forward_pred, self.up, backward),
+            ([(0.0, node) for node in backward], backward, backward_pred, self.down, forward),
+        ]
+        while any(heap for heap, *_ in searches):
+            for heap, dist, pred, graph, other in searches:
+                if not heap:
+                    continue
+                d, node = heappop(heap)
+                if d > dist[node]:
+                    continue
+                if d >= best:
+                    heap.clear()
+                    continue
+                for neighbor, weight in graph[node].items():
+                    candidate = d + weight
+                    if candidate < dist.get(neighbor, _INF):
+                        dist[neighbor] = candidate
+                        pred[neighbor] = node
+                        heappush(heap, (candidate, neighbor))
+                        if neighbor in other and candidate + other[neighbor] < best:
+                            best, meet = candidate + other[neighbor], neighbor
+        if meet is None:
+            return None
+
+        climb = [meet]
+        while forward_pred[climb[-1]] is not None:
+            climb.append(forward_pred[climb[-1]])
+        climb.reverse()
+        node = meet
+        while backward_pred[node] is not None:
+            node = backward_pred[node]
+            climb.append(node)
+
+        path = [climb[0]]
+        for u, v in zip(climb, climb[1:]):
+            self._unpack(u, v, path)
+        return best, path
+
+    def _unpack(self, u, v, path: List) -> None:
+        stack = [(u, v)]
+        while stack:
+            a, b = stack.pop()
+            middle = self.middle.get((a, b))
+            if middle is None:
+                path.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+
+
+def _witness_search(out: Dict, source, skip, limit: float) -> Dict:
+    """Tentative distances from ``source`` avoiding ``skip``, up to ``limit``."""
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    while heap:
+        d, node = heappop(heap)
+        if d > dist[node]:
+            continue
+        if d > limit or settled >= WITNESS_SETTLE_LIMIT:
+            break
+        settled += 1
+        for neighbor, weight in out[node].items():
+            if neighbor == skip:
+                continue
+            candidate = d + weight
+            if candidate < dist.get(neighbor, _INF):
+                dist[neighbor] = candidate
+                heappush(heap, (candidate, neighbor))
+    return dist
+
+
+_lock = threading.Lock()
+# slot -> (weights version, hierarchy); a slot is whatever, with the
+# objective's edge attribute, determines the edge weights (see hierarchy_for).
+_hierarchies: "OrderedDict[Tuple, Tuple[int, ContractionHierarchy]]" = OrderedDict()
+# slot -> (version, nodes, edges) waiting for the worker, oldest first.
+_pending: "OrderedDict[Tuple, Tuple[int, List, List]]" = OrderedDict()
+# (slot, version) the worker is building.
+_building: Optional[Tuple] = None
+_worker: Optional[threading.Thread] = None
+
+
+def hierarchy_for(
+    expanded: nx.DiGraph, slot: Tuple, attr: str, version: Optional[int] = None
+) -> Optional[ContractionHierarchy]:
+    """The hierarchy of ``expanded`` for ``attr`` if it is ready, else None
+    after making sure one is queued for it.
+
+    ``slot`` and ``version`` (the expanded graph's version by default) must
+    together fix the ``attr`` weights: graphs that share them share one
+    hierarchy.
+    """
+    if version is None:
+        version = expanded.graph.get("version")
+    if version is None:
+        return None
+    slot = slot + (attr,)
+    with _lock:
+        cached = _hierarchies.get(slot)
+        if cached is not None and cached[0] == version:
+            _hierarchies.move_to_end(slot)
+            return cached[1]
+        queued = _pending.get(slot)
+        if _building != (slot, version) and (queued is None or queued[0] != version):
+            # The build only needs the weighted edge list, not the graph.
+            nodes = list(expanded.nodes())
+            edges = [(u, v, data[attr]) for u, v, data in expanded.edges(data=True)]
+            _pending[slot] = (version, nodes, edges)
+            _pending.move_to_end(slot)
+            while len(_pending) > EXPANDED_GRAPH_CACHE_SIZE:
+                _pending.popitem(last=False)
+        _start_worker()
+    return None
+
+
+def _start_worker() -> None:
+    """Start the build worker unless it is running. Holds _lock."""
+    global _worker
+    if _worker is None and _pending:
+        _worker = threading.Thread(target=_work, name="contraction-hierarchy", daemon=True)
+        _worker.start()
+
+
+def _work() -> None:
+    """Build queued hierarchies, oldest first, until the queue is empty."""
+    global _building, _worker
+    try:
+        while True:
+            with _lock:
+                if not _pending:
+                    _worker = None
+                    return
+                slot, (version, nodes, edges) = _pending.popitem(last=False)
+                _building = (slot, version)
+            hierarchy = ContractionHierarchy(nodes, edges)
+            with _lock:
+                _building = None
+                _hierarchies[slot] = (version, hierarchy)
+                _hierarchies.move_to_end(slot)
+                while len(_hierarchies) > EXPANDED_GRAPH_CACHE_SIZE:
+                    _hierarchies.popitem(last=False)
+    finally:
+        with _lock:
+            if _worker is threading.current_thread():
+                _worker = None
+                _building = None
+
+
+def wait_for_rebuilds(timeout: Optional[float] = None) -> None:
+    """Block until the queued hierarchies have been built."""
+    thread = _worker
+    if thread is not None:
+        thread.join(timeout)
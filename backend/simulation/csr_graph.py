@@ -0,0 +1,472 @@
+"""
+Compact array-backed graph for shortest-path searches.
+
+``CSRGraph`` stores a directed graph in compressed sparse row form. Node
+labels map to integer IDs, ``targets[offsets[i]:offsets[i + 1]]`` holds the
+out-neighbours of node ``i``, and every edge has a float weight per objective
+plus a uint8 mode code. In-edges are kept the same way for reverse searches.
+
+Neighbours keep the networkx adjacency order, and the searches relax and
+break ties exactly like networkx, so paths and lengths match it.
+
+The routing engines use it instead of networkx when SCS_ROUTING_BACKEND=csr
+(see utils/settings.py).
+"""
+
+from heapq import heappop, heappush
+from itertools import count
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+
+EDGE_MODES = ("land", "sea", "air", "transfer")
+MODE_CODES = {mode: code for code, mode in enumerate(EDGE_MODES)}
+UNKNOWN_MODE = 255
+
+NETWORK_WEIGHTS = ("cost", "time", "risk")
+
+_INF = float("inf")
+
+
+class CSRGraph:
+    """A directed graph as CSR arrays; see the module docstring."""
+
+    def __init__(
+        self,
+        nodes: List,
+        offsets: np.ndarray,
+        targets: np.ndarray,
+        weights: Dict[str, np.ndarray],
+        modes: np.ndarray,
+        pred_offsets: np.ndarray,
+        pred_sources: np.ndarray,
+        pred_edges: np.ndarray,
+    ):
+        self.nodes = nodes
+        self.index = {node: i for i, node in enumerate(nodes)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.modes = modes
+        self.pred_offsets = pred_offsets
+        self.pred_sources = pred_sources
+        self.pred_edges = pred_edges
+        self._lists: Dict[str, list] = {}
+
+    @classmethod
+    def from_networkx(
+        cls, G: nx.DiGraph, weights: Sequence[str] = NETWORK_WEIGHTS, dtype=np.float64
+    ) -> "CSRGraph":
+        """Convert ``G``. A missing weight attribute counts as 1, as in networkx."""
+        nodes = list(G)
+        index = {node: i for i, node in enumerate(nodes)}
+        n = len(nodes)
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        targets = []
+        values = {name: [] for name in weights}
+        modes = []
+        edge_ids = {}
+        for i, node in enumerate(nodes):
+            for neighbour, data in G._adj[node].items():
+                edge_ids[i, index[neighbour]] = len(targets)
+                targets.append(index[neighbour])
+                for name in weights:
+                    values[name].append(data.get(name, 1))
+                modes.append(MODE_CODES.get(data.get("mode"), UNKNOWN_MODE))
+            offsets[i + 1] = len(targets)
+
+        pred_offsets = np.zeros(n + 1, dtype=np.int64)
+        pred_sources = []
+        pred_edges = []
+        for i, node in enumerate(nodes):
+            for predecessor in G._pred[node]:
+                pred_sources.append(index[predecessor])
+                pred_edges.append(edge_ids[index[predecessor], i])
+            pred_offsets[i + 1] = len(pred_sources)
+
+        return cls(
+            nodes,
+            offsets,
+            np.array(targets, dtype=np.int32),
+            {name: np.array(column, dtype=dtype) for name, column in values.items()},
+            np.array(modes, dtype=np.uint8),
+            pred_offsets,
+            np.array(pred_sources, dtype=np.int32),
+            np.array(pred_edges, dtype=np.int64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, node) -> bool:
+        return node in self.index
+
+    def add_weight(self, name: str, values: np.ndarray) -> None:
+        """Attach an extra per-edge array, in edge order."""
+        self.weights[name] = values
+        self._lists.pop(name, None)
+
+    def _list(self, name: str) -> list:
+        # Searches index plain lists: much faster per element than numpy scalars.
+        column = self._lists.get(name)
+        if column is None:
+            source = self.weights[name] if name in self.weights else getattr(self, name)
+            column = self._lists[name] = source.tolist()
+        return column
+
+    def _path(self, pred: list, node: int) -> List:
+        path = [node]
+        while pred[path[-1]] >= 0:
+            path.append(pred[path[-1]])
+        path.reverse()
+        return [self.nodes[i] for i in path]
+
+    def dijkstra(
+        self, sources: Iterable[int], weight: str, targets=None, all_targets: bool = False
+    ) -> Tuple[list, list, Optional[int]]:
+        """Multi-source Dijkstra over node IDs.
+
+        Returns ``(dist, pred, reached)``: per-node distance (inf when not
+        settled) and predecessor (-1 for sources and unreached nodes), and
+        the first target settled, if ``targets`` is given and one is reachable.
+        With ``all_targets`` the search runs until every target is settled and
+        ``reached`` lists the settled targets in settling order.
+        """
+        offsets = self._list("offsets")
+        heads = self._list("targets")
+        w = self._list(weight)
+        n = len(self.nodes)
+        dist = [_INF] * n
+        seen = [_INF] * n
+        pred = [-1] * n
+        done = [False] * n
+        goal = set(targets) if targets is not None else ()
+        reached = []
+
+        c = count()
+        fringe = []
+        for source in sources:
+            seen[source] = 0
+            heappush(fringe, (0, next(c), source))
+        while fringe:
+            dist_v, _, v = heappop(fringe)
+            if done[v]:
+                continue
+            done[v] = True
+            dist[v] = dist_v
+            if v in goal:
+                if not all_targets:
+                    return dist, pred, v
+                reached.append(v)
+                if len(reached) == len(goal):
+                    break
+            for e in range(offsets[v], offsets[v + 1]):
+                u = heads[e]
+                if done[u]:
+                    continue
+                vu_dist = dist_v + w[e]
+                if vu_dist < seen[u]:
+                    seen[u] = vu_dist
+                    pred[u] = v
+                    heappush(fringe, (vu_dist, next(c), u))
+        return dist, pred, reached if all_targets else None
+
+    def bidirectional_dijkstra(self, source: int, target: int, weight: str) -> Optional[List[int]]:
+        """Node IDs of a shortest path found from both ends, as
+        ``nx.bidirectional_dijkstra`` finds it, or None."""
+        if source == target:
+            return [source]
+        adjacency = [
+            (self._list("offsets"), self._list("targets"), None),
+            (self._list("pred_offsets"), self._list("pred_sources"), self._list("pred_edges")),
+        ]
+        w = self._list(weight)
+        dists = [{}, {}]
+        preds = [{source: None}, {target: None}]
+        seen = [{source: 0}, {target: 0}]
+        c = count()
+        fringe = [[], []]
+        heappush(fringe[0], (0, next(c), source))
+        heappush(fringe[1], (0, next(c), target))
+        finaldist = None
+        meetnode = None
+        direction = 1
+        while fringe[0] and fringe[1]:
+            direction = 1 - direction
+            dist, _, v = heappop(fringe[direction])
+            if v in dists[direction]:
+                continue
+            dists[direction][v] = dist
+            if v in dists[1 - direction]:
+                path = []
+                node = meetnode
+                while node is not None:
+                    path.append(node)
+                    node = preds[0][node]
+                path.reverse()
+                node = preds[1][meetnode]
+                while node is not None:
+                    path.append(node)
+                    node = preds[1][node]
+                return path
+
+            offsets, ends, edges = adjacency[direction]
+            for i in range(offsets[v], offsets[v + 1]):
+                u = ends[i]
+                vu_length = dist + w[i if edges is None else edges[i]]
+                if u in dists[direction]:
+                    continue
+                if u not in seen[direction] or vu_length < seen[direction][u]:
+                    seen[direction][u] = vu_length
+                    heappush(fringe[direction], (vu_length, next(c), u))
+                    preds[direction][u] = v
+                    if u in seen[1 - direction]:
+                        finaldist_u = vu_length + seen[1 - direction][u]
+                        if finaldist is None or finaldist > finaldist_u:
+                            finaldist, meetnode = finaldist_u, u
+        return None
+
+    def shortest_path(self, source, target, weight: str) -> Tuple[Optional[List], Optional[float]]:
+        """(path, length) like ``nx.shortest_path``/``nx.shortest_path_length``,
+        or (None, None) when either node is missing or there is no path."""
+        if source not in self.index or target not in self.index:
+            return None, None
+        path = self.bidirectional_dijkstra(self.index[source], self.index[target], weight)
+        if path is None:
+            return None, None
+        # Accumulated from the source, as networkx's one-sided search does.
+        offsets = self._list("offsets")
+        heads = self._list("targets")
+        w = self._list(weight)
+        length = 0
+        for v, u in zip(path, path[1:]):
+            e = offsets[v] + heads[offsets[v]:offsets[v + 1]].index(u)
+            length += w[e]
+        return [self.nodes[i] for i in path], length
+
+    def multi_source_path(self, sources: Iterable, targets: Iterable, weight: str) -> Optional[List]:
+        """Shortest path from any of ``sources`` to whichever of ``targets``
+        is reached first, or None."""
+        source_ids = [self.index[node] for node in sources if node in self.index]
+        target_ids = [self.index[node] for node in targets if node in self.index]
+        if not source_ids or not target_ids:
+            return None
+        _, pred, reached = self.dijkstra(source_ids, weight, target_ids)
+        return None if reached is None else self._path(pred, reached)
+
+    def multi_source_paths(
+        self, sources: Iterable, target_groups: Dict[Hashable, Iterable], weight: str
+    ) -> Dict[Hashable, List]:
+        """``multi_source_path`` to every group of ``target_groups`` from one
+        search tree, keyed like the groups; unreachable groups are left out."""
+        source_ids = [self.index[node] for node in sources if node in self.index]
+        groups = {
+            key: {self.index[node] for node in targets if node in self.index}
+            for key, targets in target_groups.items()
+        }
+        goal = set().union(*groups.values())
+        if not source_ids or not goal:
+            return {}
+        _, pred, reached = self.dijkstra(source_ids, weight, goal, all_targets=True)
+        paths = {}
+        for v in reached:
+            for key, group in groups.items():
+                if v in group and key not in paths:
+                    paths[key] = self._path(pred, v)
+        return paths
+
+    def constrained_path(
+        self,
+        sources: Iterable,
+        targets: Iterable,
+        weight: str,
+        limits: Sequence[Tuple[str, float]] = (),
+    ) -> Optional[List]:
+        """Resource-constrained shortest path by label setting.
+
+        Each ``(name, limit)`` in ``limits`` is an additive per-edge resource
+        whose path total may not exceed ``limit``. Labels leave the heap in
+        ``weight`` order and one that is no better than a settled label at
+        its node in every resource is dropped, so the first label to reach a
+        target is the optimum under the limits.
+        """
+        return self.constrained_paths(sources, {None: targets}, weight, limits).get(None)
+
+    def constrained_paths(
+        self,
+        sources: Iterable,
+        target_groups: Dict[Hashable, Iterable],
+        weight: str,
+        limits: Sequence[Tuple[str, float]] = (),
+    ) -> Dict[Hashable, List]:
+        """``constrained_path`` to every group of ``target_groups`` from one
+        label search, keyed like the groups; unreachable groups are left out.
+
+        The search keeps expanding through targets until every group has been
+        reached, so each path is the one a search for its group alone finds.
+        """
+        offsets = self._list("offsets")
+        heads = self._list("targets")
+        w = self._list(weight)
+        goal: Dict[int, List[Hashable]] = {}
+        for key, targets in target_groups.items():
+            for node in targets:
+                if node in self.index:
+                    goal.setdefault(self.index[node], []).append(key)
+        starts = [self.index[node] for node in sources if node in self.index]
+        remaining = {key for keys in goal.values() for key in keys}
+        paths = {}
+        if not starts or not remaining:
+            return paths
+        c = count()
+        heap = []
+
+        def reach(v, trail):
+            for key in goal[v]:
+                if key in remaining:
+                    remaining.discard(key)
+                    paths[key] = unwind(trail)
+            return not remaining
+
+        def unwind(trail):
+            path = []
+            while trail is not None:
+                v, trail = trail
+                path.append(self.nodes[v])
+            path.reverse()
+            return path
+
+        if len(limits) == 1:
+            # One resource: the smallest amount settled at a node decides dominance.
+            name, cap = limits[0]
+            resource = self._list(name)
+            fewest = [_INF] * len(self.nodes)
+            for v in starts:
+                heappush(heap, (0.0, next(c), v, 0.0, None))
+            while heap:
+                cost, _, v, used, trail = heappop(heap)
+                if fewest[v] <= used:
+                    continue
+                fewest[v] = used
+                trail = (v, trail)
+                if v in goal and reach(v, trail):
+                    return paths
+                for e in range(offsets[v], offsets[v + 1]):
+                    u = heads[e]
+                    amount = used + resource[e]
+                    if amount > cap or fewest[u] <= amount:
+                        continue
+                    heappush(heap, (cost + w[e], next(c), u, amount, trail))
+            return paths
+
+        resources = [self._list(name) for name, _ in limits]
+        caps = [limit for _, limit in limits]
+        settled: Dict[int, List[tuple]] = {}
+
+        def dominated(v, used):
+            return any(
+                all(s <= u for s, u in zip(label, used)) for label in settled.get(v, ())
+            )
+
+        start = (0.0,) * len(limits)
+        for v in starts:
+            heappush(heap, (0.0, next(c), v, start, None))
+        while heap:
+            cost, _, v, used, trail = heappop(heap)
+            if dominated(v, used):
+                continue
+            settled.setdefault(v, []).append(used)
+            trail = (v, trail)
+            if v in goal and reach(v, trail):
+                return paths
+            for e in range(offsets[v], offsets[v + 1]):
+                u = heads[e]
+                next_used = tuple(amount + resource[e] for amount, resource in zip(used, resources))
+                if any(amount > cap for amount, cap in zip(next_used, caps)):
+                    continue
+                if dominated(u, next_used):
+                    continue
+                heappush(heap, (cost + w[e], next(c), u, next_used, trail))
+        return paths
+
+    def bfs_path(self, source, target) -> Optional[List]:
+        """Fewest-edges path, matching unweighted ``nx.shortest_path``
+        (bidirectional BFS), or None."""
+        if source not in self.index or target not in self.index:
+            return None
+        s, t = self.index[source], self.index[target]
+        if s == t:
+            return [source]
+        offsets = self._list("offsets")
+        heads = self._list("targets")
+        pred_offsets = self._list("pred_offsets")
+        tails = self._list("pred_sources")
+
+        pred = {s: None}
+        succ = {t: None}
+        forward_fringe = [s]
+        reverse_fringe = [t]
+        meet = None
+        while forward_fringe and reverse_fringe and meet is None:
+            if len(forward_fringe) <= len(reverse_fringe):
+                this_level, forward_fringe = forward_fringe, []
+                for v in this_level:
+                    for e in range(offsets[v], offsets[v + 1]):
+                        w = heads[e]
+                        if w not in pred:
+                            forward_fringe.append(w)
+                            pred[w] = v
+                        if w in succ:
+                            meet = w
+                            break
+                    if meet is not None:
+                        break
+            else:
+                this_level, reverse_fringe = reverse_fringe, []
+                for v in this_level:
+                    for e in range(pred_offsets[v], pred_offsets[v + 1]):
+                        w = tails[e]
+                        if w not in succ:
+                            succ[w] = v
+                            reverse_fringe.append(w)
+                        if w in pred:
+                            meet = w
+                            break
+                    if meet is not None:
+                        break
+        if meet is None:
+            return None
+
+        path = []
+        node = meet
+        while node is not None:
+            path.append(node)
+            node = pred[node]
+        path.reverse()
+        node = succ[path[-1]]
+        while node is not None:
+            path.append(node)
+            node = succ[node]
+        return [self.nodes[i] for i in path]
+
+
+def csr_for(G: nx.DiGraph, weights: Sequence[str] = NETWORK_WEIGHTS, extend=None) -> CSRGraph:
+    """``CSRGraph`` of ``G``, cached on the graph while ``G.graph["version"]``
+    stays the same. Unversioned graphs are converted on every call.
+
+    ``extend(csr)`` may attach derived arrays before the result is cached.
+    """
+    weights = tuple(weights)
+    version = G.graph.get("version")
+    key = ("csr", weights)
+    cached = G.graph.get(key)
+    if version is not None and cached is not None and cached[0] == version:
+        return cached[1]
+    csr = CSRGraph.from_networkx(G, weights)
+    if extend is not None:
+        extend(csr)
+    if version is not None:
+        G.graph[key] = (version, csr)
+    return csr
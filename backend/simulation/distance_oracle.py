@@ -0,0 +1,308 @@
+"""
+All-pairs shortest distances over the mode-expanded route graph.
+
+``get_distance_oracle()`` returns a table per objective (cost, time, risk)
+with the shortest distance between every pair of countries for the live
+factors at unit cargo weight, with no limit on modal switches. Lookups are
+O(1), so it answers matrix queries without a search.
+
+The tables cost O(nodes^2) memory and an O(nodes^3) first build, so they are
+never built on the caller's thread: ``get_distance_oracle`` returns None
+until a background build for the current network has finished, and always
+for networks above ``DISTANCE_ORACLE_MAX_NODES`` expanded nodes.
+``distance_matrix`` falls back to one search per source in that case.
+
+The tables follow the network the same way the cached expanded graph does:
+route edges changed since the last update (``edge_changes_since``) are
+applied incrementally and only a factor change, a country being added or
+removed, or a gap in the edge log rebuilds them from scratch. Per objective:
+
+- a cheaper or new edge (u, v) relaxes every pair through it in one
+  vectorized pass, D = min(D, D[:, u] + w + D[v, :]);
+- a dearer or removed edge only invalidates the rows of sources that have
+  a shortest path through it, and just those rows are searched again.
+
+Each update builds new arrays, so an oracle handed out earlier is never
+modified under its reader.
+"""
+
+import threading
+from heapq import heappop, heappush
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+
+from managers.network_manager import edge_changes_since, get_network
+from managers.world_store import country_ids
+from simulation.hybrid_routing_engine import (
+    MODE_STRIDE,
+    OBJECTIVE_WEIGHTS,
+    RISK_WEIGHT_SCALE,
+    _mode_nodes,
+    factor_state,
+    get_expanded_graph,
+)
+from utils.settings import DISTANCE_ORACLE_MAX_NODES
+
+# Relative slack when deciding whether an edge lies on a shortest path.
+_TIGHT = 1e-9
+
+
+def _all_pairs(n: int, edges: Dict[Tuple[int, int], float]) -> np.ndarray:
+    """Floyd-Warshall over node indices, one vectorized pass per pivot."""
+    dist = np.full((n, n), np.inf)
+    if edges:
+        rows, cols = zip(*edges)
+        dist[list(rows), list(cols)] = list(edges.values())
+    np.fill_diagonal(dist, 0.0)
+    for k in range(n):
+        np.minimum(dist, dist[:, k, None] + dist[None, k, :], out=dist)
+    return dist
+
+
+class DistanceOracle:
+    """Shortest distances between all expanded nodes, per objective, for one
+    expanded graph. Treat instances as read-only; updates return a new one."""
+
+    def __init__(self, expanded: nx.DiGraph, key, graph_version: int):
+        self.key = key
+        self.graph_version = graph_version
+        self.expanded_version = expanded.graph.get("version")
+        self.nodes: List[int] = list(expanded.nodes())
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.weights: Dict[str, Dict[Tuple[int, int], float]] = {}
+        self.dist: Dict[str, np.ndarray] = {}
+        for attr in OBJECTIVE_WEIGHTS.values():
+            self.weights[attr] = {
+                (self.index[u], self.index[v]): data[attr] for u, v, data in expanded.edges(data=True)
+            }
+            self.dist[attr] = _all_pairs(len(self.nodes), self.weights[attr])
+        self._index_countries()
+
+    def _index_countries(self) -> None:
+        by_country: Dict[int, List[int]] = {}
+        for node, i in self.index.items():
+            by_country.setdefault(node // MODE_STRIDE, []).append(i)
+        self.countries = {country_ids.name_of(country): i for i, country in enumerate(by_country)}
+        # Every country has one node per mode (see build_expanded_graph).
+        self._country_nodes = np.array(list(by_country.values()), dtype=np.intp)
+        self._country_dist = {
+            attr: dist[self._country_nodes[:, :, None, None], self._country_nodes[None, None, :, :]]
+            .min(axis=(1, 3))
+            for attr, dist in self.dist.items()
+        }
+
+    def distance(self, source: str, destination: str, objective: str = "cost") -> float:
+        """Shortest ``objective`` distance between two countries; inf when
+        there is no route and for unknown countries. Risk is reported as the
+        additive per-edge risk total the "risk" objective minimizes."""
+        i = self.countries.get(source)
+        j = self.countries.get(destination)
+        if i is None or j is None:
+            return float("inf")
+        return self._value(OBJECTIVE_WEIGHTS.get(objective, "cost"), i, j)
+
+    def reachable(self, source: str, destination: str) -> bool:
+        return self.distance(source, destination) < float("inf")
+
+    def matrix(
+        self,
+        sources: Optional[Iterable[str]] = None,
+        destinations: Optional[Iterable[str]] = None,
+        objective: str = "cost",
+    ) -> Dict[str, Dict[str, Optional[float]]]:
+        """{source: {destination: distance or None}} for known countries,
+        all of them when ``sources``/``destinations`` are omitted."""
+        attr = OBJECTIVE_WEIGHTS.get(objective, "cost")
+        sources = [s for s in (self.countries if sources is None else sources) if s in self.countries]
+        destinations = [
+            d for d in (self.countries if destinations is None else destinations) if d in self.countries
+        ]
+        matrix = {}
+        for source in sources:
+            i = self.countries[source]
+            row = {}
+            for destination in destinations:
+                value = self._value(attr, i, self.countries[destination])
+                row[destination] = value if value < float("inf") else None
+            matrix[source] = row
+        return matrix
+
+    def _value(self, attr: str, i: int, j: int) -> float:
+        value = float(self._country_dist[attr][i, j])
+        return value / RISK_WEIGHT_SCALE if attr == "risk_weight" else value
+
+    def updated(self, expanded: nx.DiGraph, changed_edges, graph_version: int) -> Optional["DistanceOracle"]:
+        """Oracle for ``expanded`` after the given route edges changed, or None
+        when the change needs a full rebuild (countries added or removed)."""
+        if len(expanded) != len(self.nodes):
+            return None
+        candidates = set()
+        for u, v in changed_edges:
+            pairs = list(zip(_mode_nodes(u), _mode_nodes(v)))
+            if not pairs:
+                return None
+            for pair in pairs:
+                if pair[0] not in self.index or pair[1] not in self.index:
+                    return None
+                candidates.add(pair)
+
+        oracle = object.__new__(DistanceOracle)
+        oracle.key = self.key
+        oracle.graph_version = graph_version
+        oracle.expanded_version = expanded.graph.get("version")
+        oracle.nodes = self.nodes
+        oracle.index = self.index
+        oracle.weights = {}
+        oracle.dist = {}
+        adj = expanded._adj
+        for attr, dist in self.dist.items():
+            weights = dict(self.weights[attr])
+            dearer = []
+            cheaper = []
+            for u, v in candidates:
+                edge = (self.index[u], self.index[v])
+                old = weights.get(edge, np.inf)
+                data = adj[u].get(v)
+                new = data[attr] if data is not None else np.inf
+                if new > old:
+                    dearer.append((edge, old))
+                elif new < old:
+                    cheaper.append((edge, new))
+                if data is None:
+                    weights.pop(edge, None)
+                else:
+                    weights[edge] = new
+
+            if dearer or cheaper:
+                dist = dist.copy()
+            stale = np.zeros(len(self.nodes), dtype=bool)
+            for (i, j), old in dearer:
+                through = dist[:, i, None] + old + dist[None, j, :]
+                tight = (through <= dist + _TIGHT * np.maximum(1.0, dist)) & np.isfinite(through)
+                stale |= np.any(tight, axis=1)
+            for row in np.flatnonzero(stale):
+                dist[row] = self._search_row(adj, row, attr)
+            for (i, j), new in cheaper:
+                np.minimum(dist, dist[:, i, None] + new + dist[None, j, :], out=dist)
+
+            oracle.weights[attr] = weights
+            oracle.dist[attr] = dist
+        oracle._index_countries()
+        return oracle
+
+    def _search_row(self, adj, row: int, attr: str) -> np.ndarray:
+        """Dijkstra distances from node ``row`` over the current expanded graph."""
+        dist = np.full(len(self.nodes), np.inf)
+        heap = [(0.0, row)]
+        done = set()
+        while heap:
+            d, i = heappop(heap)
+            if i in done:
+                continue
+            done.add(i)
+            dist[i] = d
+            for neighbor, data in adj[self.nodes[i]].items():
+                j = self.index[neighbor]
+                if j not in done:
+                    candidate = d + data[attr]
+                    if candidate < dist[j]:
+                        dist[j] = candidate
+                        heappush(heap, (candidate, j))
+        return dist
+
+
+_lock = threading.Lock()
+_oracle: Optional[DistanceOracle] = None
+_building: Optional[threading.Thread] = None
+
+
+def get_distance_oracle() -> Optional[DistanceOracle]:
+    """The ``DistanceOracle`` for the live network and factors if it is
+    ready, else None after making sure one is being brought up to date."""
+    global _building
+    G = get_network()
+    state = factor_state()
+    expanded = get_expanded_graph(G, state.factors, 1.0, True, state)
+    if len(expanded) > DISTANCE_ORACLE_MAX_NODES:
+        return None
+    with _lock:
+        oracle = _oracle
+        if (
+            oracle is not None
+            and oracle.key == state.key
+            and oracle.expanded_version == expanded.graph.get("version")
+        ):
+            return oracle
+        if _building is None:
+            _building = threading.Thread(target=_refresh, name="distance-oracle", daemon=True)
+            _building.start()
+    return None
+
+
+def _refresh() -> None:
+    """Bring ``_oracle`` up to date with the live network: incrementally when
+    only route edges changed since it was built, else from scratch."""
+    global _oracle, _building
+    try:
+        G = get_network()
+        state = factor_state()
+        expanded = get_expanded_graph(G, state.factors, 1.0, True, state)
+        graph_ver = G.graph.get("version")
+        oracle = _oracle
+        updated = None
+        if oracle is not None and oracle.key == state.key:
+            if oracle.expanded_version == expanded.graph.get("version"):
+                return
+            changed = edge_changes_since(oracle.graph_version) if oracle.graph_version < graph_ver else None
+            if changed is not None:
+                updated = oracle.updated(expanded, changed, graph_ver)
+        if updated is None and len(expanded) <= DISTANCE_ORACLE_MAX_NODES:
+            updated = DistanceOracle(expanded, state.key, graph_ver)
+        if updated is not None:
+            _oracle = updated
+    finally:
+        with _lock:
+            _building = None
+
+
+def wait_for_rebuilds(timeout: Optional[float] = None) -> None:
+    """Block until the oracle being built has finished."""
+    thread = _building
+    if thread is not None:
+        thread.join(timeout)
+
+
+def distance_matrix(
+    sources: Optional[Iterable[str]] = None,
+    destinations: Optional[Iterable[str]] = None,
+    objective: str = "cost",
+) -> Dict[str, Dict[str, Optional[float]]]:
+    """``DistanceOracle.matrix`` for the live network, computed with one
+    Dijkstra per source while the oracle is not ready."""
+    oracle = get_distance_oracle()
+    if oracle is not None:
+        return oracle.matrix(sources, destinations, objective)
+
+    G = get_network()
+    state = factor_state()
+    expanded = get_expanded_graph(G, state.factors, 1.0, True, state)
+    attr = OBJECTIVE_WEIGHTS.get(objective, "cost")
+    countries = [country for country in G.nodes() if _mode_nodes(country)]
+    known = set(countries)
+    sources = [s for s in (countries if sources is None else sources) if s in known]
+    destinations = [d for d in (countries if destinations is None else destinations) if d in known]
+    matrix = {}
+    for source in sources:
+        dist = nx.multi_source_dijkstra_path_length(
+            expanded, [node for node in _mode_nodes(source) if node in expanded], weight=attr
+        )
+        row = {}
+        for destination in destinations:
+            value = min((dist.get(node, np.inf) for node in _mode_nodes(destination)), default=np.inf)
+            if attr == "risk_weight":
+                value /= RISK_WEIGHT_SCALE
+            row[destination] = float(value) if value < np.inf else None
+        matrix[source] = row
+    return matrix
@@ -0,0 +1,360 @@
+"""
+Shortest-path trees kept up to date under single-edge route changes.
+
+``pin(source, objective)`` keeps a shortest-path tree from every mode of
+``source`` over the unit-weight mode-expanded graph (live factors, no switch
+limit). When a route changes the trees are repaired in place,
+Ramalingam-Reps style, instead of being searched again:
+
+- an edge that got cheaper, or was added, only touches the nodes whose
+  distance improves, found by a Dijkstra started at its head;
+- an edge that got dearer, or was removed, only matters when it is a tree
+  edge. The subtree below it is cut loose, every cut node takes its best
+  distance through an edge from outside the subtree, and a Dijkstra
+  restricted to the subtree settles the rest.
+
+A changed edge on no tree costs a couple of dictionary lookups per tree.
+A factor change, countries being added or removed, or a gap in the
+network's edge log rebuilds the trees instead. Trees are never built on the
+caller's thread: new and rebuilt trees come from one background builder,
+and until they are ready ``pinned_route`` returns None so the caller
+searches.
+
+Cargo weight scales the cost of route edges but not of transfers, and
+leaves time and risk alone. So a time or risk tree answers for every cargo
+weight, while a cost tree only answers unit-weight queries and other cost
+queries are never pinned.
+
+The scenario engine pins the origin of every leg it routes and reads the
+route off the tree (``pinned_route``) while the tree follows the network
+the request sees, so re-running a simulation after a tariff, storm or
+customs action costs a repair instead of a search. Trees are repaired
+right after each route mutation (``add_routes_listener``); any other
+change is picked up on the next query.
+"""
+import threading
+from collections import OrderedDict
+from heapq import heappop, heappush
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import networkx as nx
+
+from managers.network_manager import add_routes_listener, edge_changes_since, get_network
+from simulation.hybrid_routing_engine import (
+    OBJECTIVE_WEIGHTS,
+    _count_switches,
+    _country_sequence,
+    _mode_nodes,
+    _path_total,
+    factor_state,
+    get_expanded_graph,
+)
+from utils.settings import PINNED_TREE_LIMIT
+
+_INF = float("inf")
+
+
+class ShortestPathTree:
+    """Shortest-path tree over an expanded graph from the mode nodes of one
+    country, for one edge attribute."""
+
+    def __init__(self, expanded: nx.DiGraph, source: str, attr: str):
+        self.source = source
+        self.attr = attr
+        self.dist: Dict[int, float] = {}
+        self.parent: Dict[int, Optional[int]] = {}
+        # Weight of the tree edge into each node, as it was when attached.
+        self.weight: Dict[int, float] = {}
+        self.children: Dict[int, Set[int]] = {}
+        roots = [node for node in _mode_nodes(source) if node in expanded]
+        for node in roots:
+            self._attach(node, None, 0.0, 0.0)
+        self._relax_from(expanded._adj, roots)
+
+    def _attach(self, node: int, parent: Optional[int], dist: float, weight: float) -> None:
+        self._detach(node)
+        self.dist[node] = dist
+        self.parent[node] = parent
+        self.weight[node] = weight
+        if parent is not None:
+            self.children.setdefault(parent, set()).add(node)
+
+    def _prefer(self, parent: int, node: int) -> bool:
+        """Whether ``parent`` wins a tie for ``node`` over its current parent:
+        the lowest node id does, so a repaired tree is the tree a fresh
+        search builds, whatever order the changes came in."""
+        current = self.parent.get(node)
+        return current is not None and parent < current
+
+    def _detach(self, node: int) -> None:
+        previous = self.parent.pop(node, None)
+        if previous is not None:
+            self.children[previous].discard(node)
+        self.dist.pop(node, None)
+        self.weight.pop(node, None)
+
+    def _relax_from(self, adj, nodes) -> None:
+        """Dijkstra from ``nodes`` at their current distances, improving every
+        node it reaches."""
+        attr = self.attr
+        heap = sorted((self.dist[node], node) for node in nodes)
+        while heap:
+            d, node = heappop(heap)
+            if d > self.dist.get(node, _INF):
+                continue
+            for neighbor, data in adj[node].items():
+                weight = data[attr]
+                candidate = d + weight
+                current = self.dist.get(neighbor, _INF)
+                if candidate < current:
+                    self._attach(neighbor, node, candidate, weight)
+                    heappush(heap, (candidate, neighbor))
+                elif candidate == current and self._prefer(node, neighbor):
+                    self._attach(neighbor, node, candidate, weight)
+
+    def update(self, expanded: nx.DiGraph, edges: Iterable[Tuple[int, int]]) -> None:
+        """Repair the tree after the weights of ``edges`` changed in
+        ``expanded``, or the edges were added or removed.
+
+        Tree edges that got dearer are handled first: their subtrees are cut
+        and reattached from outside. Every changed edge that now shortens
+        the distance to its head is then relaxed, and one Dijkstra from all
+        the touched nodes settles the rest.
+        """
+        adj = expanded._adj
+        attr = self.attr
+        edges = [(u, v, adj[u][v][attr] if u in adj and v in adj[u] else _INF) for u, v in edges]
+
+        cut: Set[int] = set()
+        for u, v, weight in edges:
+            if self.parent.get(v) == u and weight > self.weight[v] and v not in cut:
+                stack = [v]
+                while stack:
+                    node = stack.pop()
+                    cut.add(node)
+                    stack.extend(self.children.get(node, ()))
+        seeds = self._reattach(expanded, cut) if cut else []
+
+        for u, v, weight in edges:
+            if u not in self.dist:
+                continue
+            candidate = self.dist[u] + weight
+            current = self.dist.get(v, _INF)
+            if candidate < current:
+                self._attach(v, u, candidate, weight)
+                seeds.append(v)
+            elif candidate == current and self._prefer(u, v):
+                self._attach(v, u, candidate, weight)
+        if seeds:
+            self._relax_from(adj, seeds)
+
+    def _reattach(self, expanded: nx.DiGraph, cut: Set[int]) -> List[int]:
+        """Give every node in ``cut`` its best distance through an edge from
+        outside the cut; returns the nodes that could be reattached."""
+        attr = self.attr
+        best = []
+        for node in cut:
+            entry = None
+            for pred, data in expanded._pred[node].items():
+                if pred in self.dist and pred not in cut:
+                    candidate = self.dist[pred] + data[attr]
+                    if entry is None or (candidate, pred) < entry[:2]:
+                        entry = (candidate, pred, data[attr])
+            best.append((node, entry))
+        for node in cut:
+            self._detach(node)
+        seeds = []
+        for node, entry in best:
+            if entry is not None:
+                self._attach(node, entry[1], entry[0], entry[2])
+                seeds.append(node)
+        return seeds
+
+    def distance(self, destination: str) -> float:
+        return min((self.dist.get(node, _INF) for node in _mode_nodes(destination)), default=_INF)
+
+    def path(self, destination: str) -> Optional[List[int]]:
+        reached = [node for node in _mode_nodes(destination) if node in self.dist]
+        if not reached:
+            return None
+        node = min(reached, key=self.dist.__getitem__)
+        path = [node]
+        while self.parent[path[-1]] is not None:
+            path.append(self.parent[path[-1]])
+        path.reverse()
+        return path
+
+
+_lock = threading.Lock()
+# (source, objective) -> tree, least recently used first; None until the
+# builder has made its first tree.
+_trees: "OrderedDict[Tuple[str, str], Optional[ShortestPathTree]]" = OrderedDict()
+# (factor state key, network graph version, country count) the trees reflect.
+_synced: Optional[Tuple] = None
+_building: Optional[threading.Thread] = None
+
+
+def _tree_key(source: str, objective: str, cargo_weight: float) -> Optional[Tuple[str, str]]:
+    """Key of the tree that answers ``objective`` at ``cargo_weight``, or
+    None when no tree does (cost at anything but unit weight)."""
+    if OBJECTIVE_WEIGHTS.get(objective, "cost") == "cost" and float(cargo_weight) != 1.0:
+        return None
+    return source, objective
+
+
+def _live() -> Tuple[nx.DiGraph, object, Tuple]:
+    G = get_network()
+    state = factor_state()
+    return G, state, (state.key, G.graph.get("version"), len(G))
+
+
+def _repair(G: nx.DiGraph, state, live: Tuple) -> bool:
+    """Repair every pinned tree for the route changes made since it was
+    synced; False when that cannot bring it to ``live`` and the trees have
+    to be rebuilt. Holds _lock."""
+    global _synced
+    if _synced == live:
+        return True
+    if _synced is None or _synced[0] != live[0] or _synced[2] != live[2] or _synced[1] > live[1]:
+        return False
+    changed = edge_changes_since(_synced[1])
+    if changed is None:
+        return False
+    expanded = get_expanded_graph(G, state.factors, 1.0, True, state)
+    edges = [pair for u, v in changed for pair in zip(_mode_nodes(u), _mode_nodes(v))]
+    for tree in _trees.values():
+        if tree is not None:
+            tree.update(expanded, edges)
+    _synced = live
+    return True
+
+
+def _sync() -> bool:
+    """Bring every pinned tree up to date with the live network, handing
+    rebuilds and new trees to the builder; True when the trees are current.
+    Holds _lock."""
+    current = _repair(*_live())
+    if not current or any(tree is None for tree in _trees.values()):
+        _start_builder()
+    return current
+
+
+def _start_builder() -> None:
+    """Start the background builder unless it is running. Holds _lock."""
+    global _building
+    if _building is None:
+        _building = threading.Thread(target=_build, name="pinned-trees", daemon=True)
+        _building.start()
+
+
+def _build() -> None:
+    """Build the trees not made yet, or every tree when they cannot be
+    repaired up to the live network, until there is nothing left to do."""
+    global _synced, _building
+    try:
+        while True:
+            with _lock:
+                G, state, live = _live()
+                current = _repair(G, state, live)
+                keys = [key for key, tree in _trees.items() if tree is None or not current]
+                if not keys:
+                    _synced = live
+                    _building = None
+                    return
+                synced = _synced
+            expanded = get_expanded_graph(G, state.factors, 1.0, True, state)
+            built = {
+                key: ShortestPathTree(expanded, key[0], OBJECTIVE_WEIGHTS.get(key[1], "cost"))
+                for key in keys
+            }
+            with _lock:
+                # Trees repaired meanwhile are ahead of these; build again.
+                if _synced != synced:
+                    continue
+                for key, tree in built.items():
+                    if key in _trees:
+                        _trees[key] = tree
+                _synced = live
+    finally:
+        with _lock:
+            if _building is threading.current_thread():
+                _building = None
+
+
+def wait_for_rebuilds(timeout: Optional[float] = None) -> None:
+    """Block until the trees being built have finished."""
+    thread = _building
+    if thread is not None:
+        thread.join(timeout)
+
+
+def pin(source: str, objective: str = "cost", cargo_weight: float = 1.0) -> None:
+    """Keep a shortest-path tree from ``source`` that answers ``objective``
+    at ``cargo_weight``, dropping the least recently used one past
+    PINNED_TREE_LIMIT. Does nothing for cost at other than unit weight."""
+    key = _tree_key(source, objective, cargo_weight)
+    if key is None:
+        return
+    with _lock:
+        if key in _trees:
+            _trees.move_to_end(key)
+            return
+        _trees[key] = None
+        while len(_trees) > PINNED_TREE_LIMIT:
+            _trees.popitem(last=False)
+        _start_builder()
+
+
+def unpin(source: str, objective: str = "cost") -> None:
+    with _lock:
+        _trees.pop((source, objective), None)
+
+
+def repair_pinned_trees() -> None:
+    """Apply route changes made since the last repair to every pinned tree."""
+    with _lock:
+        if _trees:
+            _sync()
+
+
+def pinned_route(
+    G: nx.DiGraph,
+    source: str,
+    destination: str,
+    objective: str = "cost",
+    cargo_weight: float = 1.0,
+    max_switches: Optional[int] = None,
+    state=None,
+):
+    """What ``find_hybrid_optimal_route`` returns for ``G`` with the factor
+    state ``state`` (the live one by default) and modal switches allowed,
+    read off the pinned tree that answers ``objective`` at ``cargo_weight``:
+    (path, total_cost, modal_sequence), or (None, None, None) when
+    ``destination`` cannot be reached.
+
+    None when the tree cannot answer and the caller has to search: no such
+    tree is pinned or it is still being built, ``G`` and ``state`` are not
+    the network and factors it follows (an older snapshot, or a private
+    build), or the best route needs more than ``max_switches`` modal
+    switches.
+    """
+    key = _tree_key(source, objective, cargo_weight)
+    if key is None:
+        return None
+    with _lock:
+        if key not in _trees or not _sync() or _trees[key] is None:
+            return None
+        state = state or factor_state()
+        if _synced[:2] != (state.key, G.graph.get("version")):
+            return None
+        path = _trees[key].path(destination)
+    if path is None:
+        return None, None, None
+    expanded = get_expanded_graph(G, state.factors, cargo_weight, True, state)
+    if max_switches is not None and _count_switches(expanded, path) > max_switches:
+        return None
+    clean_path, clean_modes = _country_sequence(path)
+    return clean_path, _path_total(expanded, path, "cost"), clean_modes
+
+
+add_routes_listener(repair_pinned_trees)
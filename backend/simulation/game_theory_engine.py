@@ -1,3 +1,4 @@
+import hashlib
 import math
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -18,6 +19,13 @@ def _clamp(val: float, low: float, high: float) -> float:
     return max(low, min(high, val))
 
 
+def _country_pair_hash(source: str, destination: str) -> float:
+    """Value in [0, 1) fixed per (source, destination), the same in every
+    process (the builtin ``hash`` of a str is salted per process)."""
+    digest = hashlib.blake2b(f"{source}\x00{destination}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % 100 / 100.0
+
+
 def _factor_components(factors: Optional[Dict[str, Dict[str, float]]]) -> Tuple[float, float, float]:
     if not factors:
         return 0.0, 0.0, 1.0
@@ -98,7 +106,7 @@ def evaluate_strategic_outlook(
     params: Dict[str, float],
 ) -> Dict[str, Any]:
     # Country-pair hash for unique variation based on specific countries
-    country_hash = abs(hash(source + destination)) % 100 / 100.0  # 0.0 to 1.0
+    country_hash = _country_pair_hash(source, destination)  # 0.0 to 0.99
     
     alliance_records = []
     src_support = 0.0
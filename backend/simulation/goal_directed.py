@@ -0,0 +1,330 @@
+"""
+Goal-directed shortest paths: A* with lower bounds on the distance left.
+
+Two bounds are available, and both keep A* exact because they never
+overestimate and are consistent:
+
+- ALT (A*, landmarks, triangle inequality): a few landmark nodes are chosen
+  far apart and the distance from and to each of them is precomputed per
+  weight. For any node v and target t, d(v, t) >= d(L, t) - d(L, v) and
+  d(v, t) >= d(v, L) - d(t, L).
+- Great circle: when every country carries ``lat``/``lon`` in
+  countries.json, the distance left is at least the great-circle distance
+  to the target times the smallest weight per kilometre of any route.
+
+Bounds are cached on the graph like its CSR form and follow
+``graph["version"]``. Landmarks cost two full Dijkstras each, so, like
+contraction hierarchies, both bounds are built on a background thread:
+``landmarks_for`` and ``great_circle_for`` return None until the bound for
+the graph's version is ready, and ``astar_path`` runs as plain Dijkstra
+meanwhile. The great-circle bound only uses the coordinates it was built
+with, so it stays a lower bound when countries.json changes; new
+coordinates are picked up with the next graph version.
+
+``SCS_ROUTING_HEURISTIC`` picks the bound the routers use: "none" (default,
+plain Dijkstra), "alt", or "great_circle" (the larger of both, or ALT alone
+while coordinates are missing).
+"""
+
+import math
+import threading
+from heapq import heappop, heappush
+from itertools import count
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import networkx as nx
+
+from managers.data_manager import read_json
+from utils.settings import ROUTING_LANDMARKS
+
+_INF = float("inf")
+EARTH_RADIUS_KM = 6371.0
+
+# Landmark bounds evaluated per query (see Landmarks.heuristic).
+ACTIVE_LANDMARKS = 4
+
+
+def _weight_of(data: Dict, weight: str) -> float:
+    # A missing weight counts as 1, as in networkx.
+    return data.get(weight, 1)
+
+
+def _dijkstra(adj, source, weight: str) -> Dict:
+    dist = {}
+    seen = {source: 0.0}
+    counter = count()
+    heap = [(0.0, next(counter), source)]
+    while heap:
+        d, _, node = heappop(heap)
+        if node in dist:
+            continue
+        dist[node] = d
+        for neighbor, data in adj[node].items():
+            candidate = d + _weight_of(data, weight)
+            if neighbor not in dist and candidate < seen.get(neighbor, _INF):
+                seen[neighbor] = candidate
+                heappush(heap, (candidate, next(counter), neighbor))
+    return dist
+
+
+class Landmarks:
+    """Distances from and to ``size`` landmarks of ``graph`` for ``weight``,
+    picked by farthest-point selection over round-trip distances."""
+
+    def __init__(self, graph: nx.DiGraph, weight: str, size: int = ROUTING_LANDMARKS):
+        self.nodes: List = []
+        self.forward: List[Dict] = []  # d(L, v)
+        self.backward: List[Dict] = []  # d(v, L)
+        nodes = list(graph._adj)
+        if not nodes:
+            return
+        start = _dijkstra(graph._adj, nodes[0], weight)
+        landmark = max(start, key=start.get)
+        spread = dict.fromkeys(nodes, _INF)
+        for _ in range(min(size, len(nodes))):
+            forward = _dijkstra(graph._adj, landmark, weight)
+            backward = _dijkstra(graph._pred, landmark, weight)
+            self.nodes.append(landmark)
+            self.forward.append(forward)
+            self.backward.append(backward)
+            for node in nodes:
+                spread[node] = min(spread[node], forward.get(node, _INF) + backward.get(node, _INF))
+            # Nodes no landmark reaches come first: they are in another component.
+            landmark = max(nodes, key=spread.__getitem__)
+            if spread[landmark] == 0:
+                break
+
+    def heuristic(self, targets: Iterable, sources: Iterable = ()) -> Callable:
+        """Lower bound on the distance from a node to the nearest of ``targets``.
+
+        With ``sources``, only the ACTIVE_LANDMARKS bounds that are tightest
+        at the sources are evaluated, which is cheaper per node and loses
+        little: the search stays near the sources' shortest paths.
+        """
+        targets = list(targets)
+        # Each term bounds d(v, T) by sign * (distances[v] - offset).
+        terms = []
+        pruning = []
+        for forward, backward in zip(self.forward, self.backward):
+            to_targets = min((forward.get(t, _INF) for t in targets), default=_INF)
+            if to_targets == _INF:
+                pruning.append(forward)  # the landmark reaches no target
+            else:
+                terms.append((forward, -1.0, to_targets))
+            from_targets = max((backward.get(t, _INF) for t in targets), default=_INF)
+            if from_targets != _INF:
+                terms.append((backward, 1.0, from_targets))
+        sources = list(sources)
+        if sources and len(terms) > ACTIVE_LANDMARKS:
+            def tightness(term):
+                distances, sign, offset = term
+                return min(
+                    (sign * (distances[node] - offset) for node in sources if node in distances),
+                    default=_INF,
+                )
+            terms = sorted(terms, key=tightness, reverse=True)[:ACTIVE_LANDMARKS]
+
+        def bound(node) -> float:
+            for forward in pruning:
+                if node in forward:
+                    return _INF  # reached from a landmark that reaches no target
+            best = 0.0
+            for distances, sign, offset in terms:
+                distance = distances.get(node)
+                if distance is None:
+                    if sign > 0:
+                        return _INF  # every target reaches the landmark, the node cannot
+                    continue
+                value = sign * (distance - offset)
+                if value > best:
+                    best = value
+            return best
+
+        return bound
+
+
+def _great_circle_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    (lat1, lon1), (lat2, lon2) = a, b
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def country_coordinates(countries: Dict) -> Dict[str, Tuple[float, float]]:
+    """{country: (lat, lon) in radians} for countries with numeric ``lat`` and
+    ``lon`` (or ``lng``, as the frontend names it)."""
+    coordinates = {}
+    for name, data in countries.items():
+        lat = data.get("lat")
+        lon = data.get("lon", data.get("lng"))
+        if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+            coordinates[name] = (math.radians(lat), math.radians(lon))
+    return coordinates
+
+
+class GreatCircle:
+    """Great-circle bound for ``weight``: the smallest weight per kilometre
+    over the edges of ``graph`` between two located countries."""
+
+    def __init__(self, graph: nx.DiGraph, weight: str, coordinates: Dict, country_of: Callable):
+        self.coordinates = coordinates
+        self.country_of = country_of
+        self.per_km = _INF
+        for u, v, data in graph.edges(data=True):
+            km = _great_circle_km(coordinates[country_of(u)], coordinates[country_of(v)])
+            if km > 0:
+                self.per_km = min(self.per_km, _weight_of(data, weight) / km)
+        if self.per_km == _INF:
+            self.per_km = 0.0
+
+    def heuristic(self, targets: Iterable) -> Callable:
+        places = {self.coordinates[self.country_of(t)] for t in targets}
+        per_km = self.per_km
+        country_of = self.country_of
+        coordinates = self.coordinates
+
+        def bound(node) -> float:
+            here = coordinates[country_of(node)]
+            return per_km * min(_great_circle_km(here, place) for place in places)
+
+        return bound
+
+
+_lock = threading.Lock()
+# (id of graph, cache key) -> thread building that bound.
+_building: Dict[Tuple[int, Hashable], threading.Thread] = {}
+
+
+def _bound_for(graph: nx.DiGraph, key: Hashable, build: Callable):
+    """The bound cached on ``graph`` under ``key`` for its version, or None
+    after making sure ``build()`` is computing it in the background.
+    Unversioned graphs get no bound."""
+    version = graph.graph.get("version")
+    if version is None:
+        return None
+    with _lock:
+        cached = graph.graph.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        slot = (id(graph), key)
+        if slot not in _building:
+            thread = threading.Thread(
+                target=_build, args=(graph, key, version, build, slot), name="goal-directed", daemon=True
+            )
+            _building[slot] = thread
+            thread.start()
+    return None
+
+
+def _build(graph: nx.DiGraph, key: Hashable, version, build: Callable, slot) -> None:
+    built = False
+    try:
+        bound = build()
+        built = True
+    finally:
+        with _lock:
+            del _building[slot]
+            if built:
+                graph.graph[key] = (version, bound)
+
+
+def wait_for_rebuilds(timeout: Optional[float] = None) -> None:
+    """Block until the bounds being built have finished."""
+    with _lock:
+        threads = list(_building.values())
+    for thread in threads:
+        thread.join(timeout)
+
+
+def landmarks_for(graph: nx.DiGraph, weight: str) -> Optional[Landmarks]:
+    """``Landmarks`` of ``graph`` if they are ready, else None."""
+    return _bound_for(graph, ("landmarks", weight), lambda: Landmarks(graph, weight))
+
+
+def great_circle_for(graph: nx.DiGraph, weight: str, country_of: Callable) -> Optional[GreatCircle]:
+    """``GreatCircle`` bound of ``graph`` if it is ready, else None; also None
+    while some country on it has no coordinates."""
+    def build():
+        coordinates = country_coordinates(read_json("countries.json"))
+        if not all(country_of(node) in coordinates for node in graph._adj):
+            return None
+        return GreatCircle(graph, weight, coordinates, country_of)
+
+    return _bound_for(graph, ("great_circle", weight), build)
+
+
+def _identity(node):
+    return node
+
+
+def astar_path(
+    graph: nx.DiGraph,
+    sources: Iterable,
+    targets: Iterable,
+    weight: str,
+    heuristic: str = "alt",
+    country_of: Callable = _identity,
+) -> Optional[Tuple[float, List]]:
+    """(distance, path) of the shortest path from any of ``sources`` to any of
+    ``targets`` by A* with the ``heuristic`` bound (Dijkstra while no bound
+    is ready), or None when there is none. ``country_of`` maps a node to its
+    country for the great-circle bound."""
+    adj = graph._adj
+    sources = [node for node in sources if node in adj]
+    targets = {node for node in targets if node in adj}
+    if not sources or not targets:
+        return None
+
+    bounds = []
+    landmarks = landmarks_for(graph, weight)
+    if landmarks is not None:
+        bounds.append(landmarks.heuristic(targets, sources))
+    if heuristic == "great_circle":
+        great_circle = great_circle_for(graph, weight, country_of)
+        if great_circle is not None:
+            bounds.append(great_circle.heuristic(targets))
+    if not bounds:
+        def h(node):
+            return 0.0  # no bound ready yet: plain Dijkstra
+    elif len(bounds) == 1:
+        h = bounds[0]
+    else:
+        def h(node):
+            return max(bound(node) for bound in bounds)
+
+    dist = {}
+    pred = {}
+    estimate = {}
+    heap = []
+    counter = count()
+    for node in sources:
+        estimate[node] = h(node)
+        if estimate[node] < _INF:
+            dist[node] = 0.0
+            pred[node] = None
+            heappush(heap, (estimate[node], next(counter), node))
+    closed = set()
+    while heap:
+        _, _, node = heappop(heap)
+        if node in closed:
+            continue
+        closed.add(node)
+        if node in targets:
+            path = [node]
+            while pred[path[-1]] is not None:
+                path.append(pred[path[-1]])
+            path.reverse()
+            return dist[node], path
+        d = dist[node]
+        for neighbor, data in adj[node].items():
+            if neighbor in closed:
+                continue
+            candidate = d + _weight_of(data, weight)
+            if candidate < dist.get(neighbor, _INF):
+                if neighbor not in estimate:
+                    estimate[neighbor] = h(neighbor)
+                if estimate[neighbor] == _INF:
+                    continue
+                dist[neighbor] = candidate
+                pred[neighbor] = node
+                heappush(heap, (candidate + estimate[neighbor], next(counter), neighbor))
+    return None
@@ -8,10 +8,38 @@ This engine supports:
 - Realistic transfer costs and times at modal switches
 """
 
+import threading
+from collections import OrderedDict
+from heapq import heappop, heappush
+from itertools import count, islice
+
 import networkx as nx
-from typing import Dict, List, Tuple, Optional
-from managers.factors_manager import get_factors
+import numpy as np
+from typing import Dict, Hashable, List, Tuple, Optional
+from managers.factors_manager import get_factors_versioned
+from managers.network_manager import copy_on_write, edge_changes_since, own_rows
+from managers.world_store import country_ids
+from simulation import contraction_hierarchy, csr_graph, goal_directed
 from simulation.game_theory_engine import compute_factor_impacts
+from utils.settings import (
+    CONTRACTION_HIERARCHIES,
+    EXPANDED_GRAPH_CACHE_SIZE,
+    FACTOR_STATE_CACHE_SIZE,
+    PARETO_LABEL_LIMIT,
+    ROUTING_BACKEND,
+    ROUTING_HEURISTIC,
+)
+
+
+TRANSPORT_MODES = ("land", "sea", "air")
+
+# Mode codes used by the array-backed edge metrics. Routes with any other
+# mode get OTHER_MODE, which has no mode-specific adjustments.
+MODE_CODES = {mode: code for code, mode in enumerate(TRANSPORT_MODES)}
+OTHER_MODE = len(TRANSPORT_MODES)
+
+# Expanded graph nodes are ints: country id * MODE_STRIDE + mode code.
+MODE_STRIDE = len(TRANSPORT_MODES)
 
 
 MODAL_TRANSFER_COSTS = {
@@ -30,6 +58,158 @@ MODAL_CAPACITY_MULTIPLIERS = {
 }
 
 
+_CAPACITY_BY_CODE = np.array(
+    [MODAL_CAPACITY_MULTIPLIERS[mode] for mode in TRANSPORT_MODES] + [1.0]
+)
+
+
+def compute_mode_pressures(factors: Dict) -> np.ndarray:
+    """
+    Mode-specific factor sensitivity, one row per mode code.
+    
+    Each row holds (cost scale, time scale, added risk):
+    - sea routes are more affected by maritime security and climate
+    - land routes by border tensions
+    - air routes by cyber and energy
+    Only factors with a negative effect add pressure.
+    """
+    maritime_pressure = 0.0
+    climate_pressure = 0.0
+    border_pressure = 0.0
+    cyber_pressure = 0.0
+    energy_pressure = 0.0
+    for name, data in (factors or {}).items():
+        effect = float(data.get("effect", 0.0))
+        strength = float(data.get("strength", 0.0))
+        if effect >= 0:
+            continue
+        pressure = abs(effect) * strength
+        if "Maritime" in name or "Climate" in name:
+            maritime_pressure += pressure
+        if "Border" in name or "Diplomatic" in name:
+            border_pressure += pressure
+        if "Cyber" in name:
+            cyber_pressure += pressure
+        elif "Energy" in name:
+            energy_pressure += pressure
+    
+    pressures = np.empty((OTHER_MODE + 1, 3))
+    pressures[MODE_CODES["land"]] = (1.0 + border_pressure * 0.25, 1.0, border_pressure * 0.12)
+    pressures[MODE_CODES["sea"]] = (1.0, 1.0 + climate_pressure * 0.1, maritime_pressure * 0.15)
+    pressures[MODE_CODES["air"]] = (1.0 + energy_pressure * 0.35, 1.0, cyber_pressure * 0.18)
+    pressures[OTHER_MODE] = (1.0, 1.0, 0.0)
+    return pressures
+
+
+class FactorState:
+    """A factor document with its impacts and mode pressures, computed once.
+
+    Shared between callers through ``factor_state``; treat every field as
+    read-only.
+    """
+
+    __slots__ = ("key", "factors", "impacts", "pressures")
+
+    def __init__(self, key: Hashable, factors: Dict):
+        self.key = key
+        self.factors = factors
+        self.impacts = compute_factor_impacts(factors)
+        self.pressures = compute_mode_pressures(factors)
+        self.pressures.flags.writeable = False
+
+
+_factor_states: "OrderedDict[Hashable, FactorState]" = OrderedDict()
+_factor_states_lock = threading.Lock()
+
+
+def _factor_fingerprint(factors: Dict) -> Tuple:
+    return tuple(
+        (name, data.get("effect", 0.0), data.get("strength", 0.0))
+        for name, data in (factors or {}).items()
+    )
+
+
+def factor_state(factors: Optional[Dict] = None) -> FactorState:
+    """
+    Memoized ``FactorState`` for ``factors`` (the live factors by default).
+    
+    The live factor document is keyed on its version from ``factors_manager``,
+    so the common case costs one read and no hashing; any other factor dict
+    is keyed on its contents.
+    """
+    live, version = get_factors_versioned()
+    if factors is None or factors is live:
+        factors, key = live, ("version", version)
+    else:
+        key = _factor_fingerprint(factors)
+    with _factor_states_lock:
+        state = _factor_states.get(key)
+        if state is not None:
+            _factor_states.move_to_end(key)
+            return state
+    state = FactorState(key, factors)
+    with _factor_states_lock:
+        _factor_states[key] = state
+        while len(_factor_states) > FACTOR_STATE_CACHE_SIZE:
+            _factor_states.popitem(last=False)
+    return state
+
+
+class EdgeArrays:
+    """The route edges of a graph as parallel arrays, in ``G.edges()`` order."""
+
+    def __init__(self, G: nx.DiGraph):
+        self.edges = list(G.edges())
+        self.index = {edge: i for i, edge in enumerate(self.edges)}
+        n = len(self.edges)
+        data = [attrs for _, _, attrs in G.edges(data=True)]
+        self.base_cost = np.fromiter((d["cost"] for d in data), dtype=np.float64, count=n)
+        self.base_time = np.fromiter((d["time"] for d in data), dtype=np.float64, count=n)
+        self.base_risk = np.fromiter((d["risk"] for d in data), dtype=np.float64, count=n)
+        self.mode = np.fromiter(
+            (MODE_CODES.get(d.get("mode", "land"), OTHER_MODE) for d in data),
+            dtype=np.uint8,
+            count=n,
+        )
+
+
+_edge_arrays_lock = threading.Lock()
+_edge_arrays: Optional[Tuple[int, EdgeArrays]] = None
+
+
+def get_edge_arrays(G: nx.DiGraph) -> EdgeArrays:
+    """``EdgeArrays`` for ``G``, reused while the shared network keeps its version."""
+    global _edge_arrays
+    graph_ver = G.graph.get("version")
+    if graph_ver is None:
+        return EdgeArrays(G)
+    with _edge_arrays_lock:
+        if _edge_arrays is None or _edge_arrays[0] != graph_ver:
+            _edge_arrays = (graph_ver, EdgeArrays(G))
+        return _edge_arrays[1]
+
+
+def compute_edge_metrics(
+    edges: EdgeArrays,
+    factor_impacts: Dict,
+    pressures: np.ndarray,
+    cargo_weight: float = 1.0,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Adjusted (cost, time, risk) arrays for every edge in one pass.
+    
+    Same model as ``compute_route_entity_metrics``, with the factor impacts
+    and ``compute_mode_pressures`` rows computed once for all edges.
+    """
+    per_mode = pressures[edges.mode]
+    cargo_cost_mult = cargo_weight * _CAPACITY_BY_CODE[edges.mode]
+    cost = edges.base_cost * factor_impacts["cost_multiplier"] * cargo_cost_mult * per_mode[:, 0]
+    time = edges.base_time * factor_impacts["time_multiplier"] * per_mode[:, 1]
+    risk = np.minimum(0.99, edges.base_risk * factor_impacts["risk_multiplier"])
+    risk = np.minimum(0.99, risk + per_mode[:, 2])
+    return cost, time, risk
+
+
 def compute_route_entity_metrics(
     origin: str,
     destination: str,
@@ -38,7 +218,9 @@ def compute_route_entity_metrics(
     base_risk: float,
     mode: str,
     factors: Dict,
-    cargo_weight: float = 1.0
+    cargo_weight: float = 1.0,
+    factor_impacts: Optional[Dict] = None,
+    pressures: Optional[np.ndarray] = None,
 ) -> Dict:
     """
     Compute realistic metrics for a route entity based on factors and cargo.
@@ -52,11 +234,20 @@ def compute_route_entity_metrics(
         mode: Transport mode (land/sea/air)
         factors: Current factor state
         cargo_weight: Total cargo weight affecting capacity costs
+        factor_impacts: ``compute_factor_impacts(factors)``, if already known
+        pressures: ``compute_mode_pressures(factors)``, if already known;
+            both default to the memoized ``factor_state(factors)``
         
     Returns:
         Dictionary with adjusted metrics and breakdown
     """
-    factor_impacts = compute_factor_impacts(factors)
+    if factor_impacts is None or pressures is None:
+        state = factor_state(factors)
+        if factor_impacts is None:
+            factor_impacts = state.impacts
+        if pressures is None:
+            pressures = state.pressures
+    cost_scale, time_scale, added_risk = pressures[MODE_CODES.get(mode, OTHER_MODE)].tolist()
     
     # Mode-specific capacity adjustments
     # cargo_weight is now 1-10 scale representing cargo burden
@@ -64,55 +255,11 @@ def compute_route_entity_metrics(
     # Each unit of cargo_weight adds 20-50% cost depending on mode
     cargo_cost_mult = cargo_weight * capacity_mult
     
-    # Apply factor multipliers
-    adjusted_cost = base_cost * factor_impacts["cost_multiplier"] * cargo_cost_mult
-    adjusted_time = base_time * factor_impacts["time_multiplier"]
+    # Apply factor multipliers, then the mode-specific factor sensitivity
+    adjusted_cost = base_cost * factor_impacts["cost_multiplier"] * cargo_cost_mult * cost_scale
+    adjusted_time = base_time * factor_impacts["time_multiplier"] * time_scale
     adjusted_risk = min(0.99, base_risk * factor_impacts["risk_multiplier"])
-    
-    # Mode-specific factor sensitivity
-    if mode == "sea":
-        # Sea routes more affected by maritime security and climate
-        maritime_pressure = 0.0
-        climate_pressure = 0.0
-        for name, data in factors.items():
-            if "Maritime" in name or "Climate" in name:
-                effect = float(data.get("effect", 0.0))
-                strength = float(data.get("strength", 0.0))
-                if effect < 0:
-                    maritime_pressure += abs(effect) * strength
-        
-        adjusted_risk = min(0.99, adjusted_risk + maritime_pressure * 0.15)
-        adjusted_time = adjusted_time * (1.0 + climate_pressure * 0.1)
-    
-    elif mode == "land":
-        # Land routes affected by border tensions
-        border_pressure = 0.0
-        for name, data in factors.items():
-            if "Border" in name or "Diplomatic" in name:
-                effect = float(data.get("effect", 0.0))
-                strength = float(data.get("strength", 0.0))
-                if effect < 0:
-                    border_pressure += abs(effect) * strength
-        
-        adjusted_cost = adjusted_cost * (1.0 + border_pressure * 0.25)
-        adjusted_risk = min(0.99, adjusted_risk + border_pressure * 0.12)
-    
-    elif mode == "air":
-        # Air routes affected by cyber and energy
-        cyber_pressure = 0.0
-        energy_pressure = 0.0
-        for name, data in factors.items():
-            if "Cyber" in name or "Energy" in name:
-                effect = float(data.get("effect", 0.0))
-                strength = float(data.get("strength", 0.0))
-                if effect < 0:
-                    if "Cyber" in name:
-                        cyber_pressure += abs(effect) * strength
-                    else:
-                        energy_pressure += abs(effect) * strength
-        
-        adjusted_risk = min(0.99, adjusted_risk + cyber_pressure * 0.18)
-        adjusted_cost = adjusted_cost * (1.0 + energy_pressure * 0.35)
+    adjusted_risk = min(0.99, adjusted_risk + added_risk)
     
     return {
         "adjusted_cost": adjusted_cost,
@@ -131,140 +278,478 @@ def compute_route_entity_metrics(
     }
 
 
-def find_hybrid_optimal_route(
+# Edge attribute holding the search weight for each optimization objective.
+# Risk is scaled so it is comparable with cost and time.
+OBJECTIVE_WEIGHTS = {
+    "cost": "cost",
+    "time": "time",
+    "risk": "risk_weight",
+}
+RISK_WEIGHT_SCALE = 1000
+
+_expanded_cache: "OrderedDict[Tuple, Tuple[int, nx.DiGraph]]" = OrderedDict()
+_expanded_lock = threading.Lock()
+# Stamped into expanded.graph["version"] whenever a cached graph changes, so
+# derived structures (the CSR form) know when to rebuild.
+_expanded_versions = count(1)
+
+
+def _route_edge_attrs(u: str, v: str, data: Dict, state: FactorState, cargo_weight: float) -> Dict:
+    route_mode = data.get("mode", "land")
+    metrics = compute_route_entity_metrics(
+        u, v,
+        data["cost"],
+        data["time"],
+        data["risk"],
+        route_mode,
+        state.factors,
+        cargo_weight,
+        state.impacts,
+        state.pressures,
+    )
+    return {
+        "cost": metrics["adjusted_cost"],
+        "time": metrics["adjusted_time"],
+        "risk": metrics["adjusted_risk"],
+        "risk_weight": metrics["adjusted_risk"] * RISK_WEIGHT_SCALE,
+        "mode": route_mode,
+    }
+
+
+def _route_edge_weights(G: nx.DiGraph, state: FactorState, cargo_weight: float):
+    """Search attributes of every route edge of ``G``, in ``G.edges()`` order."""
+    edges = get_edge_arrays(G)
+    cost, time, risk = compute_edge_metrics(edges, state.impacts, state.pressures, cargo_weight)
+    risk_weight = risk * RISK_WEIGHT_SCALE
+    for (u, v), mode, c, t, r, rw in zip(
+        edges.edges,
+        (data.get("mode", "land") for _, _, data in G.edges(data=True)),
+        cost.tolist(), time.tolist(), risk.tolist(), risk_weight.tolist(),
+    ):
+        yield u, v, {"cost": c, "time": t, "risk": r, "risk_weight": rw, "mode": mode}
+
+
+def _transfer_edge_attrs(transfer: Dict, factor_impacts: Dict) -> Dict:
+    risk = transfer["risk"] * factor_impacts["risk_multiplier"]
+    return {
+        "cost": transfer["cost"] * factor_impacts["cost_multiplier"],
+        "time": transfer["time"] * factor_impacts["time_multiplier"],
+        "risk": risk,
+        "risk_weight": risk * RISK_WEIGHT_SCALE,
+        "mode": "transfer",
+    }
+
+
+def _mode_nodes(country: str) -> range:
+    """Expanded nodes of ``country``, in TRANSPORT_MODES order; empty for a
+    name no graph has ever contained."""
+    country_id = country_ids.id_of(country)
+    if country_id is None:
+        return range(0)
+    base = country_id * MODE_STRIDE
+    return range(base, base + MODE_STRIDE)
+
+
+def _route_edge_key(u: str, v: str, mode: str) -> Optional[Tuple[int, int]]:
+    """Expanded edge for a route in ``mode``; None for modes that have no nodes."""
+    code = MODE_CODES.get(mode)
+    u_id, v_id = country_ids.id_of(u), country_ids.id_of(v)
+    if code is None or u_id is None or v_id is None:
+        return None
+    return (u_id * MODE_STRIDE + code, v_id * MODE_STRIDE + code)
+
+
+def _has_country(expanded: nx.DiGraph, node: str) -> bool:
+    nodes = _mode_nodes(node)
+    return bool(nodes) and nodes[0] in expanded
+
+
+def _add_country(expanded: nx.DiGraph, node: str) -> None:
+    base = country_ids.intern(node) * MODE_STRIDE
+    expanded.add_nodes_from(range(base, base + MODE_STRIDE))
+
+
+def _add_transfer_edges(expanded: nx.DiGraph, node: str, factor_impacts: Dict) -> None:
+    base = country_ids.intern(node) * MODE_STRIDE
+    for (mode1, mode2), transfer in MODAL_TRANSFER_COSTS.items():
+        expanded.add_edge(
+            base + MODE_CODES[mode1],
+            base + MODE_CODES[mode2],
+            **_transfer_edge_attrs(transfer, factor_impacts),
+        )
+
+
+def build_expanded_graph(
     G: nx.DiGraph,
-    source: str,
-    destination: str,
     factors: Dict,
     cargo_weight: float = 1.0,
     allow_modal_switches: bool = True,
-    max_switches: int = 3,
-    optimization: str = "cost"  # "cost", "time", or "risk"
-) -> Tuple[Optional[List], Optional[float], Optional[List]]:
-    """
-    Find optimal route allowing hybrid multi-modal transport.
-    
-    Returns:
-        (path, total_cost, modal_sequence)
+    state: Optional[FactorState] = None,
+) -> nx.DiGraph:
+    """Mode-expanded graph: one node per (country, mode), route edges in their
+    native mode and, optionally, modal transfer edges within each country.
+
+    Nodes are ``country id * MODE_STRIDE + mode code`` ints; ``_country_sequence``
+    turns a path back into country names. Routes in a mode outside
+    TRANSPORT_MODES have no nodes to run between and are left out. ``state``
+    is ``factor_state(factors)``, if already known.
     """
-    if source not in G or destination not in G:
-        return None, None, None
-    
-    factor_impacts = compute_factor_impacts(factors)
-    
-    # Build expanded graph with mode-specific nodes
+    state = state or factor_state(factors)
     expanded = nx.DiGraph()
-    
-    # Add mode-specific versions of each node
+
     for node in G.nodes():
-        for mode in ["land", "sea", "air"]:
-            expanded.add_node(f"{node}_{mode}", country=node, mode=mode)
-    
-    # Add edges within same mode
-    for u, v, data in G.edges(data=True):
-        route_mode = data.get("mode", "land")
-        
-        metrics = compute_route_entity_metrics(
-            u, v,
-            data["cost"],
-            data["time"],
-            data["risk"],
-            route_mode,
-            factors,
-            cargo_weight
-        )
-        
-        # Calculate weight based on optimization priority
-        if optimization == "cost":
-            weight = metrics["adjusted_cost"]
-        elif optimization == "time":
-            weight = metrics["adjusted_time"]
-        elif optimization == "risk":
-            weight = metrics["adjusted_risk"] * 1000  # Scale risk to be comparable
-        else:
-            weight = metrics["adjusted_cost"]
-        
-        # Add edge for the route's native mode
-        expanded.add_edge(
-            f"{u}_{route_mode}",
-            f"{v}_{route_mode}",
-            cost=metrics["adjusted_cost"],
-            weight=weight,
-            time=metrics["adjusted_time"],
-            risk=metrics["adjusted_risk"],
-            mode=route_mode
-        )
-    
-    # Add modal transfer edges if allowed
+        _add_country(expanded, node)
+
+    for u, v, attrs in _route_edge_weights(G, state, cargo_weight):
+        key = _route_edge_key(u, v, attrs["mode"])
+        if key is not None:
+            expanded.add_edge(*key, **attrs)
+
     if allow_modal_switches:
         for node in G.nodes():
-            modes = ["land", "sea", "air"]
-            for i, mode1 in enumerate(modes):
-                for mode2 in modes[i+1:]:
-                    transfer_key = (mode1, mode2)
-                    rev_transfer_key = (mode2, mode1)
-                    
-                    if transfer_key in MODAL_TRANSFER_COSTS:
-                        transfer = MODAL_TRANSFER_COSTS[transfer_key]
-                        # Calculate transfer weight based on optimization
-                        if optimization == "cost":
-                            transfer_weight = transfer["cost"] * factor_impacts["cost_multiplier"]
-                        elif optimization == "time":
-                            transfer_weight = transfer["time"] * factor_impacts["time_multiplier"]
-                        elif optimization == "risk":
-                            transfer_weight = transfer["risk"] * factor_impacts["risk_multiplier"] * 1000
-                        else:
-                            transfer_weight = transfer["cost"] * factor_impacts["cost_multiplier"]
-                        
-                        expanded.add_edge(
-                            f"{node}_{mode1}",
-                            f"{node}_{mode2}",
-                            cost=transfer["cost"] * factor_impacts["cost_multiplier"],
-                            weight=transfer_weight,
-                            time=transfer["time"] * factor_impacts["time_multiplier"],
-                            risk=transfer["risk"] * factor_impacts["risk_multiplier"],
-                            mode="transfer"
-                        )
-                    
-                    if rev_transfer_key in MODAL_TRANSFER_COSTS:
-                        transfer = MODAL_TRANSFER_COSTS[rev_transfer_key]
-                        # Calculate transfer weight based on optimization
-                        if optimization == "cost":
-                            transfer_weight = transfer["cost"] * factor_impacts["cost_multiplier"]
-                        elif optimization == "time":
-                            transfer_weight = transfer["time"] * factor_impacts["time_multiplier"]
-                        elif optimization == "risk":
-                            transfer_weight = transfer["risk"] * factor_impacts["risk_multiplier"] * 1000
-                        else:
-                            transfer_weight = transfer["cost"] * factor_impacts["cost_multiplier"]
-                        
-                        expanded.add_edge(
-                            f"{node}_{mode2}",
-                            f"{node}_{mode1}",
-                            cost=transfer["cost"] * factor_impacts["cost_multiplier"],
-                            weight=transfer_weight,
-                            time=transfer["time"] * factor_impacts["time_multiplier"],
-                            risk=transfer["risk"] * factor_impacts["risk_multiplier"],
-                            mode="transfer"
-                        )
-    
-    # Find shortest path across all modal combinations
+            _add_transfer_edges(expanded, node, state.impacts)
+
+    return expanded
+
+
+def _reweight_expanded_graph(G, expanded, state, cargo_weight) -> nx.DiGraph:
+    """Copy of ``expanded`` with every edge weight recomputed for new factors."""
+    reweighted = expanded.copy()
+    for u, v, data in reweighted.edges(data=True):
+        if data["mode"] == "transfer":
+            transfer = MODAL_TRANSFER_COSTS[
+                (TRANSPORT_MODES[u % MODE_STRIDE], TRANSPORT_MODES[v % MODE_STRIDE])
+            ]
+            data.update(_transfer_edge_attrs(transfer, state.impacts))
+    for u, v, attrs in _route_edge_weights(G, state, cargo_weight):
+        key = _route_edge_key(u, v, attrs["mode"])
+        if key is not None:
+            reweighted.edges[key].update(attrs)
+    return reweighted
+
+
+def _patch_expanded_graph(G, expanded, changed_edges, state, cargo_weight, allow_modal_switches):
+    """Copy of ``expanded`` brought up to date with ``G`` for the given
+    changed route edges; graphs already handed out are never modified. The
+    copy shares every adjacency row but those of the changed countries'
+    mode nodes with ``expanded``."""
+    def route_key(u, v):
+        return _route_edge_key(u, v, G[u][v].get("mode", "land")) if G.has_edge(u, v) else None
+
+    previous = expanded
+    expanded = copy_on_write(previous)
+    own_rows(expanded, previous, [node for edge in changed_edges for country in edge for node in _mode_nodes(country)])
+
+    for u, v in changed_edges:
+        for node in (u, v):
+            if node in G and not _has_country(expanded, node):
+                _add_country(expanded, node)
+                if allow_modal_switches:
+                    _add_transfer_edges(expanded, node, state.impacts)
+
+        key = route_key(u, v)
+        for pair in zip(_mode_nodes(u), _mode_nodes(v)):
+            if pair != key and expanded.has_edge(*pair):
+                expanded.remove_edge(*pair)
+        if key is not None:
+            attrs = _route_edge_attrs(u, v, G[u][v], state, cargo_weight)
+            if expanded.has_edge(*key):
+                expanded.edges[key].update(attrs)
+            else:
+                expanded.add_edge(*key, **attrs)
+
+        for node in (u, v):
+            if node not in G and _has_country(expanded, node):
+                nodes = _mode_nodes(node)
+                own_rows(expanded, previous, {n for m in nodes for n in nx.all_neighbors(expanded, m)})
+                expanded.remove_nodes_from(nodes)
+
+    return expanded
+
+
+def get_expanded_graph(
+    G: nx.DiGraph,
+    factors: Dict,
+    cargo_weight: float = 1.0,
+    allow_modal_switches: bool = True,
+    state: Optional[FactorState] = None,
+) -> nx.DiGraph:
+    """Cached ``build_expanded_graph`` for the shared, versioned network graph.
+
+    Entries are keyed on (factor state key, cargo_weight, allow_modal_switches)
+    and remember the graph version they reflect. A stale entry is patched for
+    just the route edges that changed since; a new factor state reuses the
+    structure of an entry for the same graph and only recomputes weights.
+    The result is shared and must be treated as read-only.
+    """
+    state = state or factor_state(factors)
+    graph_ver = G.graph.get("version")
+    if graph_ver is None:
+        return build_expanded_graph(G, factors, cargo_weight, allow_modal_switches, state)
+
+    key = (state.key, float(cargo_weight), bool(allow_modal_switches))
+    with _expanded_lock:
+        cached = _expanded_cache.get(key)
+        if cached is not None:
+            _expanded_cache.move_to_end(key)
+            cached_ver, expanded = cached
+            if cached_ver == graph_ver:
+                return expanded
+            changed = edge_changes_since(cached_ver) if cached_ver < graph_ver else None
+            if changed is not None:
+                expanded = _patch_expanded_graph(
+                    G, expanded, changed, state, cargo_weight, allow_modal_switches
+                )
+                expanded.graph["version"] = next(_expanded_versions)
+                _expanded_cache[key] = (graph_ver, expanded)
+                return expanded
+
+        sibling = next(
+            (
+                entry
+                for (_, weight, switches), (ver, entry) in reversed(_expanded_cache.items())
+                if ver == graph_ver and weight == key[1] and switches == key[2]
+            ),
+            None,
+        )
+        if sibling is not None:
+            expanded = _reweight_expanded_graph(G, sibling, state, cargo_weight)
+        else:
+            expanded = build_expanded_graph(G, factors, cargo_weight, allow_modal_switches, state)
+
+        expanded.graph["version"] = next(_expanded_versions)
+        _expanded_cache[key] = (graph_ver, expanded)
+        while len(_expanded_cache) > EXPANDED_GRAPH_CACHE_SIZE:
+            _expanded_cache.popitem(last=False)
+        return expanded
+
+
+def _path_total(expanded: nx.DiGraph, path: List, attr: str) -> float:
+    return sum(expanded[path[i]][path[i + 1]][attr] for i in range(len(path) - 1))
+
+
+def _count_switches(expanded: nx.DiGraph, path: List) -> int:
+    return sum(
+        1 for i in range(len(path) - 1) if expanded[path[i]][path[i + 1]]["mode"] == "transfer"
+    )
+
+
+def _destination_targets(destinations) -> Dict[int, str]:
+    return {node: destination for destination in destinations for node in _mode_nodes(destination)}
+
+
+def _best_multimodal_path(expanded: nx.DiGraph, source: str, destination: str, weight_key: str):
+    """Single Dijkstra from every mode of ``source`` to the first settled mode of
+    ``destination``.
+
+    Equivalent to searching from a virtual super-source with zero-weight edges
+    to the land/sea/air nodes of ``source`` to a virtual super-sink fed by the
+    destination modes, without touching the shared expanded graph.
+    """
+    return _best_multimodal_paths(expanded, source, [destination], weight_key).get(destination)
+
+
+def _best_multimodal_paths(expanded: nx.DiGraph, source: str, destinations, weight_key: str) -> Dict[str, List[int]]:
+    """``_best_multimodal_path`` to each of ``destinations`` from one Dijkstra
+    tree. The search stops once every destination has a settled mode;
+    unreachable destinations are left out."""
+    sources = _mode_nodes(source)
+    targets = _destination_targets(destinations)
+    remaining = set(targets.values())
+    paths = {}
+    adj = expanded._adj
+    dist = {}
+    pred = {}
+    seen = {}
+    heap = []
+    counter = count()
+    for node in sources:
+        if node in adj:
+            seen[node] = 0.0
+            pred[node] = None
+            heappush(heap, (0.0, next(counter), node))
+
+    while heap:
+        d, _, node = heappop(heap)
+        if node in dist:
+            continue
+        dist[node] = d
+        if node in targets and targets[node] in remaining:
+            path = [node]
+            while pred[path[-1]] is not None:
+                path.append(pred[path[-1]])
+            path.reverse()
+            paths[targets[node]] = path
+            remaining.discard(targets[node])
+            if not remaining:
+                return paths
+        for neighbor, data in adj[node].items():
+            candidate = d + data[weight_key]
+            if neighbor not in dist and (neighbor not in seen or candidate < seen[neighbor]):
+                seen[neighbor] = candidate
+                pred[neighbor] = node
+                heappush(heap, (candidate, next(counter), neighbor))
+    return paths
+
+
+def _constrained_multimodal_path(
+    expanded: nx.DiGraph,
+    source: str,
+    destination: str,
+    weight_key: str,
+    max_switches: Optional[int] = None,
+    max_time: Optional[float] = None,
+    max_risk: Optional[float] = None,
+):
+    """Exact resource-constrained shortest path over the mode-expanded graph.
+
+    Label-setting search: each label carries the modal switches, elapsed time
+    and survival probability (1 - accumulated risk) of one partial path, and
+    labels that break a limit are never created. Labels leave the heap in
+    ``weight_key`` order, so one that is no better than an already settled
+    label at the same node in every constrained resource is dropped. The first
+    label to reach a destination mode is the optimum under the limits.
+    Resources without a limit are not tracked, so they never block pruning.
+    """
+    return _constrained_multimodal_paths(
+        expanded, source, [destination], weight_key, max_switches, max_time, max_risk
+    ).get(destination)
+
+
+def _constrained_multimodal_paths(
+    expanded: nx.DiGraph,
+    source: str,
+    destinations,
+    weight_key: str,
+    max_switches: Optional[int] = None,
+    max_time: Optional[float] = None,
+    max_risk: Optional[float] = None,
+    max_cost: Optional[float] = None,
+) -> Dict[str, List[int]]:
+    """``_constrained_multimodal_path`` to each of ``destinations`` from one
+    label search, which keeps expanding through reached destinations until
+    all of them have a path. Unreachable destinations are left out.
+
+    ``destinations=None`` routes to every country the limits allow, and
+    ``max_cost`` adds a cost budget to the other limits.
+    """
+    track_switches = max_switches is not None
+    track_time = max_time is not None
+    track_risk = max_risk is not None
+    track_cost = max_cost is not None
+    if destinations is None:
+        targets = None
+        remaining = None
+    else:
+        targets = _destination_targets(destinations)
+        remaining = set(targets.values())
+    paths = {}
+    adj = expanded._adj
+    heap = []
+    counter = count()
+    for node in _mode_nodes(source):
+        if node in adj:
+            heappush(heap, (0.0, next(counter), node, 0, 0.0, 1.0, 0.0, None))
+
+    if track_time or track_risk or track_cost:
+        settled: Dict[int, List[Tuple[int, float, float, float]]] = {}
+
+        def dominated(node, switches, elapsed, survival, spent):
+            return any(
+                s <= switches and t <= elapsed and v >= survival and c <= spent
+                for s, t, v, c in settled.get(node, ())
+            )
+
+        def settle(node, switches, elapsed, survival, spent):
+            settled.setdefault(node, []).append((switches, elapsed, survival, spent))
+    else:
+        # Only switches are tracked, so the fewest switches settled at a node
+        # decides dominance on its own.
+        fewest: Dict[int, int] = {}
+
+        def dominated(node, switches, elapsed, survival, spent):
+            return fewest.get(node, switches + 1) <= switches
+
+        def settle(node, switches, elapsed, survival, spent):
+            fewest[node] = switches
+
+    while heap:
+        weight, _, node, switches, elapsed, survival, spent, trail = heappop(heap)
+        if dominated(node, switches, elapsed, survival, spent):
+            continue
+        settle(node, switches, elapsed, survival, spent)
+        trail = (node, trail)
+        if targets is None:
+            reached = node // MODE_STRIDE
+            if reached not in paths:
+                paths[reached] = trail
+        elif node in targets and targets[node] in remaining:
+            paths[targets[node]] = trail
+            remaining.discard(targets[node])
+            if not remaining:
+                break
+
+        for neighbor, data in adj[node].items():
+            next_switches = switches
+            if track_switches and data["mode"] == "transfer":
+                next_switches += 1
+                if next_switches > max_switches:
+                    continue
+            next_elapsed = elapsed
+            if track_time:
+                next_elapsed += data["time"]
+                if next_elapsed > max_time:
+                    continue
+            next_survival = survival
+            if track_risk:
+                next_survival *= 1 - data["risk"]
+                if 1 - next_survival > max_risk:
+                    continue
+            next_spent = spent
+            if track_cost:
+                next_spent += data["cost"]
+                if next_spent > max_cost:
+                    continue
+            if dominated(neighbor, next_switches, next_elapsed, next_survival, next_spent):
+                continue
+            heappush(heap, (
+                weight + data[weight_key], next(counter),
+                neighbor, next_switches, next_elapsed, next_survival, next_spent, trail,
+            ))
+
+    if targets is None:
+        paths = {country_ids.name_of(country): trail for country, trail in paths.items()}
+    for key, trail in paths.items():
+        path = []
+        while trail is not None:
+            step, trail = trail
+            path.append(step)
+        path.reverse()
+        paths[key] = path
+    return paths
+
+
+def _pairwise_mode_search(expanded, source, destination, weight_key, max_switches):
+    """Previous search strategy: one Dijkstra per (source mode, destination mode)
+    pair, keeping the cheapest path within ``max_switches``. Nine searches per
+    call, and a pair whose shortest path switches too often is dropped rather
+    than re-searched. Kept as the baseline in scripts/benchmark_hybrid_routing.py."""
     best_path = None
     best_cost = float('inf')
     
-    for source_mode in ["land", "sea", "air"]:
-        for dest_mode in ["land", "sea", "air"]:
+    for source_node in _mode_nodes(source):
+        for dest_node in _mode_nodes(destination):
             try:
                 path = nx.shortest_path(
                     expanded,
-                    f"{source}_{source_mode}",
-                    f"{destination}_{dest_mode}",
-                    weight="weight"  # Use optimization-specific weight
+                    source_node,
+                    dest_node,
+                    weight=weight_key  # Use optimization-specific weight
                 )
                 
                 # Count modal switches
                 switches = sum(1 for i in range(len(path)-1) 
-                             if path[i].split('_')[1] != path[i+1].split('_')[1])
+                             if path[i] % MODE_STRIDE != path[i+1] % MODE_STRIDE)
                 
                 if switches <= max_switches:
                     cost = sum(
@@ -278,19 +763,652 @@ def find_hybrid_optimal_route(
             except nx.NetworkXNoPath:
                 continue
     
-    if best_path is None:
-        return None, None, None
+    return best_path
+
+
+def _add_search_resources(csr: "csr_graph.CSRGraph") -> None:
+    # Additive forms of the constrained-search resources: one switch per
+    # transfer edge, and -log(1 - risk) so survival multiplies by addition.
+    csr.add_weight("switches", (csr.modes == csr_graph.MODE_CODES["transfer"]).astype(np.float64))
+    csr.add_weight("log_survival", -np.log1p(-csr.weights["risk"]))
+
+
+def _csr_multimodal_path(expanded, source, destination, weight_key, max_switches, max_time, max_risk):
+    """``_best_multimodal_path``/``_constrained_multimodal_path`` on the CSR form
+    of ``expanded``."""
+    return _csr_multimodal_paths(
+        expanded, source, [destination], weight_key, max_switches, max_time, max_risk
+    ).get(destination)
+
+
+def _csr_multimodal_paths(
+    expanded, source, destinations, weight_key, max_switches, max_time, max_risk, max_cost=None
+):
+    """``_csr_multimodal_path`` to each of ``destinations`` (every country for
+    None) from one search."""
+    csr = csr_graph.csr_for(
+        expanded, ("cost", "time", "risk", "risk_weight"), extend=_add_search_resources
+    )
+    sources = _mode_nodes(source)
+    if destinations is None:
+        countries = {node // MODE_STRIDE for node in csr.nodes}
+        targets = {
+            country_ids.name_of(country): range(country * MODE_STRIDE, (country + 1) * MODE_STRIDE)
+            for country in sorted(countries)
+        }
+    else:
+        targets = {destination: _mode_nodes(destination) for destination in destinations}
+    limits = []
+    if max_switches is not None:
+        limits.append(("switches", max_switches))
+    if max_time is not None:
+        limits.append(("time", max_time))
+    if max_risk is not None and max_risk < 1:
+        limits.append(("log_survival", -np.log1p(-max_risk)))
+    if max_cost is not None:
+        limits.append(("cost", max_cost))
+    if not limits:
+        return csr.multi_source_paths(sources, targets, weight_key)
+    return csr.constrained_paths(sources, targets, weight_key, limits)
+
+
+def _node_country(node: int) -> str:
+    return country_ids.name_of(node // MODE_STRIDE)
+
+
+def _point_to_point_paths(expanded, search, source, destinations, max_switches):
+    """Unconstrained optimal paths from ``search(sources, targets)``, a
+    contraction-hierarchy or A* query returning (distance, path) or None.
+    Returns the paths found and the destinations still to search: those
+    whose optimum breaks ``max_switches`` need the constrained search."""
+    paths = {}
+    undecided = []
+    sources = _mode_nodes(source)
+    for destination in destinations:
+        found = search(sources, _mode_nodes(destination))
+        if found is None:
+            continue
+        path = found[1]
+        if max_switches is not None and _count_switches(expanded, path) > max_switches:
+            undecided.append(destination)
+        else:
+            paths[destination] = path
+    return paths, undecided
+
+
+def find_hybrid_optimal_route(
+    G: nx.DiGraph,
+    source: str,
+    destination: str,
+    factors: Dict,
+    cargo_weight: float = 1.0,
+    allow_modal_switches: bool = True,
+    max_switches: Optional[int] = 3,
+    optimization: str = "cost",  # "cost", "time", or "risk"
+    max_time: Optional[float] = None,
+    max_risk: Optional[float] = None,
+    state: Optional[FactorState] = None,
+) -> Tuple[Optional[List], Optional[float], Optional[List]]:
+    """
+    Find optimal route allowing hybrid multi-modal transport.
     
-    # Extract country sequence and modal sequence
-    country_path = [node.split('_')[0] for node in best_path]
-    modal_sequence = [node.split('_')[1] for node in best_path]
+    The route is optimal for ``optimization`` among paths with at most
+    ``max_switches`` modal switches (None for no limit), at most ``max_time``
+    hours and at most ``max_risk`` accumulated risk, when those are given.
+    ``state`` is ``factor_state(factors)``, if the caller already has it.
     
-    # Remove consecutive duplicates from country path
-    clean_path = [country_path[0]]
-    clean_modes = [modal_sequence[0]]
-    for i in range(1, len(country_path)):
-        if country_path[i] != clean_path[-1] or modal_sequence[i] != clean_modes[-1]:
-            clean_path.append(country_path[i])
-            clean_modes.append(modal_sequence[i])
+    Returns:
+        (path, total_cost, modal_sequence)
+    """
+    return find_hybrid_optimal_routes(
+        G, source, [destination], factors, cargo_weight, allow_modal_switches,
+        max_switches, optimization, max_time, max_risk, state,
+    )[destination]
+
+
+def find_hybrid_optimal_routes(
+    G: nx.DiGraph,
+    source: str,
+    destinations: List[str],
+    factors: Dict,
+    cargo_weight: float = 1.0,
+    allow_modal_switches: bool = True,
+    max_switches: Optional[int] = 3,
+    optimization: str = "cost",
+    max_time: Optional[float] = None,
+    max_risk: Optional[float] = None,
+    state: Optional[FactorState] = None,
+) -> Dict[str, Tuple[Optional[List], Optional[float], Optional[List]]]:
+    """
+    ``find_hybrid_optimal_route`` from ``source`` to every destination at once.
     
-    return clean_path, best_cost, clean_modes
+    One search tree from ``source`` serves all destinations, and each route is
+    the one a single-destination call returns.
+    
+    Returns:
+        {destination: (path, total_cost, modal_sequence)}, with
+        (None, None, None) for destinations that cannot be reached
+    """
+    routes = {destination: (None, None, None) for destination in destinations}
+    wanted = [destination for destination in routes if destination in G]
+    if source not in G or not wanted:
+        return routes
+    
+    state = state or factor_state(factors)
+    expanded = get_expanded_graph(G, factors, cargo_weight, allow_modal_switches, state)
+    weight_key = OBJECTIVE_WEIGHTS.get(optimization, "cost")
+    
+    if not allow_modal_switches:
+        max_switches = None
+    paths = {}
+    if max_time is None and max_risk is None:
+        hierarchy = None
+        # Cargo weight leaves time and risk alone, so one hierarchy per
+        # network version serves every weight; cost ones only unit weight.
+        if CONTRACTION_HIERARCHIES and (weight_key != "cost" or float(cargo_weight) == 1.0):
+            hierarchy = contraction_hierarchy.hierarchy_for(
+                expanded, (state.key, bool(allow_modal_switches)), weight_key, G.graph.get("version")
+            )
+        if hierarchy is not None:
+            paths, wanted = _point_to_point_paths(expanded, hierarchy.shortest_path, source, wanted, max_switches)
+        elif ROUTING_HEURISTIC != "none" and len(wanted) == 1:
+            def search(sources, targets):
+                return goal_directed.astar_path(
+                    expanded, sources, targets, weight_key, ROUTING_HEURISTIC, _node_country
+                )
+            paths, wanted = _point_to_point_paths(expanded, search, source, wanted, max_switches)
+    if wanted:
+        if ROUTING_BACKEND == "csr":
+            paths.update(_csr_multimodal_paths(
+                expanded, source, wanted, weight_key, max_switches, max_time, max_risk
+            ))
+        elif max_switches is None and max_time is None and max_risk is None:
+            paths.update(_best_multimodal_paths(expanded, source, wanted, weight_key))
+        else:
+            paths.update(_constrained_multimodal_paths(
+                expanded, source, wanted, weight_key, max_switches, max_time, max_risk
+            ))
+    
+    for destination, path in paths.items():
+        clean_path, clean_modes = _country_sequence(path)
+        routes[destination] = (clean_path, _path_total(expanded, path, "cost"), clean_modes)
+    return routes
+
+
+def find_reachable_countries(
+    G: nx.DiGraph,
+    source: str,
+    factors: Dict,
+    cargo_weight: float = 1.0,
+    allow_modal_switches: bool = True,
+    max_switches: Optional[int] = 3,
+    optimization: str = "cost",
+    max_cost: Optional[float] = None,
+    max_time: Optional[float] = None,
+    max_risk: Optional[float] = None,
+    state: Optional[FactorState] = None,
+) -> Dict[str, Dict]:
+    """
+    Every country reachable from ``source`` within the cost/time/risk budgets.
+    
+    One bounded label search over the mode-expanded graph: a partial route
+    that would go over a budget is never extended, so the search ends as
+    soon as everything left on the frontier is out of budget. Each country
+    gets the route that is best for ``optimization`` among those within the
+    budgets and ``max_switches``.
+    
+    Returns:
+        {country: {"path", "modes", "cost", "time", "risk", "predecessor"}},
+        where ``predecessor`` is the previous country on the route (None for
+        ``source``) and ``risk`` is the accumulated risk
+    """
+    if source not in G:
+        return {}
+    
+    expanded = get_expanded_graph(G, factors, cargo_weight, allow_modal_switches, state)
+    weight_key = OBJECTIVE_WEIGHTS.get(optimization, "cost")
+    if not allow_modal_switches:
+        max_switches = None
+    if ROUTING_BACKEND == "csr":
+        paths = _csr_multimodal_paths(
+            expanded, source, None, weight_key, max_switches, max_time, max_risk, max_cost
+        )
+    else:
+        paths = _constrained_multimodal_paths(
+            expanded, source, None, weight_key, max_switches, max_time, max_risk, max_cost
+        )
+    
+    reachable = {}
+    for country, path in paths.items():
+        survival = 1.0
+        for i in range(len(path) - 1):
+            survival *= 1 - expanded[path[i]][path[i + 1]]["risk"]
+        clean_path, clean_modes = _country_sequence(path)
+        stops = [stop for i, stop in enumerate(clean_path) if i == 0 or clean_path[i - 1] != stop]
+        reachable[country] = {
+            "path": clean_path,
+            "modes": clean_modes,
+            "cost": _path_total(expanded, path, "cost"),
+            "time": _path_total(expanded, path, "time"),
+            "risk": 1 - survival,
+            "predecessor": stops[-2] if len(stops) > 1 else None,
+        }
+    return reachable
+
+
+def find_costs_to(
+    G: nx.DiGraph,
+    destination: str,
+    origins: List[str],
+    factors: Dict,
+    cargo_weight: float = 1.0,
+    allow_modal_switches: bool = True,
+    optimization: str = "cost",
+    state: Optional[FactorState] = None,
+) -> Dict[str, float]:
+    """
+    Optimal route weight from each of ``origins`` to ``destination``.
+
+    One Dijkstra from the modes of ``destination`` over reversed edges,
+    stopping once every origin has a settled mode, instead of one search
+    per origin. Routes are unconstrained (any number of modal switches).
+
+    Returns:
+        {origin: total ``optimization`` weight}; unreachable origins are left out
+    """
+    costs = {}
+    if destination not in G:
+        return costs
+    origin_of = _destination_targets([origin for origin in origins if origin in G and origin != destination])
+    if not origin_of:
+        return costs
+
+    expanded = get_expanded_graph(G, factors, cargo_weight, allow_modal_switches, state)
+    weight_key = OBJECTIVE_WEIGHTS.get(optimization, "cost")
+    pred = expanded._pred
+    remaining = set(origin_of.values())
+    dist = {}
+    seen = {}
+    heap = []
+    counter = count()
+    for node in _mode_nodes(destination):
+        if node in pred:
+            seen[node] = 0.0
+            heappush(heap, (0.0, next(counter), node))
+    while heap and remaining:
+        d, _, node = heappop(heap)
+        if node in dist:
+            continue
+        dist[node] = d
+        origin = origin_of.get(node)
+        if origin in remaining:
+            remaining.discard(origin)
+            costs[origin] = d
+        for previous, data in pred[node].items():
+            candidate = d + data[weight_key]
+            if previous not in dist and candidate < seen.get(previous, float("inf")):
+                seen[previous] = candidate
+                heappush(heap, (candidate, next(counter), previous))
+    return costs
+
+
+# Loopless paths Yen's algorithm may enumerate per route find_k_routes returns.
+K_ROUTES_SEARCH_FACTOR = 20
+
+# Virtual node ahead of every source mode in the k-shortest-paths search.
+_ROOT = -1
+
+
+def _distances_to_targets(expanded: nx.DiGraph, sources, targets, weight_key: str):
+    """Distance from every node to the nearest target and the next node on
+    the way, from one Dijkstra over reversed edges. Source modes are only
+    entered from the virtual root, so no path is extended backwards through
+    them; the root itself gets the best source."""
+    pred = expanded._pred
+    dist = {}
+    succ = {}
+    seen = {}
+    heap = []
+    counter = count()
+    for node in targets:
+        seen[node] = 0.0
+        succ[node] = None
+        heappush(heap, (0.0, next(counter), node))
+    while heap:
+        d, _, node = heappop(heap)
+        if node in dist:
+            continue
+        dist[node] = d
+        if node in sources:
+            continue
+        for previous, data in pred[node].items():
+            candidate = d + data[weight_key]
+            if previous not in dist and previous not in targets and candidate < seen.get(previous, float("inf")):
+                seen[previous] = candidate
+                succ[previous] = node
+                heappush(heap, (candidate, next(counter), previous))
+    reached = [node for node in sources if node in dist]
+    if reached:
+        best = min(reached, key=dist.__getitem__)
+        dist[_ROOT] = dist[best]
+        succ[_ROOT] = best
+    return dist, succ
+
+
+def _spur_path(expanded, spur, sources, targets, weight_key, dist, succ, blocked_nodes, blocked_edges):
+    """Shortest (weight, path) from ``spur`` to a target avoiding the blocked
+    nodes and edges, or None.
+
+    The shortest-path tree towards the targets is shared by every spur
+    search: when its path from ``spur`` avoids everything blocked it is the
+    answer outright, and otherwise its distances, which removals can only
+    lengthen, steer an A* search.
+    """
+    if spur not in dist:
+        return None
+    path = [spur]
+    while succ[path[-1]] is not None:
+        step = succ[path[-1]]
+        if step in blocked_nodes or (path[-1], step) in blocked_edges:
+            break
+        path.append(step)
+    else:
+        return dist[spur], path
+
+    adj = expanded._adj
+    g = {spur: 0.0}
+    pred = {spur: None}
+    heap = [(dist[spur], 0, spur)]
+    counter = count(1)
+    closed = set()
+    while heap:
+        _, _, node = heappop(heap)
+        if node in closed:
+            continue
+        closed.add(node)
+        if node in targets:
+            path = [node]
+            while pred[path[-1]] is not None:
+                path.append(pred[path[-1]])
+            path.reverse()
+            return g[node], path
+        if node == _ROOT:
+            neighbors = ((source, 0.0) for source in sources if source in adj)
+        else:
+            neighbors = (
+                (neighbor, data[weight_key])
+                for neighbor, data in adj[node].items()
+                if neighbor not in sources
+            )
+        for neighbor, weight in neighbors:
+            if neighbor in closed or neighbor in blocked_nodes or neighbor not in dist:
+                continue
+            if (node, neighbor) in blocked_edges:
+                continue
+            candidate = g[node] + weight
+            if candidate < g.get(neighbor, float("inf")):
+                g[neighbor] = candidate
+                pred[neighbor] = node
+                heappush(heap, (candidate + dist[neighbor], next(counter), neighbor))
+    return None
+
+
+def _k_shortest_paths(expanded: nx.DiGraph, source: str, destination: str, weight_key: str):
+    """Loopless expanded paths from any mode of ``source`` to any mode of
+    ``destination`` in order of ``weight_key`` (Yen's algorithm).
+
+    Paths start with a virtual root ahead of the source modes, never re-enter
+    a source mode and stop at the first destination mode, so the same route
+    is not enumerated again with extra transfers at either end.
+    """
+    adj = expanded._adj
+    sources = frozenset(node for node in _mode_nodes(source) if node in adj)
+    targets = frozenset(node for node in _mode_nodes(destination) if node in adj)
+    if not sources or not targets:
+        return
+    dist, succ = _distances_to_targets(expanded, sources, targets, weight_key)
+    first = _spur_path(expanded, _ROOT, sources, targets, weight_key, dist, succ, (), ())
+    if first is None:
+        return
+
+    def step_weight(u, v):
+        return 0.0 if u == _ROOT else adj[u][v][weight_key]
+
+    found = [first[1]]
+    candidates = []
+    queued = {tuple(first[1])}
+    counter = count()
+    yield first[1][1:]
+    while True:
+        previous = found[-1]
+        prefix = 0.0
+        for i in range(len(previous) - 1):
+            root = previous[: i + 1]
+            blocked_edges = {tuple(path[i : i + 2]) for path in found if path[: i + 1] == root}
+            spur = _spur_path(
+                expanded, previous[i], sources, targets, weight_key, dist, succ, set(root[:-1]), blocked_edges
+            )
+            if spur is not None:
+                path = root[:-1] + spur[1]
+                if tuple(path) not in queued:
+                    queued.add(tuple(path))
+                    heappush(candidates, (prefix + spur[0], next(counter), path))
+            prefix += step_weight(previous[i], previous[i + 1])
+        if not candidates:
+            return
+        _, _, path = heappop(candidates)
+        found.append(path)
+        yield path[1:]
+
+
+def _route_edges(path: List[int]) -> List[Tuple[int, int]]:
+    """Country-to-country steps of an expanded path, transfers left out."""
+    countries = [node // MODE_STRIDE for node in path]
+    return [(u, v) for u, v in zip(countries, countries[1:]) if u != v]
+
+
+def find_k_routes(
+    G: nx.DiGraph,
+    source: str,
+    destination: str,
+    factors: Dict,
+    k: int = 3,
+    optimization: str = "cost",
+    diversity: float = 0.0,
+    cargo_weight: float = 1.0,
+    allow_modal_switches: bool = True,
+    max_switches: Optional[int] = None,
+    state: Optional[FactorState] = None,
+) -> List[Tuple[List, float, List]]:
+    """
+    Up to ``k`` alternative routes, best ``optimization`` first.
+    
+    Routes never visit a country twice and differ in at least one
+    country-to-country step. ``diversity`` (0 to 1) is the share of a route's
+    steps that must not appear in any better route already returned, so 0
+    keeps every distinct route and 1 only keeps routes sharing no step.
+    Routes with more than ``max_switches`` modal switches are skipped.
+    
+    Returns:
+        [(path, total_cost, modal_sequence)], as ``find_hybrid_optimal_route``
+        returns them
+    """
+    if k <= 0 or source not in G or destination not in G or source == destination:
+        return []
+    expanded = get_expanded_graph(G, factors, cargo_weight, allow_modal_switches, state)
+    weight_key = OBJECTIVE_WEIGHTS.get(optimization, "cost")
+    if not allow_modal_switches:
+        max_switches = None
+
+    routes = []
+    kept_steps = []
+    seen = set()
+    for path in islice(_k_shortest_paths(expanded, source, destination, weight_key), k * K_ROUTES_SEARCH_FACTOR):
+        steps = _route_edges(path)
+        countries = [path[0] // MODE_STRIDE] + [v for _, v in steps]
+        if len(set(countries)) != len(countries) or tuple(steps) in seen:
+            continue
+        if max_switches is not None and _count_switches(expanded, path) > max_switches:
+            continue
+        seen.add(tuple(steps))
+        step_set = set(steps)
+        if any(len(step_set & kept) > (1 - diversity) * len(step_set) for kept in kept_steps):
+            continue
+        kept_steps.append(step_set)
+        clean_path, clean_modes = _country_sequence(path)
+        routes.append((clean_path, _path_total(expanded, path, "cost"), clean_modes))
+        if len(routes) == k:
+            break
+    return routes
+
+
+def _country_sequence(path: List[int]) -> Tuple[List, List]:
+    # Country names and modes of an expanded path; names are resolved here,
+    # once per returned route. Expanded paths never repeat a node, so there
+    # are no consecutive duplicates to drop.
+    clean_path = []
+    clean_modes = []
+    for node in path:
+        country, code = divmod(node, MODE_STRIDE)
+        clean_path.append(country_ids.name_of(country))
+        clean_modes.append(TRANSPORT_MODES[code])
+    return clean_path, clean_modes
+
+
+def _pareto_multimodal_paths(
+    expanded: nx.DiGraph,
+    source: str,
+    destination: str,
+    max_switches: Optional[int] = None,
+    label_limit: Optional[int] = PARETO_LABEL_LIMIT,
+) -> List[Tuple[Tuple[float, float, float], List]]:
+    """Every non-dominated (cost, time, risk_weight) path from any mode of
+    ``source`` to any mode of ``destination``.
+
+    Multi-objective label search: labels leave the heap in lexicographic
+    order, so a label that survives the dominance check at its node is
+    final. Labels dominated by a path already found to the destination are
+    dropped as well, since weights only grow along a path. The switch count
+    is kept as a constraint and, when limited, as an extra resource so that
+    a label with fewer switches left is not pruned by one with more.
+
+    The label sets are unbounded in the worst case, so a label is dropped
+    at an intermediate node that already keeps ``label_limit`` labels (None
+    for no limit) with no more switches than it; those labels are all
+    cheaper. A label with fewer switches than every kept one is never
+    dropped, so the cheapest path within ``max_switches`` is exact, but a
+    capped search may miss some of the other tradeoffs.
+    """
+    track_switches = max_switches is not None
+    targets = _mode_nodes(destination)
+    adj = expanded._adj
+    settled: Dict[int, List[Tuple[float, float, int]]] = {}
+    found = []
+    heap = []
+    counter = count()
+    for node in _mode_nodes(source):
+        if node in adj:
+            heappush(heap, (0.0, 0.0, 0.0, 0, next(counter), node, None))
+
+    # Settled and found labels left the heap earlier, so their cost is never
+    # higher than a label being checked; only the other criteria are compared.
+    def dominated(node, time, risk, switches):
+        kept = 0
+        for t, r, s in settled.get(node, ()):
+            if s <= switches:
+                if t <= time and r <= risk:
+                    return True
+                kept += 1
+        if label_limit is not None and kept >= label_limit and node not in targets:
+            return True
+        for t, r in reached:
+            if t <= time and r <= risk:
+                return True
+        return False
+
+    reached = []
+    while heap:
+        cost, time, risk, switches, _, node, trail = heappop(heap)
+        if dominated(node, time, risk, switches):
+            continue
+        settled.setdefault(node, []).append((time, risk, switches))
+        trail = (node, trail)
+        if node in targets:
+            path = []
+            while trail is not None:
+                node, trail = trail
+                path.append(node)
+            path.reverse()
+            found.append(((cost, time, risk), path))
+            reached.append((time, risk))
+            continue
+
+        for neighbor, data in adj[node].items():
+            next_switches = switches
+            if track_switches and data["mode"] == "transfer":
+                next_switches += 1
+                if next_switches > max_switches:
+                    continue
+            next_time = time + data["time"]
+            next_risk = risk + data["risk_weight"]
+            if dominated(neighbor, next_time, next_risk, next_switches):
+                continue
+            heappush(heap, (
+                cost + data["cost"], next_time, next_risk, next_switches, next(counter), neighbor, trail,
+            ))
+    return found
+
+
+def find_pareto_routes(
+    G: nx.DiGraph,
+    source: str,
+    destination: str,
+    factors: Dict,
+    cargo_weight: float = 1.0,
+    allow_modal_switches: bool = True,
+    max_switches: Optional[int] = 3,
+    state: Optional[FactorState] = None,
+) -> List[Dict]:
+    """
+    Find the cost/time/risk tradeoff curve for a hybrid multi-modal route.
+    
+    Returns the non-dominated routes, cheapest first. Each has the country
+    ``path`` and ``modes`` as returned by ``find_hybrid_optimal_route`` plus
+    its total ``cost``, ``time``, accumulated ``risk`` and the additive
+    ``risk_weight`` the "risk" objective minimizes.
+    """
+    if source not in G or destination not in G:
+        return []
+    
+    expanded = get_expanded_graph(G, factors, cargo_weight, allow_modal_switches, state)
+    if not allow_modal_switches:
+        max_switches = None
+    
+    routes = []
+    for (cost, time, risk_weight), path in _pareto_multimodal_paths(
+        expanded, source, destination, max_switches
+    ):
+        survival = 1.0
+        for i in range(len(path) - 1):
+            survival *= 1 - expanded[path[i]][path[i + 1]]["risk"]
+        clean_path, clean_modes = _country_sequence(path)
+        routes.append({
+            "path": clean_path,
+            "modes": clean_modes,
+            "cost": cost,
+            "time": time,
+            "risk": 1 - survival,
+            "risk_weight": risk_weight,
+        })
+    return routes
+
+
+def pick_pareto_route(routes: List[Dict], optimization: str = "cost") -> Optional[Dict]:
+    """The route from ``find_pareto_routes`` that is best for ``optimization``,
+    breaking ties on the remaining objectives."""
+    if not routes:
+        return None
+    key = "risk_weight" if optimization == "risk" else optimization
+    if key not in ("cost", "time", "risk_weight"):
+        key = "cost"
+    return min(routes, key=lambda route: (route[key], route["cost"], route["time"], route["risk_weight"]))
@@ -0,0 +1,97 @@
+"""
+Result cache for /simulate.
+
+Identical payloads against an unchanged world give identical responses, so
+repeats are answered from memory. An entry is keyed by a digest of the
+canonical JSON of the request fields that shape the response, and records
+the store version of every collection the simulation read (the
+``WorldSnapshot.versions`` it ran on). Any write through the managers, a
+reset or an external edit bumps one of those versions, so the entries
+computed before it stop matching and are dropped on their next lookup;
+nothing has to invalidate them by hand.
+
+Memory is bounded: entries expire after ``SIMULATION_CACHE_TTL`` seconds and
+the least recently used go first once ``SIMULATION_CACHE_SIZE`` are held.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.settings import SIMULATION_CACHE_SIZE, SIMULATION_CACHE_TTL
+
+
+def request_key(fields: Dict[str, Any]) -> str:
+    """Digest of ``fields`` that ignores key order and JSON formatting."""
+    canonical = json.dumps(fields, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """LRU cache with a TTL whose entries are only valid for the world
+    versions they were computed on. Cached results are shared between
+    callers and must not be mutated."""
+
+    def __init__(self, max_entries: int = SIMULATION_CACHE_SIZE, ttl: float = SIMULATION_CACHE_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (versions, expires at, result)
+        self._entries: "OrderedDict[str, Tuple[Tuple, float, Any]]" = OrderedDict()
+        self._counts = dict.fromkeys(("hits", "misses", "stale", "expired", "evicted"), 0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key: str, versions: Dict[str, int]) -> Optional[Any]:
+        """The result stored for ``key`` on exactly ``versions``, or None."""
+        versions = tuple(sorted(versions.items()))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] != versions:
+                    del self._entries[key]
+                    self._counts["stale"] += 1
+                elif entry[1] <= self._clock():
+                    del self._entries[key]
+                    self._counts["expired"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._counts["hits"] += 1
+                    return entry[2]
+            self._counts["misses"] += 1
+            return None
+
+    def put(self, key: str, versions: Dict[str, int], result: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (tuple(sorted(versions.items())), self._clock() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counts["evicted"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return {
+                **self._counts,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hit_rate": self._counts["hits"] / lookups if lookups else 0.0,
+            }
+
+
+simulation_cache = ResultCache()
@@ -1,6 +1,17 @@
 import networkx as nx
+from simulation.csr_graph import csr_for
+from simulation.goal_directed import astar_path
+from utils.settings import ROUTING_BACKEND, ROUTING_HEURISTIC
 
 def compute_route(G, src, dst, weight):
+    if ROUTING_HEURISTIC != "none":
+        found = astar_path(G, [src], [dst], weight, ROUTING_HEURISTIC)
+        if found is None:
+            return None, None
+        cost, path = found
+        return path, cost
+    if ROUTING_BACKEND == "csr":
+        return csr_for(G).shortest_path(src, dst, weight)
     try:
         path = nx.shortest_path(G, src, dst, weight=weight)
         cost = nx.shortest_path_length(G, src, dst, weight=weight)
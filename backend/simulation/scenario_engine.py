@@ -1,12 +1,23 @@
-from managers.network_manager import build_network
-from managers.alliance_manager import get_alliances
-from managers.treaty_manager import get_treaties
-from managers.factors_manager import get_factors
-from managers.data_manager import load_json
+from collections import deque
+
+from managers.world_store import normalize_commodity
 from simulation.routing_engine import cheapest_route
-from simulation.game_theory_engine import evaluate_strategic_outlook, compute_factor_impacts
-from simulation.hybrid_routing_engine import find_hybrid_optimal_route, compute_route_entity_metrics
+from simulation.game_theory_engine import evaluate_strategic_outlook
+from simulation.hybrid_routing_engine import (
+    compute_edge_metrics,
+    find_costs_to,
+    find_hybrid_optimal_routes,
+    find_k_routes,
+    get_edge_arrays,
+    find_pareto_routes,
+    find_reachable_countries,
+    pick_pareto_route,
+)
+from simulation.distance_oracle import get_distance_oracle
+from simulation.dynamic_sssp import pin, pinned_route
+from simulation.world_snapshot import take_snapshot
 from utils.mode_profiles import VALID_ROUTE_MODES, apply_mode_profile
+from utils.settings import PARETO_OPTIONS, SOURCING_CAPACITY_LIMITS, SOURCING_STRATEGY
 
 
 DEFAULT_PARAMETERS = {
@@ -16,6 +27,16 @@ DEFAULT_PARAMETERS = {
     "aggression": 0.35,
 }
 
+# Modal switches allowed within one leg of a scenario route.
+MAX_MODAL_SWITCHES = 2
+
+# Most alternative routes /simulate returns per objective.
+MAX_ROUTE_ALTERNATIVES = 10
+
+# Countries the per-leg connectivity search visits before assuming a route,
+# while the distance oracle is not ready.
+CONNECTIVITY_SEARCH_LIMIT = 5000
+
 
 def _clamp(value: float, low: float, high: float) -> float:
     return max(low, min(high, value))
@@ -37,52 +58,93 @@ def _evaluate_transport_modes(cost: float, time: float, risk: float, preference:
     return chosen, auto, evaluations
 
 
-def _find_producer_country(commodity: str, exclude_countries: list = None) -> str | None:
-    """Find a country that produces the given commodity."""
-    countries_db = load_json("countries.json")
-    exclude_countries = exclude_countries or []
-    
-    # Normalize commodity name
-    commodity_normalized = commodity.lower().replace(" ", "_")
-    
-    # Find countries that produce this commodity
-    producers = []
-    for country_name, country_data in countries_db.items():
-        if country_name in exclude_countries:
+def _find_producer_country(commodity: str, production, exclude_countries: list = None) -> str | None:
+    """Find a country that produces the given commodity, the largest producer first."""
+    exclude_countries = exclude_countries or ()
+    for country, _ in production.producers.get(normalize_commodity(commodity), ()):
+        if country not in exclude_countries:
+            return country
+    return None
+
+
+def _select_producers(snapshot, items: list, source: str, destination: str) -> dict:
+    """Producer for each manifest item the source lacks: {commodity: country}.
+
+    One reverse search from the source over the mode-expanded graph prices
+    the route from every candidate producer at once. Each commodity goes to
+    the producer with the cheapest route, the largest producer winning ties; producers that cannot reach the
+    source are only used when no producer can. With SOURCING_CAPACITY_LIMITS,
+    items are assigned heaviest first and a producer only takes an item its
+    remaining production covers. A commodity listed more than once is
+    sourced as one item of the combined quantity.
+    """
+    exclude = (source, destination)
+    merged = {}
+    names = {}
+    for item in items:
+        key = normalize_commodity(item.get("name", ""))
+        names.setdefault(key, []).append(item.get("name", ""))
+        if key in merged:
+            merged[key]["quantity"] = merged[key].get("quantity", 1) + item.get("quantity", 1)
+        else:
+            merged[key] = dict(item)
+    items = list(merged.values())
+    candidates = {}
+    for item in items:
+        commodity = item.get("name", "")
+        candidates[commodity] = [
+            entry
+            for entry in snapshot.production.producers.get(normalize_commodity(commodity), ())
+            if entry[0] not in exclude
+        ]
+    origins = {country for entries in candidates.values() for country, _ in entries}
+    state = snapshot.factor_state
+    costs = find_costs_to(snapshot.graph, source, sorted(origins), state.factors, state=state) if origins else {}
+
+    weights = [_cargo_weight([item], snapshot.commodities) for item in items]
+    order = sorted(range(len(items)), key=lambda i: -weights[i]) if SOURCING_CAPACITY_LIMITS else range(len(items))
+    remaining = {}
+    producers = {}
+    for i in order:
+        item = items[i]
+        commodity = item.get("name", "")
+        key = normalize_commodity(commodity)
+        entries = candidates[commodity]
+        if SOURCING_CAPACITY_LIMITS:
+            quantity = item.get("quantity", 1)
+            entries = [
+                entry for entry in entries
+                if remaining.get((entry[0], key), entry[1]) >= quantity
+            ]
+        if not entries:
             continue
-        production = country_data.get("production", {})
-        # Check if commodity exists in production
-        if commodity_normalized in production or commodity in production:
-            quantity = production.get(commodity_normalized, production.get(commodity, 0))
-            producers.append((country_name, quantity))
-    
-    # Sort by production quantity (highest first)
-    producers.sort(key=lambda x: x[1], reverse=True)
-    
-    return producers[0][0] if producers else None
+        # sorted() is stable, so equal scores keep the largest producer first.
+        reachable = sorted((entry for entry in entries if entry[0] in costs), key=lambda entry: costs[entry[0]])
+        producer = (reachable or entries)[0][0]
+        for name in names[key]:
+            producers[name] = producer
+        if SOURCING_CAPACITY_LIMITS:
+            slot = (producer, key)
+            remaining[slot] = remaining.get(slot, dict(entries)[producer]) - quantity
+    return producers
 
 
-def _check_source_has_commodities(source: str, cargo_manifest: list) -> dict:
+def _check_source_has_commodities(source: str, cargo_manifest: list, production) -> dict:
     """Check which commodities the source country can provide."""
     if not cargo_manifest:
         return {"has_all": True, "missing": [], "available": []}
     
-    countries_db = load_json("countries.json")
-    source_data = countries_db.get(source, {})
-    source_production = source_data.get("production", {})
+    source_production = production.production.get(source, frozenset())
     
     missing_commodities = []
     available_commodities = []
     
     for item in cargo_manifest:
         commodity = item.get("name", "")
-        commodity_normalized = commodity.lower().replace(" ", "_")
-        
-        # Check if source produces this commodity
-        if commodity_normalized not in source_production and commodity not in source_production:
-            missing_commodities.append(commodity)
-        else:
+        if normalize_commodity(commodity) in source_production:
             available_commodities.append(commodity)
+        else:
+            missing_commodities.append(commodity)
     
     return {
         "has_all": len(missing_commodities) == 0,
@@ -91,25 +153,328 @@ def _check_source_has_commodities(source: str, cargo_manifest: list) -> dict:
     }
 
 
-def simulate_scenario(source: str, destination: str, parameters=None, mode_preference: str | None = None, cargo_manifest=None, optimization: str = "cost"):
+def simulate_scenario(source: str, destination: str, parameters=None, mode_preference: str | None = None, cargo_manifest=None, optimization: str = "cost", snapshot=None):
     """Run a supply-chain scenario with hybrid multi-modal routing and realistic cargo modeling.
     
     Args:
         optimization: "cost" for cheapest, "time" for fastest, "risk" for most secure
+        snapshot: the ``WorldSnapshot`` to simulate on; a fresh one by default
     """
+    plan = _plan_scenario(source, destination, parameters, cargo_manifest, snapshot or take_snapshot())
+    if not _legs_connected(plan):
+        return None
+    G = plan["snapshot"].graph
+    leg_routes = [_route_leg(plan, leg, optimization) for leg in plan["route_legs"]]
+    priced = _price_edges(G, plan)
+    return _build_scenario_result(source, destination, plan, G, priced, leg_routes, mode_preference)
 
-    params = {**DEFAULT_PARAMETERS, **(parameters or {})}
-    factors = get_factors()
-    factor_impacts = compute_factor_impacts(factors)
+
+def simulate_scenario_options(source: str, destination: str, parameters=None, mode_preference: str | None = None, cargo_manifest=None, optimizations=("cost", "time", "risk"), snapshot=None, include_frontier: bool = False):
+    """Run a scenario once for several optimization objectives.
+    
+    Sourcing, cargo weighting and factor evaluation are done once. Each leg
+    gets one route search per objective, or, with PARETO_OPTIONS, a single
+    Pareto search whose cost/time/risk tradeoff curve supplies the route for
+    every objective.
+    
+    Returns:
+        (results, frontier): ``results`` maps each objective to what
+        ``simulate_scenario`` would return for it; ``frontier`` (empty unless
+        ``include_frontier``) lists the non-dominated whole-trip routes,
+        cheapest first, with the router's route_cost/route_time/route_risk
+        totals (before the transport mode profile), the concatenated path
+        and the mode of each stop.
+    """
+    plan = _plan_scenario(source, destination, parameters, cargo_manifest, snapshot or take_snapshot())
+    if not _legs_connected(plan):
+        return {optimization: None for optimization in optimizations}, []
+    G = plan["snapshot"].graph
+    legs = plan["route_legs"]
+    fronts = None
+    if PARETO_OPTIONS or include_frontier:
+        fronts = [
+            find_pareto_routes(
+                G, leg["from"], leg["to"], plan["factors"], plan["cargo_weight"],
+                allow_modal_switches=True, max_switches=MAX_MODAL_SWITCHES,
+                state=plan["factor_state"],
+            )
+            for leg in legs
+        ]
+
+    if PARETO_OPTIONS:
+        chosen = {}
+        for optimization in optimizations:
+            picks = [pick_pareto_route(front, optimization) for front in fronts]
+            chosen[optimization] = [
+                (pick["path"], pick["cost"], pick["modes"]) if pick else (None, None, None)
+                for pick in picks
+            ]
+    else:
+        chosen = {
+            optimization: [_route_leg(plan, leg, optimization) for leg in legs]
+            for optimization in optimizations
+        }
+
+    priced = _price_edges(G, plan)
+    results = {}
+    built = {}
+    for optimization, leg_routes in chosen.items():
+        key = tuple(path and (tuple(path), tuple(modes)) for path, _, modes in leg_routes)
+        if key not in built:
+            built[key] = _build_scenario_result(
+                source, destination, plan, G, priced, leg_routes, mode_preference
+            )
+        results[optimization] = built[key]
+
+    return results, _combine_frontiers(fronts) if include_frontier else []
+
+
+def simulate_route_alternatives(source: str, destination: str, k: int, parameters=None, mode_preference: str | None = None, cargo_manifest=None, optimizations=("cost", "time", "risk"), diversity: float = 0.0, snapshot=None):
+    """Up to ``k`` alternative scenarios per objective, best first, for
+    hedging across diversified routes.
+    
+    Each leg gets its ``find_k_routes`` alternatives; the i-th scenario ships
+    every leg on its i-th route, or on its last one when a leg has fewer.
+    
+    Returns:
+        {objective: [scenario results]}, with ``simulate_scenario`` results
+    """
+    plan = _plan_scenario(source, destination, parameters, cargo_manifest, snapshot or take_snapshot())
+    if not _legs_connected(plan):
+        return {optimization: [] for optimization in optimizations}
+    G = plan["snapshot"].graph
+    priced = _price_edges(G, plan)
+    alternatives = {}
+    for optimization in optimizations:
+        leg_options = [
+            find_k_routes(
+                G, leg["from"], leg["to"], plan["factors"], k, optimization, diversity,
+                plan["cargo_weight"], allow_modal_switches=True, max_switches=MAX_MODAL_SWITCHES,
+                state=plan["factor_state"],
+            )
+            for leg in plan["route_legs"]
+        ]
+        scenarios = []
+        for i in range(max((len(options) for options in leg_options), default=0)):
+            leg_routes = [
+                options[min(i, len(options) - 1)] if options else (None, None, None)
+                for options in leg_options
+            ]
+            result = _build_scenario_result(source, destination, plan, G, priced, leg_routes, mode_preference)
+            if result is not None:
+                scenarios.append(result)
+        alternatives[optimization] = scenarios
+    return alternatives
+
+
+def _route_leg(plan: dict, leg: dict, optimization: str):
+    """``find_hybrid_optimal_route`` for one leg of the plan."""
+    return _routes_from(
+        plan["snapshot"].graph, plan["factor_state"], leg["from"], [leg["to"]],
+        optimization, plan["cargo_weight"],
+    )[leg["to"]]
+
+
+def _routes_from(G, state, origin: str, destinations, optimization: str, cargo_weight: float):
+    """``find_hybrid_optimal_routes`` for scenario legs from ``origin``. The
+    origin is pinned, so after a route mutation the routes are read off a
+    repaired shortest-path tree; only destinations the tree cannot answer
+    for are searched."""
+    pin(origin, optimization, cargo_weight)
+    routes = {}
+    for destination in destinations:
+        found = pinned_route(
+            G, origin, destination, optimization, cargo_weight,
+            max_switches=MAX_MODAL_SWITCHES, state=state,
+        )
+        if found is not None:
+            routes[destination] = found
+    rest = [destination for destination in destinations if destination not in routes]
+    if rest:
+        routes.update(find_hybrid_optimal_routes(
+            G, origin, rest, state.factors, cargo_weight,
+            allow_modal_switches=True, max_switches=MAX_MODAL_SWITCHES, optimization=optimization,
+            state=state,
+        ))
+    return routes
+
+
+def _legs_connected(plan: dict) -> bool:
+    """False when some leg has no route at all, in which case neither the
+    hybrid search nor the fallback could find one.
+
+    Answered in O(1) per leg by the distance oracle when it is ready for the
+    snapshot's network; a breadth-first search stands in while it builds.
+    """
+    G = plan["snapshot"].graph
+    oracle = get_distance_oracle()
+    if oracle is not None and oracle.graph_version == G.graph.get("version"):
+        return all(oracle.reachable(leg["from"], leg["to"]) for leg in plan["route_legs"])
+    adj = G._adj
+    return all(_reachable(adj, leg["from"], leg["to"]) for leg in plan["route_legs"])
+
+
+def _reachable(adj, source: str, destination: str) -> bool:
+    """Breadth-first search over the country graph. Gives up, and assumes a
+    route, after CONNECTIVITY_SEARCH_LIMIT countries so the check stays
+    cheap next to the route search it guards."""
+    if source not in adj or destination not in adj:
+        return False
+    seen = {source}
+    queue = deque([source])
+    while queue and len(seen) <= CONNECTIVITY_SEARCH_LIMIT:
+        for neighbor in adj[queue.popleft()]:
+            if neighbor == destination:
+                return True
+            if neighbor not in seen:
+                seen.add(neighbor)
+                queue.append(neighbor)
+    return source == destination or bool(queue)
+
+
+def _combine_frontiers(fronts):
+    """Whole-trip tradeoff curve from the per-leg Pareto routes."""
+    combined = [{"route_cost": 0.0, "route_time": 0.0, "survival": 1.0, "risk_weight": 0.0, "path": [], "modes": []}]
+    for front in fronts:
+        if not front:
+            return []
+        candidates = [
+            {
+                "route_cost": trip["route_cost"] + route["cost"],
+                "route_time": trip["route_time"] + route["time"],
+                "survival": trip["survival"] * (1 - route["risk"]),
+                "risk_weight": trip["risk_weight"] + route["risk_weight"],
+                "path": trip["path"] + route["path"],
+                "modes": trip["modes"] + route["modes"],
+            }
+            for trip in combined
+            for route in front
+        ]
+        combined = [
+            trip for trip in candidates
+            if not any(
+                other is not trip
+                and other["route_cost"] <= trip["route_cost"]
+                and other["route_time"] <= trip["route_time"]
+                and other["risk_weight"] <= trip["risk_weight"]
+                and (other["route_cost"], other["route_time"], other["risk_weight"])
+                != (trip["route_cost"], trip["route_time"], trip["risk_weight"])
+                for other in candidates
+            )
+        ]
+
+    combined.sort(key=lambda trip: (trip["route_cost"], trip["route_time"], trip["risk_weight"]))
+    return [
+        {
+            "route_cost": trip["route_cost"],
+            "route_time": trip["route_time"],
+            "route_risk": 1 - trip.pop("survival"),
+            "path": trip["path"],
+            "modes": trip["modes"],
+        }
+        for trip in combined
+    ]
+
+
+def simulate_many(
+    requests,
+    mode_preference: str | None = None,
+    optimization: str = "cost",
+    snapshot=None,
+    return_exceptions: bool = False,
+):
+    """Run ``simulate_scenario`` for a batch of lanes.
+    
+    Each request is a (source, destination, cargo_manifest, parameters)
+    tuple; the last two may be omitted. The batch shares one world
+    snapshot and edge pricing per cargo weight, and route legs are
+    grouped by origin so that one search tree per (origin, cargo weight)
+    routes every destination of the group.
     
+    Returns one ``simulate_scenario`` result (or None) per request, in order.
+    With ``return_exceptions`` a request that fails yields its exception in
+    place of a result instead of failing the whole batch.
+    """
+    requests = [tuple(request) + (None,) * (4 - len(request)) for request in requests]
+    snapshot = snapshot or take_snapshot()
+    state = snapshot.factor_state
+    G = snapshot.graph
+
+    def attempt(function, *args, **kwargs):
+        if not return_exceptions:
+            return function(*args, **kwargs)
+        try:
+            return function(*args, **kwargs)
+        except Exception as exc:
+            return exc
+
+    plans = [
+        attempt(_plan_scenario, source, destination, parameters, cargo_manifest, snapshot)
+        for source, destination, cargo_manifest, parameters in requests
+    ]
+
+    groups = {}
+    for plan in plans:
+        if isinstance(plan, Exception):
+            continue
+        for leg in plan["route_legs"]:
+            groups.setdefault((leg["from"], plan["cargo_weight"]), {})[leg["to"]] = None
+    trees = {
+        (origin, cargo_weight): attempt(
+            _routes_from, G, state, origin, list(destinations), optimization, cargo_weight
+        )
+        for (origin, cargo_weight), destinations in groups.items()
+    }
+
+    priced = {}
+    def build(source, destination, plan):
+        cargo_weight = plan["cargo_weight"]
+        leg_routes = []
+        for leg in plan["route_legs"]:
+            tree = trees[(leg["from"], cargo_weight)]
+            if isinstance(tree, Exception):
+                raise tree
+            leg_routes.append(tree[leg["to"]])
+        if cargo_weight not in priced:
+            priced[cargo_weight] = _price_edges(G, plan)
+        return _build_scenario_result(
+            source, destination, plan, G, priced[cargo_weight], leg_routes, mode_preference
+        )
+
+    return [
+        plan if isinstance(plan, Exception) else attempt(build, source, destination, plan)
+        for (source, destination, _, _), plan in zip(requests, plans)
+    ]
+
+
+def find_reachable(source: str, max_cost=None, max_time=None, max_risk=None, optimization: str = "cost", cargo_manifest=None, snapshot=None):
+    """Countries reachable from ``source`` within the given budgets.
+    
+    Returns the best route to every reachable country, as
+    ``find_reachable_countries`` reports it, and the predecessor tree
+    mapping each country to the previous stop on its route.
+    """
+    snapshot = snapshot or take_snapshot()
+    state = snapshot.factor_state
+    reachable = find_reachable_countries(
+        snapshot.graph, source, state.factors, _cargo_weight(cargo_manifest, snapshot.commodities),
+        allow_modal_switches=True, max_switches=MAX_MODAL_SWITCHES, optimization=optimization,
+        max_cost=max_cost, max_time=max_time, max_risk=max_risk, state=state,
+    )
+    return {
+        "reachable": reachable,
+        "tree": {country: route["predecessor"] for country, route in reachable.items()},
+    }
+
+
+def _cargo_weight(cargo_manifest, commodities_db) -> float:
     # Calculate total cargo weight from manifest
     # Weight represents cargo volume/mass impact on route capacity
     cargo_weight = 1.0
     if cargo_manifest and isinstance(cargo_manifest, list):
-        commodities_db = load_json("commodities.json")
         total_value = 0.0
         for item in cargo_manifest:
-            commodity_name = item.get("name", "").lower().replace(" ", "_")
+            commodity_name = normalize_commodity(item.get("name", ""))
             quantity = item.get("quantity", 1)
             unit_cost = commodities_db.get(commodity_name, {}).get("unit_cost", 1)
             total_value += quantity * unit_cost
@@ -119,20 +484,37 @@ def simulate_scenario(source: str, destination: str, parameters=None, mode_prefe
             import math
             cargo_weight = 1.0 + math.log10(max(1.0, total_value / 100000))
         cargo_weight = max(1.0, min(10.0, cargo_weight))  # Clamp between 1x and 10x
+    return cargo_weight
+
+
+def _plan_scenario(source: str, destination: str, parameters, cargo_manifest, snapshot) -> dict:
+    """Everything about a scenario that does not depend on the routes chosen."""
+    params = {**DEFAULT_PARAMETERS, **(parameters or {})}
+    state = snapshot.factor_state
+    cargo_weight = _cargo_weight(cargo_manifest, snapshot.commodities)
     
     # Check if source produces all required commodities
-    commodity_check = _check_source_has_commodities(source, cargo_manifest)
+    commodity_check = _check_source_has_commodities(source, cargo_manifest, snapshot.production)
     
     # Build multi-leg route if commodities need to be sourced
     route_legs = []
     supply_chain_narrative = []
-    routes_db = load_json("routes.json")
+    routes_db = snapshot.routes
     
     if not commodity_check["has_all"] and commodity_check["missing"]:
         # Need to source commodities from producer countries
         sourcing_countries = {}
+        if SOURCING_STRATEGY == "largest":
+            chosen = {
+                commodity: _find_producer_country(commodity, snapshot.production, exclude_countries=[source, destination])
+                for commodity in commodity_check["missing"]
+            }
+        else:
+            missing = set(commodity_check["missing"])
+            items = [item for item in cargo_manifest if item.get("name", "") in missing]
+            chosen = _select_producers(snapshot, items, source, destination)
         for commodity in commodity_check["missing"]:
-            producer = _find_producer_country(commodity, exclude_countries=[source, destination])
+            producer = chosen.get(commodity)
             if producer:
                 if producer not in sourcing_countries:
                     sourcing_countries[producer] = []
@@ -181,21 +563,42 @@ def simulate_scenario(source: str, destination: str, parameters=None, mode_prefe
             "narrative": f"Direct delivery from {source} to {destination}"
         })
         supply_chain_narrative.append(f"✈️ Direct shipment from {source} to {destination} ({mode_emoji} {direct_mode.upper()})")
+
+    return {
+        "params": params,
+        "snapshot": snapshot,
+        "factor_state": state,
+        "factors": state.factors,
+        "factor_impacts": state.impacts,
+        "cargo_weight": cargo_weight,
+        "commodity_check": commodity_check,
+        "route_legs": route_legs,
+        "narrative": supply_chain_narrative,
+    }
+
+
+def _price_edges(G, plan: dict):
+    """Adjusted cost/time/risk of every route edge for the scenario's factors and cargo."""
+    edges = get_edge_arrays(G)
+    return edges, compute_edge_metrics(
+        edges, plan["factor_impacts"], plan["factor_state"].pressures, plan["cargo_weight"]
+    )
+
+
+def _build_scenario_result(source: str, destination: str, plan: dict, G, priced, leg_routes, mode_preference: str | None):
+    """Price the chosen route of every leg and assemble the scenario report.
     
-    # Build detailed factor breakdown for transparency
-    factor_breakdown = []
-    for name, data in factors.items():
-        effect = float(data.get("effect", 0.0))
-        strength = float(data.get("strength", 0.0))
-        contribution = effect * strength
-        factor_breakdown.append({
-            "name": name,
-            "effect": effect,
-            "strength": strength,
-            "contribution": contribution,
-            "impact_type": "support" if contribution > 0 else "pressure" if contribution < 0 else "neutral"
-        })
-    factor_breakdown.sort(key=lambda x: abs(x["contribution"]), reverse=True)
+    ``priced`` is the ``_price_edges`` result and ``leg_routes`` holds one
+    ``find_hybrid_optimal_route`` result per leg.
+    """
+    params = plan["params"]
+    factors = plan["factors"]
+    factor_impacts = plan["factor_impacts"]
+    commodity_check = plan["commodity_check"]
+    route_legs = plan["route_legs"]
+    supply_chain_narrative = plan["narrative"]
+
+    edges, (adjusted_cost, adjusted_time, adjusted_risk) = priced
 
     # Execute all route legs and accumulate costs
     all_paths = []
@@ -204,27 +607,23 @@ def simulate_scenario(source: str, destination: str, parameters=None, mode_prefe
     total_accumulated_time = 0.0
     total_accumulated_risk_survival = 1.0
     
-    for leg_idx, leg in enumerate(route_legs):
+    for leg_idx, (leg, leg_route) in enumerate(zip(route_legs, leg_routes)):
         leg_source = leg["from"]
         leg_dest = leg["to"]
         leg_commodities = leg["commodities"]
         
-        G = build_network()
-        
-        # Try hybrid multi-modal routing for this leg
-        hybrid_path, hybrid_cost, modal_sequence = find_hybrid_optimal_route(
-            G, leg_source, leg_dest, factors, cargo_weight, 
-            allow_modal_switches=True, max_switches=2, optimization=optimization
-        )
+        hybrid_path, hybrid_cost, _ = leg_route
         
         # Fallback to traditional routing if hybrid fails
         if hybrid_path is None:
             path, base_route_cost = cheapest_route(G, leg_source, leg_dest)
-            modal_sequence = None
         else:
-            # Hybrid path has mode-suffixed nodes like "Country_sea"
-            # Extract just the country names for edge lookup
-            path = [node.rsplit('_', 1)[0] for node in hybrid_path]
+            # A modal transfer repeats the country once per mode; each route
+            # step is priced in its own mode, so keep one stop per country.
+            path = [
+                country for i, country in enumerate(hybrid_path)
+                if i + 1 == len(hybrid_path) or hybrid_path[i + 1] != country
+            ]
             base_route_cost = hybrid_cost
 
         if not path:
@@ -237,34 +636,23 @@ def simulate_scenario(source: str, destination: str, parameters=None, mode_prefe
         base_survival = 1.0
         adjusted_survival = 1.0
 
-        routes_reference = load_json("routes.json")
+        routes_reference = plan["snapshot"].routes
+
+        # Every step is a route edge already priced in its own mode.
+        steps = [edges.index[(path[idx], path[idx + 1])] for idx in range(len(path) - 1)]
+        step_metrics = zip(
+            edges.base_cost[steps].tolist(),
+            edges.base_time[steps].tolist(),
+            edges.base_risk[steps].tolist(),
+            adjusted_cost[steps].tolist(),
+            adjusted_time[steps].tolist(),
+            adjusted_risk[steps].tolist(),
+        )
 
-        for idx in range(len(path) - 1):
+        for idx, (base_cost, base_time, base_risk, adj_cost, adj_time, adj_risk) in enumerate(step_metrics):
             origin = path[idx]
             step_destination = path[idx + 1]
-            edge = G[origin][step_destination]
             route_meta = routes_reference.get(origin, {}).get(step_destination, {})
-            
-            # Determine mode for this step
-            if modal_sequence and idx < len(modal_sequence) - 1:
-                step_mode = modal_sequence[idx]
-            else:
-                step_mode = route_meta.get("mode", "land")
-
-            base_cost = edge["cost"]
-            base_time = edge["time"]
-            base_risk = edge["risk"]
-            
-            # Use realistic route entity metrics
-            route_metrics = compute_route_entity_metrics(
-                origin, step_destination,
-                base_cost, base_time, base_risk,
-                step_mode, factors, cargo_weight
-            )
-
-            adj_cost = route_metrics["adjusted_cost"]
-            adj_time = route_metrics["adjusted_time"]
-            adj_risk = route_metrics["adjusted_risk"]
 
             breakdown.append(
                 {
@@ -350,8 +738,8 @@ def simulate_scenario(source: str, destination: str, parameters=None, mode_prefe
         total_cost,
         total_time,
         total_risk,
-        get_alliances(),
-        get_treaties(),
+        plan["snapshot"].alliances,
+        plan["snapshot"].treaties,
         factors,
         factor_impacts,
         params,
@@ -384,7 +772,7 @@ def simulate_scenario(source: str, destination: str, parameters=None, mode_prefe
             "risk": base_total_risk,
             "route_cost": base_route_cost or base_totals["cost"],
         },
-        "factor_impacts": factor_impacts,
+        "factor_impacts": dict(factor_impacts),
         "factor_breakdown": factor_breakdown,
         "transport": {
             "selected_mode": chosen_mode,
@@ -0,0 +1,70 @@
+"""
+Request-scoped, read-only view of the world.
+
+``take_snapshot()`` reads every collection a simulation depends on in one
+go under the world store lock, so a concurrent /geo/* write lands either
+wholly before or wholly after it. Nothing is copied: documents are the
+store's shared, never-modified objects, and the route graph, production
+index and factor state are the cached ones derived from exactly those
+documents (built privately only if a write slipped in between).
+
+The scenario engine takes one snapshot per request and passes it, or the
+graph and factor state it holds, to the routing and game theory engines,
+so every stage of a request sees the same world.
+"""
+
+from typing import Dict
+
+from managers.data_manager import production_index, read_many
+from managers.network_manager import network_for
+from managers.world_store import ProductionIndex
+from simulation.hybrid_routing_engine import factor_state
+
+# Collections a simulation reads, by snapshot attribute.
+COLLECTIONS = {
+    "routes": "routes.json",
+    "countries": "countries.json",
+    "commodities": "commodities.json",
+    "factors": "factors.json",
+    "alliances": "alliances.json",
+    "treaties": "treaties.json",
+}
+
+
+class WorldSnapshot:
+    """The world documents at one instant, with the structures derived from
+    them: ``graph`` (route network), ``production`` (``ProductionIndex``) and
+    ``factor_state``. ``versions`` maps each collection file to its store
+    version. Attributes cannot be reassigned; the documents they refer to
+    are shared and must not be mutated."""
+
+    __slots__ = tuple(COLLECTIONS) + ("versions", "graph", "production", "factor_state")
+
+    def __init__(self, documents: Dict, versions: Dict[str, int], graph, production, state):
+        for name, document in documents.items():
+            object.__setattr__(self, name, document)
+        object.__setattr__(self, "versions", versions)
+        object.__setattr__(self, "graph", graph)
+        object.__setattr__(self, "production", production)
+        object.__setattr__(self, "factor_state", state)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("WorldSnapshot is read-only")
+
+
+def take_snapshot() -> WorldSnapshot:
+    """A consistent ``WorldSnapshot`` of the live world."""
+    read = read_many(list(COLLECTIONS.values()))
+    documents = {name: read[file][0] for name, file in COLLECTIONS.items()}
+    versions = {file: read[file][1] for file in COLLECTIONS.values()}
+
+    production = production_index()
+    if production.countries is not documents["countries"]:
+        production = ProductionIndex(documents["countries"])
+    return WorldSnapshot(
+        documents,
+        versions,
+        network_for(documents["routes"]),
+        production,
+        factor_state(documents["factors"]),
+    )
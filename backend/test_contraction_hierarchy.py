@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Contraction-hierarchy queries must find Dijkstra's shortest distances."""
+
+import itertools
+import random
+
+import networkx as nx
+
+from managers.network_manager import get_network
+from simulation import contraction_hierarchy
+from simulation import hybrid_routing_engine as hybrid
+from simulation.contraction_hierarchy import ContractionHierarchy
+
+
+def _random_graph(seed, nodes=40, edges=150):
+    rng = random.Random(seed)
+    G = nx.DiGraph()
+    G.add_nodes_from(range(nodes))
+    while G.number_of_edges() < edges:
+        u, v = rng.sample(range(nodes), 2)
+        # Small integers force plenty of equal-length paths.
+        G.add_edge(u, v, weight=rng.randint(1, 4) if seed % 2 else rng.uniform(0.5, 10))
+    return G
+
+
+def test_distances_match_dijkstra():
+    for seed in range(4):
+        G = _random_graph(seed)
+        hierarchy = ContractionHierarchy(G.nodes(), [(u, v, d["weight"]) for u, v, d in G.edges(data=True)])
+        lengths = dict(nx.all_pairs_dijkstra_path_length(G))
+        for u, v in itertools.permutations(G.nodes(), 2):
+            found = hierarchy.shortest_path([u], [v])
+            if v not in lengths[u]:
+                assert found is None
+                continue
+            distance, path = found
+            assert abs(distance - lengths[u][v]) < 1e-9
+            assert path[0] == u and path[-1] == v
+            assert abs(nx.path_weight(G, path, "weight") - distance) < 1e-9
+
+
+def test_expanded_graph_queries_match_multimodal_dijkstra():
+    G = get_network()
+    state = hybrid.factor_state()
+    expanded = hybrid.get_expanded_graph(G, state.factors, state=state)
+    for weight_key in ("cost", "risk_weight"):
+        hierarchy = ContractionHierarchy.from_expanded(expanded, weight_key)
+        for src, dst in list(itertools.permutations(sorted(G.nodes()), 2))[::11]:
+            expected = hybrid._best_multimodal_path(expanded, src, dst, weight_key)
+            found = hierarchy.shortest_path(hybrid._mode_nodes(src), hybrid._mode_nodes(dst))
+            assert (found is None) == (expected is None)
+            if found is not None:
+                total = hybrid._path_total(expanded, expected, weight_key)
+                assert abs(found[0] - total) <= 1e-9 * max(1.0, total)
+                assert abs(hybrid._path_total(expanded, found[1], weight_key) - total) <= 1e-9 * max(1.0, total)
+
+
+def test_router_falls_back_until_the_hierarchy_is_built(monkeypatch):
+    monkeypatch.setattr(hybrid, "CONTRACTION_HIERARCHIES", True)
+    monkeypatch.setattr(contraction_hierarchy, "_hierarchies", contraction_hierarchy.OrderedDict())
+    G = get_network()
+    state = hybrid.factor_state()
+    pairs = list(itertools.permutations(sorted(G.nodes()), 2))[::13]
+
+    before = [hybrid.find_hybrid_optimal_route(G, a, b, state.factors, max_switches=None) for a, b in pairs]
+    contraction_hierarchy.wait_for_rebuilds()
+    searched = []
+    best = hybrid._best_multimodal_paths
+    monkeypatch.setattr(hybrid, "_best_multimodal_paths", lambda *args: searched.append(1) or best(*args))
+    after = [hybrid.find_hybrid_optimal_route(G, a, b, state.factors, max_switches=None) for a, b in pairs]
+
+    assert not searched
+    for (path, cost, _), (ch_path, ch_cost, _) in zip(before, after):
+        assert (path is None) == (ch_path is None)
+        if path is not None:
+            assert abs(cost - ch_cost) <= 1e-9 * max(1.0, cost)
+
+
+def test_cargo_weights_share_hierarchies_built_one_at_a_time(monkeypatch):
+    monkeypatch.setattr(hybrid, "CONTRACTION_HIERARCHIES", True)
+    monkeypatch.setattr(contraction_hierarchy, "_hierarchies", contraction_hierarchy.OrderedDict())
+    running, overlaps = [], []
+    original = contraction_hierarchy.ContractionHierarchy
+
+    def build(*args):
+        running.append(1)
+        overlaps.append(len(running))
+        try:
+            return original(*args)
+        finally:
+            running.pop()
+
+    monkeypatch.setattr(contraction_hierarchy, "ContractionHierarchy", build)
+    G = get_network()
+    state = hybrid.factor_state()
+    weights = [1.0 + i / 4 for i in range(24)]
+    for weight in weights:
+        for optimization in hybrid.OBJECTIVE_WEIGHTS:
+            hybrid.find_hybrid_optimal_route(
+                G, "China", "Japan", state.factors, weight, max_switches=None, optimization=optimization
+            )
+    contraction_hierarchy.wait_for_rebuilds()
+
+    assert set(contraction_hierarchy._hierarchies) == {
+        (state.key, True, attr) for attr in hybrid.OBJECTIVE_WEIGHTS.values()
+    }
+    assert len(overlaps) == 3 and max(overlaps) == 1
+
+    searched = []
+    best = hybrid._best_multimodal_paths
+    monkeypatch.setattr(hybrid, "_best_multimodal_paths", lambda *args: searched.append(1) or best(*args))
+    hybrid.find_hybrid_optimal_route(G, "China", "Japan", state.factors, weights[-1], max_switches=None, optimization="time")
+    assert not searched
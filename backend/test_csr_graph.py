@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""The CSR graph engine must return exactly what networkx returns."""
+
+import itertools
+import random
+
+import networkx as nx
+
+from managers.factors_manager import get_factors
+from managers.network_manager import build_network
+from simulation import hybrid_routing_engine as hybrid
+from simulation import routing_engine
+from simulation.csr_graph import CSRGraph, csr_for
+
+
+def _random_graph(seed, nodes=25, edges=90, integer_weights=False):
+    rng = random.Random(seed)
+    G = nx.DiGraph()
+    G.add_nodes_from(range(nodes))
+    while G.number_of_edges() < edges:
+        u, v = rng.sample(range(nodes), 2)
+        if integer_weights:
+            # Small integers force plenty of equal-length paths.
+            attrs = {"cost": rng.randint(1, 3), "time": rng.randint(1, 3)}
+        else:
+            attrs = {"cost": rng.uniform(1, 20), "time": rng.uniform(1, 20)}
+        if rng.random() < 0.1:
+            attrs.pop("time")  # networkx counts a missing weight as 1
+        attrs["risk"] = rng.uniform(0.01, 0.3)
+        attrs["mode"] = rng.choice(["land", "sea", "air"])
+        G.add_edge(u, v, **attrs)
+    return G
+
+
+def _networkx_route(G, src, dst, weight):
+    try:
+        return nx.shortest_path(G, src, dst, weight=weight), nx.shortest_path_length(G, src, dst, weight=weight)
+    except nx.NetworkXNoPath:
+        return None, None
+
+
+def test_weighted_paths_match_networkx():
+    for seed in range(6):
+        G = _random_graph(seed, integer_weights=seed % 2 == 0)
+        csr = CSRGraph.from_networkx(G)
+        for src, dst in itertools.permutations(G.nodes(), 2):
+            for weight in ("cost", "time", "risk"):
+                assert csr.shortest_path(src, dst, weight) == _networkx_route(G, src, dst, weight)
+
+
+def test_unweighted_paths_match_networkx():
+    for seed in range(6):
+        G = _random_graph(seed, edges=60)
+        csr = CSRGraph.from_networkx(G)
+        for src, dst in itertools.permutations(G.nodes(), 2):
+            try:
+                expected = nx.shortest_path(G, src, dst)
+            except nx.NetworkXNoPath:
+                expected = None
+            assert csr.bfs_path(src, dst) == expected
+
+
+def test_missing_nodes_and_self_paths():
+    G = _random_graph(0)
+    csr = CSRGraph.from_networkx(G)
+    assert csr.shortest_path("nowhere", 0, "cost") == (None, None)
+    assert csr.shortest_path(3, 3, "cost") == _networkx_route(G, 3, 3, "cost")
+    assert csr.bfs_path(3, 3) == nx.shortest_path(G, 3, 3)
+    assert csr.bfs_path(3, "nowhere") is None
+
+
+def test_csr_is_cached_per_graph_version():
+    G = build_network()
+    G.graph["version"] = 1
+    assert csr_for(G) is csr_for(G)
+    G.graph["version"] = 2
+    G[next(iter(G.edges()))[0]][next(iter(G.edges()))[1]]["cost"] = 123.0
+    assert csr_for(G).weights["cost"].max() >= 123.0
+
+
+def test_hybrid_searches_match_on_the_live_network():
+    G = build_network()
+    expanded = hybrid.build_expanded_graph(G, get_factors())
+    for src, dst in list(itertools.permutations(sorted(G.nodes()), 2))[::3]:
+        for weight_key in hybrid.OBJECTIVE_WEIGHTS.values():
+            assert hybrid._csr_multimodal_path(
+                expanded, src, dst, weight_key, None, None, None
+            ) == hybrid._best_multimodal_path(expanded, src, dst, weight_key)
+            assert hybrid._csr_multimodal_path(
+                expanded, src, dst, weight_key, 1, None, None
+            ) == hybrid._constrained_multimodal_path(expanded, src, dst, weight_key, 1)
+
+
+def test_constrained_budgets_match_dict_search():
+    G = build_network()
+    expanded = hybrid.build_expanded_graph(G, get_factors())
+    pairs = list(itertools.permutations(sorted(G.nodes()), 2))[::7]
+    for src, dst in pairs:
+        for limits in [(2, 80.0, None), (None, None, 0.6), (1, 60.0, 0.7)]:
+            expected = hybrid._constrained_multimodal_path(expanded, src, dst, "cost", *limits)
+            path = hybrid._csr_multimodal_path(expanded, src, dst, "cost", *limits)
+            if expected is None:
+                assert path is None
+            else:
+                # Risk budgets are compared in log space, so only the optimum is pinned.
+                assert abs(hybrid._path_total(expanded, path, "cost") - hybrid._path_total(expanded, expected, "cost")) < 1e-9
+
+
+def test_backend_setting_switches_route_engines(monkeypatch):
+    G = build_network()
+    factors = get_factors()
+    pairs = list(itertools.permutations(sorted(G.nodes()), 2))[::5]
+    expected = [
+        (routing_engine.cheapest_route(G, a, b), hybrid.find_hybrid_optimal_route(G, a, b, factors, max_switches=2))
+        for a, b in pairs
+    ]
+
+    monkeypatch.setattr(routing_engine, "ROUTING_BACKEND", "csr")
+    monkeypatch.setattr(hybrid, "ROUTING_BACKEND", "csr")
+    actual = [
+        (routing_engine.cheapest_route(G, a, b), hybrid.find_hybrid_optimal_route(G, a, b, factors, max_switches=2))
+        for a, b in pairs
+    ]
+    assert actual == expected
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""The distance oracle must agree with a fresh all-pairs build after every update."""
+
+import random
+
+import networkx as nx
+import numpy as np
+
+from managers import geopolitics_manager, route_manager
+from managers.network_manager import get_network
+from simulation import distance_oracle, scenario_engine
+from simulation import hybrid_routing_engine as hybrid
+from simulation.distance_oracle import DistanceOracle, distance_matrix, get_distance_oracle
+from simulation.world_snapshot import take_snapshot
+from utils.mode_profiles import VALID_ROUTE_MODES
+
+
+def _assert_same(oracle, fresh):
+    for attr, dist in fresh.dist.items():
+        finite = np.isfinite(dist)
+        assert (np.isfinite(oracle.dist[attr]) == finite).all()
+        assert np.allclose(oracle.dist[attr][finite], dist[finite], rtol=1e-9)
+
+
+def _ready_oracle():
+    if get_distance_oracle() is None:
+        distance_oracle.wait_for_rebuilds()
+    return get_distance_oracle()
+
+
+def test_matches_dijkstra_between_countries():
+    G = get_network()
+    oracle = _ready_oracle()
+    state = hybrid.factor_state()
+    for source in sorted(G.nodes())[::4]:
+        for destination in sorted(G.nodes())[::3]:
+            for objective in ("cost", "time"):
+                path, _, _ = hybrid.find_hybrid_optimal_route(
+                    G, source, destination, state.factors, max_switches=None, optimization=objective
+                )
+                expected = float("inf")
+                if path is not None:
+                    expanded = hybrid.get_expanded_graph(G, state.factors, state=state)
+                    expected = hybrid._path_total(
+                        expanded,
+                        hybrid._best_multimodal_path(expanded, source, destination, objective),
+                        objective,
+                    )
+                assert abs(oracle.distance(source, destination, objective) - expected) < 1e-6
+    assert oracle.distance("Atlantis", sorted(G.nodes())[0]) == float("inf")
+
+
+def test_random_edge_changes_are_applied_incrementally():
+    rng = random.Random(5)
+    names = [f"C{i}" for i in range(12)]
+    G = nx.DiGraph()
+    G.add_nodes_from(names)
+    while G.number_of_edges() < 40:
+        u, v = rng.sample(names, 2)
+        G.add_edge(u, v, cost=rng.uniform(1, 20), time=rng.uniform(1, 20),
+                   risk=rng.uniform(0.01, 0.3), mode=rng.choice(VALID_ROUTE_MODES))
+    oracle = DistanceOracle(hybrid.build_expanded_graph(G, {}), None, 0)
+
+    for step in range(60):
+        u, v = rng.sample(names, 2)
+        if G.has_edge(u, v) and step % 3 == 0:
+            G.remove_edge(u, v)
+        elif G.has_edge(u, v):
+            G[u][v]["cost"] *= rng.choice([0.3, 3.0])
+            G[u][v]["time"] *= rng.choice([0.3, 3.0])
+            G[u][v]["mode"] = rng.choice(VALID_ROUTE_MODES)
+        else:
+            G.add_edge(u, v, cost=rng.uniform(1, 20), time=rng.uniform(1, 20),
+                       risk=rng.uniform(0.01, 0.3), mode=rng.choice(VALID_ROUTE_MODES))
+        expanded = hybrid.build_expanded_graph(G, {})
+        oracle = oracle.updated(expanded, [(u, v)], step + 1)
+        _assert_same(oracle, DistanceOracle(expanded, None, 0))
+
+
+def test_live_oracle_follows_route_mutations(isolated_store, monkeypatch):
+    _ready_oracle()
+    builds = []
+    all_pairs = distance_oracle._all_pairs
+    monkeypatch.setattr(distance_oracle, "_all_pairs", lambda *args: builds.append(1) or all_pairs(*args))
+
+    geopolitics_manager.trigger_sea_storm("China", "Japan", 40)
+    geopolitics_manager.disrupt_infrastructure("Singapore", "Malaysia", 50)
+    _ready_oracle()
+    route_manager.delete_route("Singapore", "Malaysia")
+    oracle = _ready_oracle()
+    assert not builds
+
+    state = hybrid.factor_state()
+    expanded = hybrid.get_expanded_graph(get_network(), state.factors, state=state)
+    _assert_same(oracle, DistanceOracle(expanded, None, 0))
+
+
+def test_matrix_falls_back_to_searches_above_the_node_cap(monkeypatch):
+    G = get_network()
+    countries = sorted(G.nodes())[::5]
+    expected = _ready_oracle().matrix(countries, countries, "risk")
+
+    monkeypatch.setattr(distance_oracle, "DISTANCE_ORACLE_MAX_NODES", 0)
+    assert get_distance_oracle() is None
+    found = distance_matrix(countries + ["Atlantis"], countries, "risk")
+    assert set(found) == set(countries)
+    for source, row in expected.items():
+        for destination, value in row.items():
+            assert (value is None) == (found[source][destination] is None)
+            if value is not None:
+                assert abs(found[source][destination] - value) < 1e-9
+
+
+def test_leg_check_reads_the_oracle_once_ready(isolated_store, monkeypatch):
+    countries = sorted(get_network().nodes())
+    route_manager.add_route({"origin": "Atlantis", "destination": countries[0], "cost": 3, "time": 4, "risk": 0.1})
+    snapshot = take_snapshot()
+    oracle = _ready_oracle()
+    adj = snapshot.graph._adj
+    pairs = [(source, destination) for source in countries[::6] + ["Atlantis"] for destination in countries[::5] + ["Atlantis"]]
+    plans = [{"snapshot": snapshot, "route_legs": [{"from": source, "to": destination}]} for source, destination in pairs]
+    expected = [scenario_engine._reachable(adj, source, destination) for source, destination in pairs]
+    assert not all(expected)
+
+    searches = []
+    reachable = scenario_engine._reachable
+    monkeypatch.setattr(scenario_engine, "_reachable", lambda *args: searches.append(1) or reachable(*args))
+    assert [scenario_engine._legs_connected(plan) for plan in plans] == expected
+    assert not searches and get_distance_oracle() is oracle
+
+    # An older snapshot than the oracle's network is checked by search.
+    route_manager.delete_route("Atlantis", countries[0])
+    _ready_oracle()
+    assert [scenario_engine._legs_connected(plan) for plan in plans] == expected
+    assert searches
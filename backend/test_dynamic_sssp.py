@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Repaired shortest-path trees must match a fresh search after every change."""
+
+import random
+import threading
+from collections import OrderedDict
+
+import networkx as nx
+import pytest
+
+from managers import geopolitics_manager, route_manager
+from managers.network_manager import get_network
+from simulation import dynamic_sssp, scenario_engine
+from simulation import hybrid_routing_engine as hybrid
+from simulation.dynamic_sssp import ShortestPathTree
+from utils.mode_profiles import VALID_ROUTE_MODES
+
+
+def _assert_same(tree, fresh):
+    assert tree.dist.keys() == fresh.dist.keys()
+    for node, dist in fresh.dist.items():
+        assert abs(tree.dist[node] - dist) <= 1e-9 * max(1.0, dist)
+        parent = tree.parent[node]
+        if parent is not None:
+            assert abs(tree.dist[parent] + tree.weight[node] - tree.dist[node]) <= 1e-9 * max(1.0, dist)
+    # Ties go to the lowest node id, so repairs end at the fresh tree.
+    assert tree.parent == fresh.parent
+
+
+def test_random_edge_changes_are_repaired():
+    rng = random.Random(11)
+    names = [f"C{i}" for i in range(15)]
+    G = nx.DiGraph()
+    G.add_nodes_from(names)
+    while G.number_of_edges() < 45:
+        u, v = rng.sample(names, 2)
+        G.add_edge(u, v, cost=rng.uniform(1, 20), time=rng.uniform(1, 20),
+                   risk=rng.uniform(0.01, 0.3), mode=rng.choice(VALID_ROUTE_MODES))
+    expanded = hybrid.build_expanded_graph(G, {})
+    trees = [ShortestPathTree(expanded, name, attr) for name in names[:3] for attr in ("cost", "time")]
+
+    for step in range(80):
+        changed = []
+        for _ in range(rng.randint(1, 3)):
+            u, v = rng.sample(names, 2)
+            if G.has_edge(u, v) and step % 3 == 0:
+                G.remove_edge(u, v)
+            elif G.has_edge(u, v):
+                G[u][v]["cost"] *= rng.choice([0.3, 3.0])
+                G[u][v]["time"] *= rng.choice([0.3, 3.0])
+            else:
+                G.add_edge(u, v, cost=rng.uniform(1, 20), time=rng.uniform(1, 20),
+                           risk=rng.uniform(0.01, 0.3), mode=rng.choice(VALID_ROUTE_MODES))
+            changed.extend(hybrid._route_edge_key(u, v, mode) for mode in VALID_ROUTE_MODES)
+        expanded = hybrid.build_expanded_graph(G, {})
+        for tree in trees:
+            tree.update(expanded, [edge for edge in changed if edge is not None])
+            _assert_same(tree, ShortestPathTree(expanded, tree.source, tree.attr))
+
+
+def test_edges_off_the_tree_do_not_cut(monkeypatch):
+    G = get_network()
+    state = hybrid.factor_state()
+    expanded = hybrid.get_expanded_graph(G, state.factors, state=state)
+    tree = ShortestPathTree(expanded, "China", "cost")
+    off_tree = [(u, v) for u, v in expanded.edges() if tree.parent.get(v) != u]
+    monkeypatch.setattr(tree, "_reattach", lambda *args: (_ for _ in ()).throw(AssertionError("cut")))
+    tree.update(expanded, off_tree)
+
+
+@pytest.fixture
+def fresh_trees(monkeypatch):
+    monkeypatch.setattr(dynamic_sssp, "_trees", OrderedDict())
+    monkeypatch.setattr(dynamic_sssp, "_synced", None)
+    yield
+    dynamic_sssp.wait_for_rebuilds()
+
+
+def test_pinned_trees_follow_route_mutations(isolated_store, fresh_trees, monkeypatch):
+    dynamic_sssp.pin("China", "cost")
+    dynamic_sssp.pin("Germany", "time", 2.5)
+    dynamic_sssp.wait_for_rebuilds()
+    builds = []
+    original = dynamic_sssp.ShortestPathTree
+    monkeypatch.setattr(dynamic_sssp, "ShortestPathTree", lambda *args: builds.append(1) or original(*args))
+
+    geopolitics_manager.trigger_sea_storm("China", "Japan", 40)
+    geopolitics_manager.disrupt_infrastructure("Singapore", "Malaysia", 50)
+    route_manager.delete_route("Singapore", "Malaysia")
+    G = get_network()
+    assert dynamic_sssp._synced[1] == G.graph["version"]
+    path, cost, modes = dynamic_sssp.pinned_route(G, "China", "Japan", "cost")
+    assert not builds
+
+    state = hybrid.factor_state()
+    expanded = hybrid.get_expanded_graph(G, state.factors, state=state)
+    for (source, _), tree in dynamic_sssp._trees.items():
+        _assert_same(tree, original(expanded, source, tree.attr))
+    expected = hybrid.find_hybrid_optimal_route(G, "China", "Japan", state.factors, max_switches=None)
+    assert abs(cost - expected[1]) < 1e-9
+    assert path[0] == "China" and path[-1] == "Japan" and len(modes) == len(path)
+    assert dynamic_sssp.pinned_route(G, "Japan", "China") is None
+
+
+def test_simulation_reruns_read_the_pinned_trees(isolated_store, fresh_trees, monkeypatch):
+    scenario_engine.simulate_scenario("China", "Germany")
+    dynamic_sssp.wait_for_rebuilds()
+    assert dynamic_sssp._trees[("China", "cost")] is not None
+
+    geopolitics_manager.trigger_sea_storm("China", "Japan", 40)
+    searches = []
+    search = scenario_engine.find_hybrid_optimal_routes
+    monkeypatch.setattr(
+        scenario_engine, "find_hybrid_optimal_routes",
+        lambda *args, **kwargs: searches.append(1) or search(*args, **kwargs),
+    )
+    rerun = scenario_engine.simulate_scenario("China", "Germany")
+    assert rerun is not None and not searches
+
+    G = get_network()
+    state = hybrid.factor_state()
+    limit = scenario_engine.MAX_MODAL_SWITCHES
+    _, cost, _ = dynamic_sssp.pinned_route(G, "China", "Germany", max_switches=limit)
+    expected = hybrid.find_hybrid_optimal_route(G, "China", "Germany", state.factors, max_switches=limit)
+    assert abs(cost - expected[1]) < 1e-9
+
+
+def test_cargo_weights_share_the_unit_weight_trees(isolated_store, fresh_trees, monkeypatch):
+    weights = [1.0 + i / 4 for i in range(24)]
+    for weight in weights:
+        for objective in hybrid.OBJECTIVE_WEIGHTS:
+            dynamic_sssp.pin("China", objective, weight)
+    dynamic_sssp.wait_for_rebuilds()
+    assert set(dynamic_sssp._trees) == {("China", objective) for objective in hybrid.OBJECTIVE_WEIGHTS}
+
+    expansions = []
+    expand = dynamic_sssp.get_expanded_graph
+    monkeypatch.setattr(
+        dynamic_sssp, "get_expanded_graph",
+        lambda G, factors, weight, *args: expansions.append(weight) or expand(G, factors, weight, *args),
+    )
+    G = get_network()
+    state = hybrid.factor_state()
+    for weight in weights:
+        assert (dynamic_sssp.pinned_route(G, "China", "Japan", "cost", weight) is None) == (weight != 1.0)
+        path, cost, _ = dynamic_sssp.pinned_route(G, "China", "Japan", "time", weight)
+        expected = hybrid.find_hybrid_optimal_route(
+            G, "China", "Japan", state.factors, weight, max_switches=None, optimization="time", state=state
+        )
+        assert path == expected[0] and abs(cost - expected[1]) <= 1e-9 * expected[1]
+    # Only the caller's own weight is expanded, to price the route it reads.
+    assert expansions == [1.0] + weights
+
+
+def test_factor_changes_rebuild_off_the_request_path(isolated_store, fresh_trees, monkeypatch):
+    dynamic_sssp.pin("China", "time")
+    dynamic_sssp.wait_for_rebuilds()
+    threads = []
+    original = dynamic_sssp.ShortestPathTree
+    monkeypatch.setattr(
+        dynamic_sssp, "ShortestPathTree",
+        lambda *args: threads.append(threading.current_thread()) or original(*args),
+    )
+
+    geopolitics_manager.impose_tariff("China", "Japan", 25)
+    G = get_network()
+    found = dynamic_sssp.pinned_route(G, "China", "Japan", "time")
+    dynamic_sssp.wait_for_rebuilds()
+    assert threads and threading.current_thread() not in threads
+    assert found is None or found == dynamic_sssp.pinned_route(G, "China", "Japan", "time")
+    state = hybrid.factor_state()
+    expected = hybrid.find_hybrid_optimal_route(
+        G, "China", "Japan", state.factors, max_switches=None, optimization="time", state=state
+    )
+    assert dynamic_sssp.pinned_route(G, "China", "Japan", "time")[0] == expected[0]
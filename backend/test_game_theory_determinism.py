@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Game theory results must not depend on the process that computes them."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from simulation.game_theory_engine import _country_pair_hash, evaluate_strategic_outlook
+
+BACKEND = Path(__file__).resolve().parent
+
+FACTORS = {"Trade": {"effect": 0.3, "strength": 0.5}}
+IMPACTS = {"cost_multiplier": 1.0, "time_multiplier": 1.0, "risk_multiplier": 1.0}
+PARAMS = {"rounds": 6, "discount": 0.92, "shock": 0.12, "aggression": 0.35}
+
+
+def _outlook(source, destination):
+    return evaluate_strategic_outlook(
+        source, destination, [source, destination], [], 120.0, 30.0, 0.2, {}, {}, FACTORS, IMPACTS, PARAMS
+    )
+
+
+def test_pair_hash_is_pinned():
+    assert _country_pair_hash("China", "Japan") == 0.93
+    assert _country_pair_hash("Japan", "China") == 0.64
+    assert _country_pair_hash("United States", "Germany") == 0.13
+
+
+def test_outlook_is_pinned():
+    outlook = _outlook("China", "Japan")
+    assert outlook["cooperation_probability"] == pytest.approx(0.7035315243060631)
+    assert outlook["treaty_break_probability"] == pytest.approx(0.3580576616316653)
+    assert outlook["stability_index"] == pytest.approx(0.2935573366887675)
+    assert outlook["payoff_matrix"]["cooperate_defect"] == pytest.approx({"src": -61.7, "dst": -11.7})
+
+
+def test_outlook_is_the_same_under_any_hash_seed():
+    script = (
+        "import json; from test_game_theory_determinism import _outlook; "
+        "print(json.dumps([_outlook(a, b) for a, b in [('China', 'Japan'), ('Brazil', 'India')]]))"
+    )
+    outputs = []
+    for seed in ("1", "2"):
+        env = {**os.environ, "PYTHONHASHSEED": seed, "PYTHONPATH": str(BACKEND)}
+        run = subprocess.run([sys.executable, "-c", script], cwd=BACKEND, env=env, capture_output=True, text=True, check=True)
+        outputs.append(json.loads(run.stdout.strip().splitlines()[-1]))
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""A* with landmark and great-circle bounds must stay exact."""
+
+import itertools
+import math
+import random
+
+import networkx as nx
+
+from managers.factors_manager import get_factors
+from managers.network_manager import build_network
+from simulation import goal_directed, routing_engine
+from simulation import hybrid_routing_engine as hybrid
+from simulation.goal_directed import GreatCircle, Landmarks, astar_path, country_coordinates
+
+
+def _located_graph(seed, nodes=40):
+    rng = random.Random(seed)
+    countries = {f"C{i}": {"lat": rng.uniform(-60, 60), "lon": rng.uniform(-180, 180)} for i in range(nodes)}
+    coordinates = country_coordinates(countries)
+    G = nx.DiGraph()
+    G.add_nodes_from(countries)
+    names = list(countries)
+    while G.number_of_edges() < 4 * nodes:
+        u, v = rng.sample(names, 2)
+        km = goal_directed._great_circle_km(coordinates[u], coordinates[v])
+        G.add_edge(u, v, cost=km * rng.uniform(0.01, 0.03) + rng.uniform(0, 5), time=rng.randint(1, 4))
+    return G, countries
+
+
+def test_alt_matches_dijkstra():
+    for seed in range(4):
+        G, _ = _located_graph(seed)
+        G.graph["version"] = 1  # keeps the landmarks across queries
+        for weight in ("cost", "time"):
+            assert goal_directed.landmarks_for(G, weight) is None  # built in the background
+        goal_directed.wait_for_rebuilds()
+        for weight in ("cost", "time"):
+            assert goal_directed.landmarks_for(G, weight) is not None
+            lengths = dict(nx.all_pairs_dijkstra_path_length(G, weight=weight))
+            for u, v in itertools.permutations(G.nodes(), 2):
+                found = astar_path(G, [u], [v], weight)
+                if v not in lengths[u]:
+                    assert found is None
+                    continue
+                assert abs(found[0] - lengths[u][v]) <= 1e-9 * max(1.0, lengths[u][v])
+                assert abs(nx.path_weight(G, found[1], weight) - found[0]) <= 1e-9 * max(1.0, found[0])
+
+
+def test_bounds_never_overestimate():
+    G, countries = _located_graph(7)
+    landmarks = Landmarks(G, "cost", 4)
+    great_circle = GreatCircle(G, "cost", country_coordinates(countries), lambda node: node)
+    for target in list(G.nodes())[::5]:
+        lengths = nx.single_source_dijkstra_path_length(G.reverse(), target, weight="cost")
+        alt = landmarks.heuristic([target])
+        circle = great_circle.heuristic([target])
+        for node in G.nodes():
+            exact = lengths.get(node, math.inf)
+            assert alt(node) <= exact + 1e-9 and circle(node) <= exact + 1e-9
+
+
+def test_great_circle_heuristic_matches_dijkstra(monkeypatch):
+    G, countries = _located_graph(3)
+    G.graph["version"] = 1
+    monkeypatch.setattr(goal_directed, "read_json", lambda file: countries)
+    goal_directed.great_circle_for(G, "cost", lambda node: node)
+    goal_directed.wait_for_rebuilds()
+    assert goal_directed.great_circle_for(G, "cost", lambda node: node).per_km > 0
+    for u, v in list(itertools.permutations(G.nodes(), 2))[::3]:
+        found = astar_path(G, [u], [v], "cost", "great_circle")
+        expected = astar_path(G, [u], [v], "cost", "alt")
+        assert (found is None) == (expected is None)
+        if found is not None:
+            assert abs(found[0] - expected[0]) <= 1e-9 * max(1.0, expected[0])
+
+
+def test_heuristic_setting_keeps_route_values(monkeypatch):
+    G = build_network()
+    G.graph["version"] = 1
+    factors = get_factors()
+    pairs = list(itertools.permutations(sorted(G.nodes()), 2))[::5]
+
+    def routes():
+        return [
+            (
+                routing_engine.fastest_route(G, a, b)[1],
+                hybrid.find_hybrid_optimal_route(G, a, b, factors, max_switches=2)[1],
+            )
+            for a, b in pairs
+        ]
+
+    expected = routes()
+    for heuristic in ("alt", "great_circle"):
+        monkeypatch.setattr(routing_engine, "ROUTING_HEURISTIC", heuristic)
+        monkeypatch.setattr(hybrid, "ROUTING_HEURISTIC", heuristic)
+        for before, after in zip(expected, routes()):
+            for value, a_star_value in zip(before, after):
+                assert (value is None) == (a_star_value is None)
+                if value is not None:
+                    assert abs(value - a_star_value) <= 1e-9 * max(1.0, value)
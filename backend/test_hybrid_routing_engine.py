@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Tests for the multimodal searches in the hybrid routing engine."""
+
+import random
+
+import networkx as nx
+import numpy as np
+
+from managers import factors_manager, geopolitics_manager
+from simulation import hybrid_routing_engine as hybrid
+from utils.mode_profiles import VALID_ROUTE_MODES
+
+
+def _random_network(seed, countries=6, routes=14):
+    rng = random.Random(seed)
+    names = [f"C{i}" for i in range(countries)]
+    G = nx.DiGraph()
+    G.add_nodes_from(names)
+    while G.number_of_edges() < routes:
+        u, v = rng.sample(names, 2)
+        G.add_edge(
+            u, v,
+            cost=rng.uniform(1, 20), time=rng.uniform(1, 20), risk=rng.uniform(0.01, 0.3),
+            mode=rng.choice(VALID_ROUTE_MODES),
+        )
+    return G
+
+
+def _brute_force(expanded, source, destination, weight_key, max_switches, max_time, max_risk):
+    best = None
+    for start in hybrid._mode_nodes(source):
+        for end in hybrid._mode_nodes(destination):
+            for path in nx.all_simple_paths(expanded, start, end):
+                survival = 1.0
+                for u, v in zip(path, path[1:]):
+                    survival *= 1 - expanded[u][v]["risk"]
+                if max_switches is not None and hybrid._count_switches(expanded, path) > max_switches:
+                    continue
+                if max_time is not None and hybrid._path_total(expanded, path, "time") > max_time:
+                    continue
+                if max_risk is not None and 1 - survival > max_risk:
+                    continue
+                weight = hybrid._path_total(expanded, path, weight_key)
+                if best is None or weight < best:
+                    best = weight
+    return best
+
+
+def test_constrained_search_matches_brute_force():
+    limits = [(0, None, None), (1, None, None), (2, 60.0, None), (None, None, 0.4), (1, 45.0, 0.5)]
+    for seed in range(4):
+        expanded = hybrid.build_expanded_graph(_random_network(seed), {})
+        for weight_key in hybrid.OBJECTIVE_WEIGHTS.values():
+            for max_switches, max_time, max_risk in limits:
+                for source, destination in [("C0", "C1"), ("C2", "C5"), ("C4", "C3")]:
+                    path = hybrid._constrained_multimodal_path(
+                        expanded, source, destination, weight_key, max_switches, max_time, max_risk
+                    )
+                    expected = _brute_force(
+                        expanded, source, destination, weight_key, max_switches, max_time, max_risk
+                    )
+                    if expected is None:
+                        assert path is None
+                    else:
+                        assert abs(hybrid._path_total(expanded, path, weight_key) - expected) < 1e-9
+
+
+def test_switch_limit_finds_feasible_detour():
+    # The cheap A -> B route needs two transfers; one limit forces the land detour.
+    G = nx.DiGraph()
+    G.add_edge("A", "X", cost=1, time=1, risk=0.01, mode="land")
+    G.add_edge("X", "Y", cost=1, time=1, risk=0.01, mode="sea")
+    G.add_edge("Y", "B", cost=1, time=1, risk=0.01, mode="land")
+    G.add_edge("A", "B", cost=1000, time=1, risk=0.01, mode="land")
+    factors = {}
+
+    path, _, modes = hybrid.find_hybrid_optimal_route(G, "A", "B", factors, max_switches=None)
+    assert path == ["A", "X", "X", "Y", "Y", "B"]
+
+    path, cost, modes = hybrid.find_hybrid_optimal_route(G, "A", "B", factors, max_switches=1)
+    assert path == ["A", "B"] and modes == ["land", "land"]
+    assert cost == 1000
+
+
+def test_pareto_front_contains_each_objective_optimum():
+    for seed in range(4):
+        G = _random_network(seed)
+        expanded = hybrid.build_expanded_graph(G, {})
+        for source, destination in [("C0", "C1"), ("C2", "C5"), ("C4", "C3")]:
+            routes = hybrid.find_pareto_routes(G, source, destination, {}, max_switches=2)
+            points = [(r["cost"], r["time"], r["risk_weight"]) for r in routes]
+            for point in points:
+                assert not any(
+                    other != point and all(o <= p for o, p in zip(other, point)) for other in points
+                )
+            for optimization, weight_key in hybrid.OBJECTIVE_WEIGHTS.items():
+                path = hybrid._constrained_multimodal_path(expanded, source, destination, weight_key, 2)
+                picked = hybrid.pick_pareto_route(routes, optimization)
+                if path is None:
+                    assert picked is None
+                    continue
+                expected = hybrid._path_total(expanded, path, weight_key)
+                assert abs(picked[weight_key] - expected) < 1e-9
+
+
+def test_capped_pareto_search_keeps_the_cheapest_route():
+    # The cheap QA -> QX hop takes a transfer at QY, so with one switch left
+    # only the dear direct sea route reaches QD; the cap must not drop it.
+    G = nx.DiGraph()
+    G.add_edge("QA", "QY", cost=1, time=1, risk=0.01, mode="land")
+    G.add_edge("QY", "QX", cost=1, time=1, risk=0.01, mode="sea")
+    G.add_edge("QA", "QX", cost=1000, time=1, risk=0.01, mode="sea")
+    G.add_edge("QX", "QD", cost=1, time=1, risk=0.01, mode="air")
+    expanded = hybrid.build_expanded_graph(G, {})
+    path = hybrid._constrained_multimodal_path(expanded, "QA", "QD", "cost", 1)
+    expected = hybrid._path_total(expanded, path, "cost")
+    for limit in (None, 1):
+        found = hybrid._pareto_multimodal_paths(expanded, "QA", "QD", 1, label_limit=limit)
+        assert found and abs(min(point[0] for point, _ in found) - expected) < 1e-9
+
+
+def test_vectorized_edge_metrics_match_scalar_metrics():
+    G = _random_network(3, countries=8, routes=30)
+    factors = {
+        "Maritime Security": {"effect": -0.6, "strength": 0.8},
+        "Border Tension": {"effect": -0.4, "strength": 0.5},
+        "Cyber Attack": {"effect": -0.7, "strength": 0.9},
+        "Energy Crisis": {"effect": -0.3, "strength": 0.6},
+        "Trade Pact": {"effect": 0.5, "strength": 0.7},
+    }
+    impacts = hybrid.compute_factor_impacts(factors)
+    edges = hybrid.EdgeArrays(G)
+    cost, time, risk = hybrid.compute_edge_metrics(
+        edges, impacts, hybrid.compute_mode_pressures(factors), cargo_weight=2.5
+    )
+    for i, (u, v) in enumerate(edges.edges):
+        data = G[u][v]
+        metrics = hybrid.compute_route_entity_metrics(
+            u, v, data["cost"], data["time"], data["risk"], data["mode"], factors, 2.5
+        )
+        assert (cost[i], time[i], risk[i]) == (
+            metrics["adjusted_cost"], metrics["adjusted_time"], metrics["adjusted_risk"]
+        )
+
+
+def test_country_names_with_underscores_round_trip():
+    G = nx.DiGraph()
+    G.add_edge("North_Land", "Port_of_Sea", cost=5, time=2, risk=0.01, mode="land")
+    G.add_edge("Port_of_Sea", "Far_Isle", cost=7, time=9, risk=0.02, mode="sea")
+    path, cost, modes = hybrid.find_hybrid_optimal_route(G, "North_Land", "Far_Isle", {})
+    assert path == ["North_Land", "Port_of_Sea", "Port_of_Sea", "Far_Isle"]
+    assert modes == ["land", "land", "sea", "sea"]
+    routes = hybrid.find_pareto_routes(G, "North_Land", "Far_Isle", {})
+    assert [route["path"] for route in routes] == [path]
+
+
+def test_factor_state_follows_factor_version(isolated_store):
+    state = hybrid.factor_state()
+    assert hybrid.factor_state() is state
+    assert hybrid.factor_state(factors_manager.get_factors()) is state
+
+    geopolitics_manager.impose_tariff("China", "Japan", 25)
+    changed = hybrid.factor_state()
+    assert changed is not state
+    factors = factors_manager.get_factors()
+    assert changed.impacts == hybrid.compute_factor_impacts(factors)
+    assert np.array_equal(changed.pressures, hybrid.compute_mode_pressures(factors))
+
+    copy = hybrid.factor_state({name: dict(data) for name, data in factors.items()})
+    assert copy is not changed and copy.impacts == changed.impacts
+
+
+def test_one_search_tree_matches_per_destination_routes(monkeypatch):
+    for backend in ("networkx", "csr"):
+        monkeypatch.setattr(hybrid, "ROUTING_BACKEND", backend)
+        for seed in range(4):
+            G = _random_network(seed, countries=8, routes=24)
+            destinations = sorted(G.nodes()) + ["Nowhere"]
+            for optimization in hybrid.OBJECTIVE_WEIGHTS:
+                for max_switches, max_time in [(None, None), (1, None), (2, 50.0)]:
+                    routes = hybrid.find_hybrid_optimal_routes(
+                        G, "C0", destinations, {}, optimization=optimization,
+                        max_switches=max_switches, max_time=max_time,
+                    )
+                    assert routes == {
+                        destination: hybrid.find_hybrid_optimal_route(
+                            G, "C0", destination, {}, optimization=optimization,
+                            max_switches=max_switches, max_time=max_time,
+                        )
+                        for destination in destinations
+                    }
+
+
+def test_reachable_countries_respect_budgets(monkeypatch):
+    for backend in ("networkx", "csr"):
+        monkeypatch.setattr(hybrid, "ROUTING_BACKEND", backend)
+        for seed in range(4):
+            G = _random_network(seed, countries=8, routes=24)
+            expanded = hybrid.build_expanded_graph(G, {})
+            for optimization, max_time in [("cost", 40.0), ("time", None), ("time", 30.0)]:
+                reachable = hybrid.find_reachable_countries(
+                    G, "C0", {}, max_switches=2, optimization=optimization, max_time=max_time
+                )
+                for country in G.nodes():
+                    path = hybrid._constrained_multimodal_path(
+                        expanded, "C0", country, optimization, 2, max_time
+                    )
+                    assert (path is None) == (country not in reachable)
+                    if path is not None:
+                        route = reachable[country]
+                        assert route["path"][-1] == country
+                        assert abs(route[optimization] - hybrid._path_total(expanded, path, optimization)) < 1e-9
+
+            unbounded = hybrid.find_reachable_countries(G, "C0", {}, max_switches=2)
+            cheap = hybrid.find_reachable_countries(G, "C0", {}, max_switches=2, max_cost=15.0)
+            assert set(cheap) == {country for country, route in unbounded.items() if route["cost"] <= 15.0}
+            assert cheap["C0"]["predecessor"] is None
+            for route in cheap.values():
+                assert route["predecessor"] is None or route["predecessor"] == route["path"][-2]
+
+
+def test_k_shortest_paths_enumerate_in_order():
+    for seed in range(4):
+        expanded = hybrid.build_expanded_graph(_random_network(seed, countries=6, routes=16), {})
+        for weight_key in ("cost", "time"):
+            for source, destination in [("C0", "C1"), ("C2", "C5")]:
+                starts = set(hybrid._mode_nodes(source))
+                ends = set(hybrid._mode_nodes(destination))
+                expected = sorted(
+                    hybrid._path_total(expanded, path, weight_key)
+                    for start in starts
+                    for end in ends
+                    for path in nx.all_simple_paths(expanded, start, end)
+                    if not starts & set(path[1:]) and not ends & set(path[:-1])
+                )
+                found = [
+                    hybrid._path_total(expanded, path, weight_key)
+                    for path in hybrid._k_shortest_paths(expanded, source, destination, weight_key)
+                ]
+                assert np.allclose(found, expected, rtol=1e-9)
+
+
+def test_k_routes_are_distinct_and_diverse():
+    G = _random_network(3, countries=8, routes=28)
+    best = hybrid.find_hybrid_optimal_route(G, "C0", "C5", {}, max_switches=None)
+    routes = hybrid.find_k_routes(G, "C0", "C5", {}, k=4)
+    assert len(routes) > 1 and routes[0][1] == best[1]
+    assert [cost for _, cost, _ in routes] == sorted(cost for _, cost, _ in routes)
+
+    def steps(route):
+        path = route[0]
+        return {(u, v) for u, v in zip(path, path[1:]) if u != v}
+
+    assert len({frozenset(steps(route)) for route in routes}) == len(routes)
+    diverse = hybrid.find_k_routes(G, "C0", "C5", {}, k=4, diversity=0.6)
+    for i, route in enumerate(diverse):
+        for earlier in diverse[:i]:
+            assert len(steps(route) & steps(earlier)) <= 0.4 * len(steps(route))
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Tests that the cached network graph tracks route mutations edge by edge."""
+
+from managers import geopolitics_manager, network_manager, route_manager
+from managers.network_manager import build_network, get_network, graph_version
+from managers.world_store import NameTable
+from simulation import hybrid_routing_engine as hybrid
+
+
+def _edges(G):
+    return {(u, v): dict(d) for u, v, d in G.edges(data=True)}
+
+
+def test_patched_graph_matches_fresh_build(isolated_store):
+    G = get_network()
+    version = graph_version()
+    before = _edges(G)
+
+    geopolitics_manager.impose_tariff("China", "Japan", 25)
+    assert get_network() is not G and _edges(G) == before  # patched on a copy
+    assert graph_version() > version
+
+    geopolitics_manager.trigger_sea_storm("China", "Japan", 40)
+    geopolitics_manager.trigger_famine("Chile", 30)
+    geopolitics_manager.declare_war("China", "Japan")
+    route_manager.add_route({"origin": "Atlantis", "destination": "Chile", "cost": 3, "time": 4, "risk": 0.1})
+    route_manager.delete_route("Singapore", "Malaysia")
+
+    assert _edges(get_network()) == _edges(build_network())
+    assert set(get_network().nodes()) == set(build_network().nodes())
+
+
+def test_unhooked_write_triggers_rebuild(isolated_store):
+    get_network()
+    version = graph_version()
+
+    routes = isolated_store.read("routes.json")
+    isolated_store.write("routes.json", {"A": {"B": dict(next(iter(next(iter(routes.values())).values())))}})
+
+    assert set(get_network().edges()) == {("A", "B")}
+    assert graph_version() > version
+
+
+def test_patch_copies_only_the_touched_rows(isolated_store):
+    G = get_network()
+    before = _edges(G)
+    untouched = next(node for node in sorted(G.nodes()) if node not in ("China", "Japan"))
+
+    geopolitics_manager.impose_tariff("China", "Japan", 25)
+    H = get_network()
+    assert H._adj[untouched] is G._adj[untouched]
+    assert H._adj["China"] is not G._adj["China"]
+    assert H["China"]["Japan"] is not G["China"]["Japan"]
+    assert _edges(G) == before
+
+
+def test_built_network_interns_its_countries(monkeypatch):
+    # A fresh process has only seen the routes on disk, never written them.
+    table = NameTable()
+    monkeypatch.setattr(network_manager, "country_ids", table)
+    monkeypatch.setattr(hybrid, "country_ids", table)
+    G = build_network()
+    assert all(table.id_of(country) is not None for country in G)
+
+    destination, *origins = sorted(G)
+    costs = hybrid.find_costs_to(G, destination, origins, {})
+    assert costs and set(costs) <= set(origins)
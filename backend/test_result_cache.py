@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""The /simulate result cache must only serve results of the current world."""
+
+from fastapi.testclient import TestClient
+
+import main
+from managers import geopolitics_manager
+from simulation.result_cache import ResultCache, request_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_ignores_field_order():
+    assert request_key({"src": "A", "parameters": {"x": 1, "y": 2}}) == request_key({"parameters": {"y": 2, "x": 1}, "src": "A"})
+    assert request_key({"src": "A"}) != request_key({"src": "B"})
+
+
+def test_versions_ttl_and_lru():
+    clock = _Clock()
+    cache = ResultCache(max_entries=2, ttl=10, clock=clock)
+    world = {"routes.json": 1, "factors.json": 1}
+
+    cache.put("a", world, "A")
+    assert cache.get("a", world) == "A"
+    assert cache.get("a", {**world, "factors.json": 2}) is None  # a write dropped it
+    assert cache.get("a", world) is None
+
+    cache.put("a", world, "A")
+    cache.put("b", world, "B")
+    cache.get("a", world)
+    cache.put("c", world, "C")  # evicts b, the least recently used
+    assert cache.get("b", world) is None and cache.get("a", world) == "A"
+
+    clock.now = 11
+    assert cache.get("c", world) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale"], stats["expired"], stats["evicted"]) == (3, 1, 1, 1)
+    assert stats["entries"] == 1
+
+
+def test_simulate_endpoint_caches_until_the_world_changes(isolated_store, monkeypatch):
+    monkeypatch.setattr(main, "simulation_cache", ResultCache(max_entries=8, ttl=60))
+    client = TestClient(main.app)
+    payload = {"src": "China", "dst": "Japan", "cargo_manifest": [{"name": "crude_oil", "quantity": 50}]}
+
+    first = client.post("/simulate", json=payload)
+    second = client.post("/simulate", json=dict(reversed(list(payload.items()))))
+    assert (first.headers["X-Cache"], second.headers["X-Cache"]) == ("MISS", "HIT")
+    assert first.json() == second.json()
+
+    bypass = client.post("/simulate", json=payload, headers={"Cache-Control": "no-cache"})
+    assert bypass.headers["X-Cache"] == "BYPASS"
+
+    geopolitics_manager.impose_tariff("China", "Japan", 80)
+    changed = client.post("/simulate", json=payload)
+    assert changed.headers["X-Cache"] == "MISS"
+    assert changed.json()["cheapest"]["total_cost"] != first.json()["cheapest"]["total_cost"]
+    assert client.get("/simulate/cache").json()["hits"] == 1
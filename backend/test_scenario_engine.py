@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Tests for the scenario engine entry points."""
+
+import itertools
+
+import pytest
+
+from managers import geopolitics_manager
+from managers.network_manager import get_network
+from simulation import scenario_engine
+from simulation import hybrid_routing_engine as hybrid
+from simulation.hybrid_routing_engine import find_hybrid_optimal_route
+from simulation.scenario_engine import simulate_many, simulate_route_alternatives, simulate_scenario
+from simulation.world_snapshot import take_snapshot
+
+
+@pytest.fixture(autouse=True)
+def searched_routes(monkeypatch):
+    """Search every leg. Pinned trees and contraction hierarchies are built
+    in the background and may settle ties differently from the search, so a
+    run could otherwise read some legs off one that was not ready for the
+    run it is compared to (see test_dynamic_sssp.py and
+    test_contraction_hierarchy.py for those)."""
+    monkeypatch.setattr(scenario_engine, "pin", lambda *args: None)
+    monkeypatch.setattr(scenario_engine, "pinned_route", lambda *args, **kwargs: None)
+    monkeypatch.setattr(hybrid, "CONTRACTION_HIERARCHIES", False)
+
+
+def test_batch_matches_single_simulations():
+    countries = sorted(get_network().nodes())
+    manifest = [{"name": "crude_oil", "quantity": 50}]
+    requests = [
+        (source, destination, manifest if i % 2 else None)
+        for i, (source, destination) in enumerate(itertools.permutations(countries, 2))
+    ][::11]
+    requests.append(("Atlantis", countries[0]))
+
+    for optimization in ("cost", "risk"):
+        results = simulate_many(requests, optimization=optimization)
+        assert len(results) == len(requests)
+        for (source, destination, *rest), result in zip(requests, results):
+            expected = simulate_scenario(
+                source, destination, cargo_manifest=rest[0] if rest else None, optimization=optimization
+            )
+            assert result == expected
+
+
+def test_failed_batch_lane_does_not_fail_the_others():
+    countries = sorted(get_network().nodes())
+    requests = [
+        (countries[0], countries[1]),
+        (countries[1], countries[2], "not a manifest"),
+        (countries[2], countries[0]),
+    ]
+    results = simulate_many(requests, return_exceptions=True)
+    assert isinstance(results[1], Exception)
+    assert results[0] == simulate_scenario(countries[0], countries[1])
+    assert results[2] == simulate_scenario(countries[2], countries[0])
+
+
+def test_first_alternative_is_the_scenario_route():
+    countries = sorted(get_network().nodes())
+    manifest = [{"name": "crude_oil", "quantity": 50}]
+    for i, (source, destination) in enumerate(list(itertools.permutations(countries, 2))[::37]):
+        cargo = manifest if i % 2 else None
+        alternatives = simulate_route_alternatives(source, destination, 3, cargo_manifest=cargo, diversity=0.2)
+        for optimization in ("cost", "time"):
+            expected = simulate_scenario(source, destination, cargo_manifest=cargo, optimization=optimization)
+            options = alternatives[optimization]
+            assert (expected is None) == (not options)
+            if expected is not None:
+                assert abs(options[0]["total_" + optimization] - expected["total_" + optimization]) < 1e-6
+                assert len({tuple(option["path"]) for option in options}) == len(options)
+
+
+def test_options_match_single_objective_scenarios(monkeypatch):
+    countries = sorted(get_network().nodes())
+    pairs = list(itertools.permutations(countries, 2))[::41]
+    for source, destination in pairs:
+        results, frontier = scenario_engine.simulate_scenario_options(source, destination)
+        assert frontier == []
+        for optimization, result in results.items():
+            assert result == simulate_scenario(source, destination, optimization=optimization)
+
+    monkeypatch.setattr(scenario_engine, "PARETO_OPTIONS", True)
+    snapshot = take_snapshot()
+    manifest = [{"name": "crude_oil", "quantity": 50}]
+    for source, destination in pairs:
+        results, frontier = scenario_engine.simulate_scenario_options(
+            source, destination, cargo_manifest=manifest, snapshot=snapshot, include_frontier=True
+        )
+        assert (not frontier) == (results["cost"] is None)
+        if not frontier:
+            continue
+        plan = scenario_engine._plan_scenario(source, destination, None, manifest, snapshot)
+        state = plan["factor_state"]
+        expanded = hybrid.get_expanded_graph(snapshot.graph, state.factors, plan["cargo_weight"], True, state)
+        best = {}
+        for optimization, attr in hybrid.OBJECTIVE_WEIGHTS.items():
+            best[optimization] = 0.0
+            for leg in plan["route_legs"]:
+                path = hybrid._constrained_multimodal_path(
+                    expanded, leg["from"], leg["to"], attr, scenario_engine.MAX_MODAL_SWITCHES
+                )
+                optimum = hybrid._path_total(expanded, path, attr)
+                front = hybrid.find_pareto_routes(
+                    snapshot.graph, leg["from"], leg["to"], state.factors, plan["cargo_weight"],
+                    max_switches=scenario_engine.MAX_MODAL_SWITCHES, state=state,
+                )
+                picked = hybrid.pick_pareto_route(front, optimization)[attr]
+                assert abs(picked - optimum) <= 1e-9 * max(1.0, optimum)
+                best[optimization] += optimum
+        for optimization in ("cost", "time"):
+            found = min(trip["route_" + optimization] for trip in frontier)
+            assert abs(found - best[optimization]) <= 1e-9 * max(1.0, best[optimization])
+
+
+def test_sourcing_picks_the_cheapest_producer_to_reach():
+    snapshot = take_snapshot()
+    G = snapshot.graph
+    state = snapshot.factor_state
+    producers = [country for country, _ in snapshot.production.producers["crude_oil"]]
+    manifest = [{"name": "crude_oil", "quantity": 50}]
+    for source in sorted(G.nodes())[::3]:
+        if source in producers:
+            continue
+        destination = next(country for country in sorted(G.nodes()) if country != source)
+        candidates = [country for country in producers if country not in (source, destination)]
+        costs = {}
+        for country in candidates:
+            cost = find_hybrid_optimal_route(G, country, source, state.factors, max_switches=None, state=state)[1]
+            if cost is not None:
+                costs[country] = cost
+        chosen = scenario_engine._select_producers(snapshot, manifest, source, destination)["crude_oil"]
+        assert abs(costs[chosen] - min(costs.values())) <= 1e-9 * max(1.0, costs[chosen])
+
+
+def test_sourcing_capacity_limits(monkeypatch):
+    snapshot = take_snapshot()
+    source, destination = sorted(snapshot.graph.nodes())[:2]
+    manifest = [{"name": "crude_oil", "quantity": 10**9}]
+    assert scenario_engine._select_producers(snapshot, manifest, source, destination)
+    monkeypatch.setattr(scenario_engine, "SOURCING_CAPACITY_LIMITS", True)
+    assert scenario_engine._select_producers(snapshot, manifest, source, destination) == {}
+
+
+def test_repeated_commodity_is_sourced_once_for_the_total(monkeypatch):
+    snapshot = take_snapshot()
+    source, destination = sorted(snapshot.graph.nodes())[:2]
+    monkeypatch.setattr(scenario_engine, "SOURCING_CAPACITY_LIMITS", True)
+    # Each half fits every producer; only the total rules the smallest out.
+    smallest = min(quantity for _, quantity in snapshot.production.producers["crude_oil"])
+    half = smallest // 2 + 1
+    split = [{"name": "crude_oil", "quantity": half}, {"name": "Crude Oil", "quantity": half}]
+    whole = [{"name": "crude_oil", "quantity": 2 * half}]
+    expected = scenario_engine._select_producers(snapshot, whole, source, destination)["crude_oil"]
+    chosen = scenario_engine._select_producers(snapshot, split, source, destination)
+    assert chosen == {"crude_oil": expected, "Crude Oil": expected}
+
+
+def test_snapshot_is_unaffected_by_later_writes(isolated_store):
+    snapshot = take_snapshot()
+    manifest = [{"name": "crude_oil", "quantity": 50}]
+    expected = simulate_scenario("China", "Japan", cargo_manifest=manifest, snapshot=snapshot)
+    edges = {(u, v): dict(data) for u, v, data in snapshot.graph.edges(data=True)}
+
+    geopolitics_manager.impose_tariff("China", "Japan", 80)
+    geopolitics_manager.declare_war("China", "Japan")
+
+    assert {(u, v): dict(data) for u, v, data in snapshot.graph.edges(data=True)} == edges
+    assert simulate_scenario("China", "Japan", cargo_manifest=manifest, snapshot=snapshot)["total_cost"] == expected["total_cost"]
+    assert take_snapshot().versions["routes.json"] > snapshot.versions["routes.json"]
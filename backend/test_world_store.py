@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Tests for the in-memory world store that fronts the JSON database."""
+
+import json
+import os
+from pathlib import Path
+
+from managers.persistence import atomic_write_json
+from managers.world_store import ProductionIndex, WorldStore, country_ids
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_reads_are_served_from_memory(tmp_path):
+    _write(tmp_path / "factors.json", {"A": {"effect": 0.1, "strength": 0.5}})
+    store = WorldStore(tmp_path, stat_interval=3600)
+
+    first = store.read("factors.json")
+    os.remove(tmp_path / "factors.json")
+
+    assert store.read("factors.json") is first
+
+
+def test_write_goes_through_to_disk_and_bumps_version(tmp_path):
+    _write(tmp_path / "routes.json", {})
+    store = WorldStore(tmp_path, stat_interval=3600, flush_interval=0)
+    before = store.version("routes.json")
+
+    store.write("routes.json", {"A": {"B": {"cost": 1}}})
+
+    assert store.version("routes.json") > before
+    assert store.read("routes.json") == {"A": {"B": {"cost": 1}}}
+    assert json.loads((tmp_path / "routes.json").read_text()) == {"A": {"B": {"cost": 1}}}
+
+
+def test_external_edit_is_picked_up(tmp_path):
+    target = tmp_path / "countries.json"
+    _write(target, {"A": {}})
+    store = WorldStore(tmp_path, stat_interval=0)
+    before = store.version("countries.json")
+
+    _write(target, {"A": {}, "B": {}})
+    stat = os.stat(target)
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert set(store.read("countries.json")) == {"A", "B"}
+    assert store.version("countries.json") > before
+
+
+def test_write_behind_coalesces_and_flushes_on_close(tmp_path):
+    _write(tmp_path / "factors.json", {})
+    store = WorldStore(tmp_path, stat_interval=0, flush_interval=3600)
+
+    for step in range(5):
+        store.write("factors.json", {"A": {"effect": step / 10, "strength": 1.0}})
+
+    # Nothing on disk yet, but memory is authoritative and is not reloaded.
+    assert json.loads((tmp_path / "factors.json").read_text()) == {}
+    assert store.read("factors.json")["A"]["effect"] == 0.4
+
+    store.close()
+    assert json.loads((tmp_path / "factors.json").read_text())["A"]["effect"] == 0.4
+    assert store.read("factors.json")["A"]["effect"] == 0.4
+
+
+def test_atomic_write_leaves_no_temp_files(tmp_path):
+    target = tmp_path / "routes.json"
+    atomic_write_json(target, {"A": {}})
+
+    assert json.loads(target.read_text()) == {"A": {}}
+    assert [p.name for p in tmp_path.iterdir()] == ["routes.json"]
+
+
+def test_sqlite_backend_round_trips_and_updates_single_routes(tmp_path):
+    from managers.storage import JsonBackend, SqliteBackend, copy_collections
+
+    seed = JsonBackend(Path(__file__).resolve().parent / "database", flush_interval=0)
+    sqlite = SqliteBackend(tmp_path / "world.sqlite3")
+    copy_collections(seed, sqlite)
+    for name in SqliteBackend.COLLECTIONS:
+        assert sqlite.load(name) == seed.load(name), name
+
+    store = WorldStore(tmp_path, stat_interval=0, backend=sqlite)
+    routes = store.read("routes.json")
+    origin = next(iter(routes))
+    destination = next(iter(routes[origin]))
+    updated = dict(routes[origin][destination], cost=999.0)
+    revision = sqlite.stamp("routes.json")
+
+    store.write_routes("routes.json", {(origin, destination): updated})
+
+    assert sqlite.stamp("routes.json") == revision + 1
+    assert sqlite.load("routes.json")[origin][destination]["cost"] == 999.0
+    # Our own write must not look like an external edit.
+    assert store.read("routes.json")[origin][destination] is updated
+    sqlite.close()
+
+
+def _scan(countries, commodity):
+    found = [(name, data["production"][commodity]) for name, data in countries.items() if commodity in data.get("production", {})]
+    return tuple(sorted(found, key=lambda entry: -entry[1]))
+
+
+def test_production_index_is_patched_on_country_writes(tmp_path):
+    _write(
+        tmp_path / "countries.json",
+        {
+            "A": {"production": {"oil": 5, "Rare Earths": 1}},
+            "B": {"production": {"oil": 5}},
+            "C": {"production": {"grain": 2}},
+        },
+    )
+    store = WorldStore(tmp_path, stat_interval=3600, flush_interval=0)
+
+    index = store.production_index()
+    assert index.producers["oil"] == (("A", 5), ("B", 5))  # ties keep document order
+    assert index.producers["rare_earths"] == (("A", 1),)
+    assert index.production["C"] == frozenset({"grain"})
+
+    store.write_countries("countries.json", {"D": {"production": {"oil": 9}}, "A": None})
+    patched = store.production_index()
+    assert patched is not index
+    assert store.production_index() is patched
+    countries = store.read("countries.json")
+    for commodity in ("oil", "grain", "rare_earths"):
+        assert patched.producers.get(commodity, ()) == _scan(countries, commodity)
+    rebuilt = ProductionIndex(countries)
+    assert patched.producers == rebuilt.producers and patched.production == rebuilt.production
+    assert set(json.loads((tmp_path / "countries.json").read_text())) == {"B", "C", "D"}
+
+
+def test_only_writes_intern_country_names(tmp_path):
+    from simulation import hybrid_routing_engine as hybrid
+
+    _write(tmp_path / "routes.json", {})
+    store = WorldStore(tmp_path, stat_interval=3600, flush_interval=0)
+    size = len(country_ids)
+
+    assert country_ids.id_of("Nowhere Land") is None
+    assert len(hybrid._mode_nodes("Nowhere Land")) == 0
+    assert hybrid._route_edge_key("Nowhere Land", "Elsewhere", "sea") is None
+    assert len(country_ids) == size
+
+    store.write_routes("routes.json", {("Nowhere Land", "Elsewhere"): {"cost": 1}})
+    assert country_ids.id_of("Nowhere Land") == country_ids.intern("Nowhere Land")
+    assert country_ids.id_of("Elsewhere") is not None
+    assert len(country_ids) == size + 2
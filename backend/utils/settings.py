@@ -0,0 +1,90 @@
+"""Runtime settings for the backend, overridable through environment variables."""
+import os
+from pathlib import Path
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Minimum seconds between mtime checks of a cached database file. Reads inside
+# this window are served straight from memory without touching the disk.
+STORE_STAT_INTERVAL = _env_float("SCS_STORE_STAT_INTERVAL", 1.0)
+
+# Seconds the write-behind persistence waits to coalesce saves before flushing
+# them to disk. Zero or less writes synchronously on the caller's thread.
+STORE_FLUSH_INTERVAL = _env_float("SCS_STORE_FLUSH_INTERVAL", 0.5)
+
+# Storage backend for the live database collections: "json" (default) or
+# "sqlite". Seed data under database/defaults is always read from JSON.
+STORAGE_BACKEND = os.environ.get("SCS_STORAGE_BACKEND", "json").lower()
+
+SQLITE_PATH = Path(
+    os.environ.get(
+        "SCS_SQLITE_PATH",
+        Path(__file__).resolve().parent.parent / "database" / "world.sqlite3",
+    )
+)
+
+# Mode-expanded routing graphs kept per (factor state, cargo weight, switches).
+EXPANDED_GRAPH_CACHE_SIZE = int(_env_float("SCS_EXPANDED_GRAPH_CACHE_SIZE", 16))
+
+# Factor states (impacts and per-mode pressures) memoized per factor version.
+FACTOR_STATE_CACHE_SIZE = int(_env_float("SCS_FACTOR_STATE_CACHE_SIZE", 32))
+
+# Shortest-path implementation: "networkx" (default) or "csr", the compact
+# array-backed graph in simulation/csr_graph.py.
+ROUTING_BACKEND = os.environ.get("SCS_ROUTING_BACKEND", "networkx").lower()
+
+# Route unconstrained hybrid queries through contraction hierarchies, built one
+# at a time in the background per network version, factor state and objective
+# (simulation/contraction_hierarchy.py); cost ones only at unit cargo weight.
+CONTRACTION_HIERARCHIES = os.environ.get("SCS_CONTRACTION_HIERARCHIES", "off").lower() in ("1", "on", "true", "yes")
+
+# Largest expanded graph (countries x transport modes) the /distances
+# all-pairs table is built for. It takes O(nodes^2) memory per objective and
+# an O(nodes^3) build; above the cap /distances runs one search per source.
+DISTANCE_ORACLE_MAX_NODES = int(_env_float("SCS_DISTANCE_ORACLE_MAX_NODES", 1200))
+
+# Lower bound A* uses to steer route searches: "none" (default, plain Dijkstra),
+# "alt" (landmark distances) or "great_circle" (landmarks plus country
+# coordinates, when countries.json has them). See simulation/goal_directed.py.
+ROUTING_HEURISTIC = os.environ.get("SCS_ROUTING_HEURISTIC", "none").lower()
+
+# Landmarks precomputed per graph and weight for the "alt" heuristic.
+ROUTING_LANDMARKS = int(_env_float("SCS_ROUTING_LANDMARKS", 8))
+
+# Shortest-path trees kept per (/simulate leg origin, objective) and repaired
+# on route changes (simulation/dynamic_sssp.py); least recently used dropped
+# first. Never more than EXPANDED_GRAPH_CACHE_SIZE.
+PINNED_TREE_LIMIT = min(int(_env_float("SCS_PINNED_TREE_LIMIT", 16)), EXPANDED_GRAPH_CACHE_SIZE)
+
+# Pick the cheapest/fastest/most secure /simulate options from one Pareto
+# search per leg instead of one search per objective (off by default).
+PARETO_OPTIONS = os.environ.get("SCS_PARETO_OPTIONS", "off").lower() in ("1", "on", "true", "yes")
+
+# Most non-dominated labels the Pareto search keeps per expanded node at or
+# below each switch count. The cheapest route within the switch limit stays
+# exact; past the cap other tradeoffs may be missed.
+PARETO_LABEL_LIMIT = int(_env_float("SCS_PARETO_LABEL_LIMIT", 24))
+
+# How sourcing picks a producer for each commodity the source country lacks:
+# "largest" (the largest producer, regardless of distance) or "route_cost"
+# (the producer with the cheapest route to the source). "largest" stays the
+# default so existing /simulate requests keep the producers, and so the
+# routes and totals, they have always returned; route_cost is opt-in.
+SOURCING_STRATEGY = os.environ.get("SCS_SOURCING_STRATEGY", "largest").lower()
+
+# Only source a manifest item from producers whose production covers its
+# quantity, counting what earlier items already took from them.
+SOURCING_CAPACITY_LIMITS = os.environ.get("SCS_SOURCING_CAPACITY_LIMITS", "off").lower() in ("1", "on", "true", "yes")
+
+# /simulate responses kept in memory for identical requests on an unchanged
+# world (simulation/result_cache.py); 0 disables the cache.
+SIMULATION_CACHE_SIZE = int(_env_float("SCS_SIMULATION_CACHE_SIZE", 256))
+
+# Seconds a cached /simulate response may be served for.
+SIMULATION_CACHE_TTL = _env_float("SCS_SIMULATION_CACHE_TTL", 300.0)